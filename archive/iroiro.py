@@ -1,156 +1,158 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import ks_2samp, ttest_ind
 import os
 import glob
+import sys
+
+# used_code 内の section_stats.py などを読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "used_code"))
+
+from ecdf import ecdf_for, read_table
+from figure_batch import FigureDataset
+from render import FigureJob, RenderQueue, render_figure
+from style import PALETTE, paper_rc
+from section_stats import load_sections, compare_sections
+
+# 列 0, 1, 2 の条件名
+PHASES = ["pre", "propet", "post"]
+
+# 条件ごとの色（hist.py と同じ）
+PHASE_COLORS = {"pre": PALETTE["green"], "propet": PALETTE["purple"], "post": PALETTE["navy_blue"]}
+
+# グラフの書式（style.py の論文用の書式を各図の描画時にだけ適用する）と図の大きさ [inch]
+PLOT_RC = paper_rc(None)
+FIGSIZE = (8, 6)
 
 def get_common_name(file_path):
     """ ファイル名から共通部分を取得（拡張子を除いた部分） """
     return os.path.splitext(os.path.basename(file_path))[0]
 
-def get_y_axis_limits(csv_files):
-    """ 指定されたCSVファイル群のデータの範囲を取得し、y軸の最大値を統一（見切れ防止） """
-    y_limits = {}
+def get_y_axis_limits(csv_files, dataset=None):
+    """ 指定されたCSVファイル群のデータの範囲を取得し、y軸の最大値を統一（見切れ防止）。読み込み済みの dataset があればその要約を使う """
+    if dataset is None:
+        dataset = FigureDataset(csv_files, 3)
+    return dataset.group_limits(get_common_name)
 
-    for file_path in csv_files:
-        common_name = get_common_name(file_path)
-
-        try:
-            df = pd.read_csv(file_path, header=None)
-            if df.shape[1] < 3:
-                print(f"File {file_path} does not have enough columns. Skipping.")
-                continue
+def boxplot_job(file_path, output_dir, y_limits, dataset):
+    """ Boxplotの描画ジョブ（描画関数, 保存先, 引数）を作る。列が足りない場合は None """
+    if file_path not in dataset:
+        return None
 
-            col1, col2, col3 = df[0].dropna(), df[1].dropna(), df[2].dropna()
-            min_val, max_val = min(col1.min(), col2.min(), col3.min()), max(col1.max(), col2.max(), col3.max())
+    col1, col2, col3 = dataset.columns(file_path)
+    base_name = get_common_name(file_path)
 
-            if common_name not in y_limits:
-                y_limits[common_name] = [min_val, max_val]
-            else:
-                y_limits[common_name][0] = min(y_limits[common_name][0], min_val)
-                y_limits[common_name][1] = max(y_limits[common_name][1], max_val)
+    ylim = None
+    if base_name in y_limits:
+        y_min, y_max = y_limits[base_name]
+        ylim = (min(0, y_min), y_max * 1.1)  # 1.1倍の余裕
 
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
+    output_file = os.path.join(output_dir, f"{base_name}_boxplot.png")
+    return draw_boxplot, output_file, ([col1.to_numpy(), col2.to_numpy(), col3.to_numpy()], base_name, ylim)
 
-    return y_limits
+def draw_boxplot(fig, columns, title, ylim=None):
+    """ pre / propet / post のBoxplotを fig に描画する """
+    ax = fig.add_subplot()
+    ax.boxplot(columns, medianprops={"color": PALETTE["red"]})
+    ax.set_xticks([1, 2, 3], PHASES)
 
-def plot_boxplot(file_path, output_dir, y_limits):
-    """ Boxplotを作成し、保存する """
-    try:
-        df = pd.read_csv(file_path, header=None)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel("", fontsize=13)
+    ax.set_ylabel("Value", fontsize=13)
 
-        if df.shape[1] < 3:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return
+    if ylim is not None:
+        ax.set_ylim(*ylim)
 
-        col1, col2, col3 = df[0].dropna(), df[1].dropna(), df[2].dropna()
+    ax.grid(False)
 
-        base_name = get_common_name(file_path)
-
-        plt.figure(figsize=(8, 6))
-        plt.boxplot([col1, col2, col3], labels=["pre", "propet", "post"])
+def cdf_job(file_path, output_dir):
+    """ 累積確率分布曲線（CDF）の描画ジョブを作る（ECDF は compute_p_values と共有する）。列が足りない場合は None """
+    if read_table(file_path).shape[1] < 3:
+        print(f"File {file_path} does not have enough columns. Skipping.")
+        return None
 
-        plt.rcParams["font.family"] = "Arial"
-        plt.title(base_name, fontsize=16)
-        plt.xlabel("", fontsize=13)
-        plt.ylabel("Value", fontsize=13)
+    base_name = get_common_name(file_path)
+    ecdfs = [ecdf_for(file_path, i) for i in range(len(PHASES))]
+    output_file = os.path.join(output_dir, f"{base_name}_cdf.png")
+    return draw_cdf, output_file, (ecdfs, base_name)
 
-        if base_name in y_limits:
-            y_min, y_max = y_limits[base_name]
-            plt.ylim(min(0, y_min), y_max * 1.1)  # 1.1倍の余裕
+def draw_cdf(fig, ecdfs, title):
+    """ pre / propet / post の累積確率分布曲線（CDF）を fig に描画する """
+    ax = fig.add_subplot()
+    for ecdf, label in zip(ecdfs, PHASES):
+        ax.plot(ecdf.x, ecdf.p, color=PHASE_COLORS[label], label=label)
 
-        plt.grid(False)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel("Value", fontsize=13)
+    ax.set_ylabel("Cumulative Probability", fontsize=13)
+    ax.legend(fontsize=12)
 
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"{base_name}_boxplot.png")
-        plt.savefig(output_file)
-        plt.close()
-        print(f"Boxplot saved to {output_file}")
+    ax.grid(False)
 
+def _render_now(job, file_path, kind):
+    """ 描画ジョブをこのプロセスですぐに描画する（1枚だけ描く場合） """
+    try:
+        if job is None:
+            return
+        draw, output_file, args = job
+        render_figure(FigureJob(draw, output_file, args, FIGSIZE, PLOT_RC))
+        print(f"{kind} saved to {output_file}")
     except Exception as e:
         print(f"Error processing file {file_path}: {e}")
 
+def plot_boxplot(file_path, output_dir, y_limits, dataset=None):
+    """ Boxplotを作成し、保存する（dataset を渡した場合はファイルを読み直さない） """
+    if dataset is None:
+        dataset = FigureDataset([file_path], 3)
+    _render_now(boxplot_job(file_path, output_dir, y_limits, dataset), file_path, "Boxplot")
+
 def plot_cdf(file_path, output_dir):
     """ 累積確率分布曲線（CDF）を作成し、保存する """
     try:
-        df = pd.read_csv(file_path, header=None)
-
-        if df.shape[1] < 3:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return
-
-        col1, col2, col3 = df[0].dropna(), df[1].dropna(), df[2].dropna()
-
-        base_name = get_common_name(file_path)
-
-        plt.figure(figsize=(8, 6))
-        for col, label in zip([col1, col2, col3], ["pre", "propet", "post"]):
-            sorted_data = np.sort(col)
-            cumulative = np.arange(1, len(sorted_data) + 1) / len(sorted_data)
-            plt.plot(sorted_data, cumulative, label=label)
-
-        plt.rcParams["font.family"] = "Arial"
-        plt.title(base_name, fontsize=16)
-        plt.xlabel("Value", fontsize=13)
-        plt.ylabel("Cumulative Probability", fontsize=13)
-        plt.legend(fontsize=12)
-
-        plt.grid(False)
-
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"{base_name}_cdf.png")
-        plt.savefig(output_file)
-        plt.close()
-        print(f"CDF plot saved to {output_file}")
-
+        job = cdf_job(file_path, output_dir)
     except Exception as e:
         print(f"Error processing file {file_path}: {e}")
+        return
+    _render_now(job, file_path, "CDF plot")
 
-def compute_p_values(file_path):
-    """ KS検定 & Student's T検定のp値を計算し、辞書形式で返す """
-    try:
-        df = pd.read_csv(file_path, header=None)
-
-        if df.shape[1] < 3:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return None
-
-        col1, col2, col3 = df[0].dropna(), df[1].dropna(), df[2].dropna()
-
-        ks_p12, ks_p23, ks_p13 = ks_2samp(col1, col2).pvalue, ks_2samp(col2, col3).pvalue, ks_2samp(col1, col3).pvalue
-        t_p12, t_p23, t_p13 = ttest_ind(col1, col2, equal_var=False).pvalue, ttest_ind(col2, col3, equal_var=False).pvalue, ttest_ind(col1, col3, equal_var=False).pvalue
-
-        return {
-            "Section": get_common_name(file_path),
-            "KS pre-propet": ks_p12, "KS propet-post": ks_p23, "KS pre-post": ks_p13,
-            "T pre-propet": t_p12, "T propet-post": t_p23, "T pre-post": t_p13
-        }
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
+def compute_p_values(csv_files):
+    """ 全ファイルの KS検定 & Welch の T検定のp値を section_stats でまとめて計算し、セクションごとに1行の表で返す """
+    results = compare_sections(load_sections(csv_files, PHASES), correction=None)
+    if len(results) == 0:
         return None
 
-def process_all_files(input_dir, output_dir, output_p_values):
-    """ フォルダ内のすべてのCSVファイルを処理してboxplot・CDFを作成し、p値を計算する """
-    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
-    y_limits = get_y_axis_limits(csv_files)
-
-    p_values_results = []
-
-    for file_path in csv_files:
-        plot_boxplot(file_path, output_dir, y_limits)
-        plot_cdf(file_path, output_dir)
-        p_values = compute_p_values(file_path)
-        if p_values:
-            p_values_results.append(p_values)
-
-    if p_values_results:
-        pd.DataFrame(p_values_results).to_csv(output_p_values, index=False)
+    results["Column"] = (results["Test"].map({"KS": "KS", "Welch": "T"}) + " "
+                         + results["Phase A"] + "-" + results["Phase B"])
+    table = results.pivot(index="Section", columns="Column", values="p-value")
+    columns = [f"{test} {a}-{b}" for test in ["KS", "T"]
+               for a, b in [("pre", "propet"), ("propet", "post"), ("pre", "post")]]
+    sections = results["Section"].unique()  # pivot は Section 順に並べ替えるので、ファイルの順番に戻す
+    return table.reindex(index=sections, columns=columns).reset_index().rename_axis(None, axis=1)
+
+def process_all_files(input_dir, output_dir, output_p_values, max_workers=None, timeout=None):
+    """ フォルダ内のすべてのCSVファイルを処理してboxplot・CDFを（プロセスプールで並列に）作成し、p値を計算する """
+    csv_files = sorted(glob.glob(os.path.join(input_dir, "*.csv")))
+
+    # 各ファイルを1回だけ読み込み、y軸の範囲・boxplot・CDF・p値はすべてそこから作る
+    dataset = FigureDataset(csv_files, 3)
+    y_limits = get_y_axis_limits(csv_files, dataset)
+
+    queue = RenderQueue()
+    for file_path in dataset.files:
+        for job in (boxplot_job(file_path, output_dir, y_limits, dataset), cdf_job(file_path, output_dir)):
+            if job is not None:
+                draw, output_file, args = job
+                queue.add(draw, output_file, *args, figsize=FIGSIZE, rc=PLOT_RC)
+    queue.run(max_workers=max_workers, timeout=timeout)
+
+    p_values_results = compute_p_values(dataset.files)
+    if p_values_results is not None:
+        os.makedirs(os.path.dirname(output_p_values) or ".", exist_ok=True)
+        p_values_results.to_csv(output_p_values, index=False)
         print(f"P-values saved to {output_p_values}")
 
 # 使用例
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3"
-output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3/moromoro"
-output_p_values = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3/moromoro/p_values_results.csv"
-process_all_files(input_dir, output_dir, output_p_values)
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3"
+    output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3/moromoro"
+    output_p_values = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3/moromoro/p_values_results.csv"
+    process_all_files(input_dir, output_dir, output_p_values)
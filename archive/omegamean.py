@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
 import os
-import glob
+import sys
+
+# process 内の catalog.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from catalog import PHASES, SessionCatalog, subject_name
 
 def calculate_mean_velocity_from_csv(file_path):
     """
@@ -28,10 +33,10 @@ def calculate_mean_velocity_from_csv(file_path):
         print(f"Error processing file {file_path}: {e}")
         return np.nan
 
-def process_all_means(input_dir, output_file):
+def process_all_means(input_dir, output_file, trial=3, catalog=None):
     """
     フォルダ内のCSVファイルからLandingとTakeoffの角速度の平均値を計算し、
-    指定の順番で1つのCSVファイルにまとめる。
+    ラット番号・日付・条件の順番で1つのCSVファイルにまとめる。
 
     Parameters:
     ----------
@@ -39,29 +44,30 @@ def process_all_means(input_dir, output_file):
         入力CSVファイルが保存されているフォルダ。
     output_file : str
         出力CSVファイルのパス。
+    trial : int
+        使う試行番号。
+    catalog : SessionCatalog, optional
+        作成済みのファイルの一覧。None の場合は input_dir を走査して作る。
     """
-    # ファイル名の順番を定義
-    order = [
-        "rat8_1106", "rat9_1106", "rat10_1102", "rat10_1106", "rat11_1102", "rat11_1106"
-    ]
-    phases = ["pre", "propet", "post"]
+    if catalog is None:
+        catalog = SessionCatalog.scan(input_dir)
 
     file_info = []
     landing_means = []
     takeoff_means = []
 
-    for base in order:
-        for phase in phases:
-            # ファイルパスを生成
-            landing_file = os.path.join(input_dir, f"{base}{phase}_3_landing_omega.csv")
-            takeoff_file = os.path.join(input_dir, f"{base}{phase}_3_takeoff_omega.csv")
+    for rat, date in catalog.subjects(stage=["landing_omega", "takeoff_omega"], extension=".csv"):
+        for phase in PHASES:
+            # 索引からファイルを引く（無い場合は NaN）
+            landing_file = catalog.get(rat, date, phase, trial, "landing_omega", extension=".csv")
+            takeoff_file = catalog.get(rat, date, phase, trial, "takeoff_omega", extension=".csv")
 
             # 各ファイルから平均角速度を計算
-            landing_mean = calculate_mean_velocity_from_csv(landing_file)
-            takeoff_mean = calculate_mean_velocity_from_csv(takeoff_file)
+            landing_mean = calculate_mean_velocity_from_csv(landing_file) if landing_file else np.nan
+            takeoff_mean = calculate_mean_velocity_from_csv(takeoff_file) if takeoff_file else np.nan
 
             # ファイル情報と平均値をリストに追加
-            file_info.append(f"{base}_{phase}")
+            file_info.append(f"{subject_name(rat, date)}_{phase}")
             landing_means.append(landing_mean)
             takeoff_means.append(takeoff_mean)
 
@@ -77,6 +83,7 @@ def process_all_means(input_dir, output_file):
     print(f"Saved mean velocities to {output_file}")
 
 # 使用例
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/omega"  # 入力CSVファイルが保存されているフォルダ
-output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/omega/omegamean.csv"  # 結果を保存するフォルダ
-process_all_means(input_dir, output_file)
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/omega"  # 入力CSVファイルが保存されているフォルダ
+    output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/omega/omegamean.csv"  # 結果を保存するフォルダ
+    process_all_means(input_dir, output_file)
@@ -2,9 +2,11 @@ import pandas as pd
 import os
 import glob
 
-def process_csv(file_path):
+from aggregate import build_aggregate, cycle_length_values, save_aggregate
+
+def calculate_f_minus_h(file_path):
     """
-    指定したCSVファイルからF列-H列（0ベースでは5-7）の結果を計算し、ファイル名と共に保存。
+    指定したCSVファイルからF列-H列（0ベースでは5-7）の結果を計算する。
 
     Parameters:
     ----------
@@ -13,34 +15,20 @@ def process_csv(file_path):
 
     Returns:
     -------
-    pd.DataFrame
-        F列-H列の結果とファイル名を含むデータフレーム。
+    np.ndarray
+        F列-H列の結果。
     """
-    try:
-        # CSVファイルを読み込む
-        df = pd.read_csv(file_path, header=None,skiprows=1)  # 列名がない場合はheader=Noneを指定
-
-        # 必要な列（インデックス5と7）が存在するか確認
-        if df.shape[1] <= max(5, 7):
-            print(f"Required columns missing in file: {file_path}")
-            return None
-
-        # F列 - H列（0ベースでは5 - 7）を計算
-        df["F-H"] = df[5] - df[7]
+    # CSVファイルを読み込む（1行目は飛ばす）
+    df = pd.read_csv(file_path, header=None, skiprows=1)
 
-        # ファイル名（セクション名）を取得
-        section_name = os.path.splitext(os.path.basename(file_path))[0]
+    # 必要な列（インデックス5と7）が存在するか確認
+    if df.shape[1] <= max(5, 7):
+        raise ValueError(f"Required columns missing in file: {file_path}")
 
-        # 結果をデータフレームとして返す
-        return pd.DataFrame({
-            "Section": [section_name] * len(df),
-            "F-H": df["F-H"]
-        })
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-        return None
+    # F列 - H列（0ベースでは5 - 7）を計算
+    return (df[5] - df[7]).to_numpy(dtype=float)
 
-def process_all_files(input_dir, output_file):
+def process_all_files(input_dir, output_file, max_workers=None):
     """
     フォルダ内のすべてのCSVファイルを処理し、F列-H列の結果をまとめて保存する。
 
@@ -49,31 +37,55 @@ def process_all_files(input_dir, output_file):
     input_dir : str
         入力CSVファイルが保存されているフォルダ。
     output_file : str
-        結果を保存するCSVファイルのパス。
+        結果を保存するファイルのパス（".parquet" / ".feather" の場合はカテゴリ型のまま保存する）。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
     """
-    all_data = []
-
     # 入力ディレクトリ内のすべてのCSVファイルを取得
     csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
 
-    for file_path in csv_files:
-        # 各ファイルを処理して結果を取得
-        df = process_csv(file_path)
-        if df is not None:
-            all_data.append(df)
-
-    # 全てのデータを結合して保存
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
+    # 各ファイルを並列に処理し、Section・rat・phase 付きの1つの表にまとめて保存
+    final_df = build_aggregate(csv_files, calculate_f_minus_h, "F-H", max_workers=max_workers)
+    if len(final_df):
         try:
-            final_df.to_csv(output_file, index=False)
+            save_aggregate(final_df, output_file)
             print(f"Processed results saved to {output_file}")
         except Exception as e:
             print(f"Error saving file {output_file}: {e}")
     else:
         print("No valid data processed.")
 
+def process_cycle_lengths(input_dir, output_file, timed=True, max_workers=None):
+    """
+    フォルダ内のすべての前処理後のセッションから L列のサイクル長を取り出し、F-H と同じ形の表にまとめて保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_file : str
+        結果を保存するファイルのパス（".parquet" / ".feather" の場合はカテゴリ型のまま保存する）。
+    timed : bool
+        aggregate.cycle_length_values を参照。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    csv_files = glob.glob(os.path.join(input_dir, "*_processed.csv"))
+
+    final_df = build_aggregate(csv_files, cycle_length_values, "cycle_length", timed, max_workers=max_workers)
+    if len(final_df):
+        try:
+            save_aggregate(final_df, output_file)
+            print(f"Cycle lengths saved to {output_file}")
+        except Exception as e:
+            print(f"Error saving file {output_file}: {e}")
+    else:
+        print("No valid data processed.")
+
 # 使用例
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 入力CSVファイルが保存されているフォルダ
-output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_f_h_results.csv"  # 出力ファイルのパス
-process_all_files(input_dir, output_file)
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 入力CSVファイルが保存されているフォルダ
+    output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_f_h_results.csv"  # 出力ファイルのパス
+    cycle_length_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_cycle_length_results.csv"  # サイクル長の出力ファイルのパス
+    process_all_files(input_dir, output_file)
+    process_cycle_lengths(input_dir, cycle_length_file)
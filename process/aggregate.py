@@ -0,0 +1,143 @@
+import pandas as pd
+import numpy as np
+import os
+
+from batch import run_batch, report_errors
+from catalog import PHASES, parse_name
+from waveform import load_named
+
+def column_values(file_path, column, required=None, dropna=False):
+    """
+    ヘッダー付きの CSV から1列の値を読み込む。
+
+    Parameters:
+    ----------
+    file_path : str
+        CSVファイルのパス。
+    column : str
+        読み込む列名。
+    required : str, optional
+        存在を確認する列名（None の場合は column）。
+    dropna : bool
+        True の場合は NaN を除く。
+
+    Returns:
+    -------
+    np.ndarray
+        (値の数,) の配列。
+    """
+    required = column if required is None else required
+    header = pd.read_csv(file_path, nrows=0).columns
+    if required not in header or column not in header:
+        raise ValueError(f"'{required}' column missing in file: {file_path}")
+    values = pd.read_csv(file_path, usecols=[column])[column].to_numpy(dtype=float)
+    return values[~np.isnan(values)] if dropna else values
+
+def cycle_length_values(file_path, timed=True):
+    """
+    前処理後のセッションから L列（cycle_length）のサイクル長 [フレーム] を読み込む。
+    L列はサイクルの開始行以外が " " なので、store.from_legacy で欠損値にしてから数値の行だけを返す。
+
+    Parameters:
+    ----------
+    file_path : str
+        前処理後のセッションのファイルのパス（"_processed.csv" / ".parquet" / ".feather"）。
+    timed : bool
+        waveform.load_named を参照。
+
+    Returns:
+    -------
+    np.ndarray
+        (サイクル数,) の配列。
+    """
+    return load_named(file_path, timed)["cycle_length"].dropna().to_numpy(dtype=float)
+
+def section_name(file_path):
+    """ ファイル名（拡張子なし）をセクション名とする """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def key_columns(files, lengths):
+    """
+    ファイルごとの Section・rat・date・phase を、各ファイルの行数だけ繰り返したカテゴリ型の列にする。
+    ファイル名の解析はファイルごとに1回だけで、各行にはカテゴリのコードだけを持つ。
+
+    Parameters:
+    ----------
+    files : list of str
+        ファイルのパス。
+    lengths : array-like
+        各ファイルの行数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        "Section", "rat", "date", "phase" の列を持つ表。ファイル名から読み取れない rat などは欠損値。
+    """
+    file_codes = np.repeat(np.arange(len(files), dtype=np.int32), np.asarray(lengths, dtype=np.int64))
+    sections = [section_name(f) for f in files]
+    parsed = [parse_name(f) or {} for f in files]
+
+    def categorical(labels, categories, ordered=False):
+        lookup = {c: i for i, c in enumerate(categories)}
+        per_file = np.array([lookup.get(l, -1) for l in labels], dtype=np.int32)  # -1 は欠損値
+        return pd.Categorical.from_codes(per_file[file_codes], categories=categories, ordered=ordered)
+
+    rats = [p.get("rat") for p in parsed]
+    dates = [p.get("date") for p in parsed]
+    return pd.DataFrame({
+        "Section": categorical(sections, list(dict.fromkeys(sections))),
+        "rat": categorical([f"rat{r}" if r is not None else None for r in rats],
+                           [f"rat{r}" for r in sorted(set(r for r in rats if r is not None))]),
+        "date": categorical(dates, sorted(set(d for d in dates if d is not None))),
+        "phase": categorical([p.get("phase") for p in parsed], PHASES, ordered=True),
+    })
+
+def build_aggregate(files, extract, value_name, *args, max_workers=None):
+    """
+    各ファイルから抽出した値を1つの縦長の表にまとめる。
+    値は最初に確保した1つの配列に詰め、Section・rat・phase は文字列を繰り返さずにカテゴリ型のコードで持つ。
+
+    Parameters:
+    ----------
+    files : list of str
+        入力ファイルのパス（表の行はこの順番）。
+    extract : callable
+        extract(file_path, *args) が (値の数,) の配列を返す関数（モジュールの最上位で定義しておくこと）。
+    value_name : str
+        値の列名（例: "F-H", "last_Angle", "Angular Velocity"）。
+    *args :
+        extract に追加で渡す引数。
+    max_workers : int, optional
+        ワーカープロセス数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        "Section", value_name, "rat", "date", "phase" の列を持つ表。ファイル名から読み取れない rat などは欠損値。
+    """
+    results = run_batch(extract, files, *args, max_workers=max_workers)
+    report_errors(results)
+    ok = [r for r in results if r.error is None]
+
+    lengths = np.array([len(r.result) for r in ok], dtype=np.int64)
+    values = np.empty(int(lengths.sum()), dtype=float)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    for r, start, stop in zip(ok, offsets[:-1], offsets[1:]):
+        values[start:stop] = r.result
+
+    keys = key_columns([r.item for r in ok], lengths)
+    keys.insert(1, value_name, values)
+    return keys
+
+def save_aggregate(df, output_file):
+    """
+    build_aggregate の表を保存する。".parquet" / ".feather" ならカテゴリ型のまま、それ以外は CSV。
+    """
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    if output_file.endswith(".parquet"):
+        df.to_parquet(output_file, index=False)
+    elif output_file.endswith(".feather"):
+        df.to_feather(output_file)
+    else:
+        df.to_csv(output_file, index=False)
+    return output_file
@@ -0,0 +1,90 @@
+import os
+import signal
+import threading
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# 1ファイル分の処理結果（item: 入力, result: 戻り値, error: エラー内容。成功時は None）
+BatchResult = namedtuple("BatchResult", ["item", "result", "error"])
+
+def _on_timeout(signum, frame):
+    raise TimeoutError("job timed out")
+
+def _call(func, item, args, timeout=None):
+    """
+    ワーカープロセス内で func(item, *args) を実行し、例外はトレースバック付きの文字列として返す。
+    timeout（秒）を指定した場合、それを超えると TimeoutError として打ち切る（SIGALRM が使える環境のみ）。
+    """
+    use_alarm = (timeout is not None and hasattr(signal, "setitimer")
+                 and threading.current_thread() is threading.main_thread())
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(item, *args), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+def run_batch(func, items, *args, max_workers=None, timeout=None):
+    """
+    items の各要素（通常はCSVファイルのパス）に func(item, *args) をプロセスプールで並列に適用する。
+    セッションごとの処理は独立しているので、ファイル単位で各コアに振り分ける。
+
+    Parameters:
+    ----------
+    func : callable
+        1ファイル分の処理を行う関数（別プロセスに渡すため、モジュールの最上位で定義しておくこと）。
+    items : list
+        処理対象（CSVファイルのパスなど）のリスト。
+    *args :
+        func に追加で渡す引数。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。1 の場合はプロセスを作らずに順に実行する。
+    timeout : float, optional
+        1件あたりの制限時間（秒）。超えた件は打ち切り、error に TimeoutError が入る。
+
+    Returns:
+    -------
+    list of BatchResult
+        items と同じ順番の処理結果。例外が発生したファイルは error にその内容が入る。
+    """
+    items = list(items)
+
+    if max_workers == 1 or len(items) <= 1:
+        return [BatchResult(item, *_call(func, item, args, timeout)) for item in items]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(items))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_call, func, item, args, timeout) for item in items]
+        results = []
+        for item, future in zip(items, futures):
+            try:
+                results.append(BatchResult(item, *future.result()))
+            except Exception as e:
+                # ワーカープロセス自体が落ちた場合など
+                results.append(BatchResult(item, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def report_errors(results):
+    """
+    run_batch の結果のうち、エラーになったファイルとその内容を表示する。
+
+    Parameters:
+    ----------
+    results : list of BatchResult
+        run_batch の戻り値。
+
+    Returns:
+    -------
+    int
+        エラーになったファイルの数。
+    """
+    failed = [r for r in results if r.error is not None]
+    for r in failed:
+        print(f"Error processing file {r.item}: {r.error}")
+    return len(failed)
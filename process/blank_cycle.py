@@ -1,38 +1,103 @@
 import pandas as pd
 import glob
 import os
+from functools import partial
 
-# 指定ディレクトリ内のすべてのCSVファイルを取得
-input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # CSVファイルが保存されているディレクトリのパス
-output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # 出力用ディレクトリ
-os.makedirs(output_dir, exist_ok=True)  # 出力用ディレクトリがなければ作成
+from batch import report_errors
+from cache import run_cached_stage
 
-csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+def add_time_column(df, l_col_index=10, fps=60):
+    """
+    L列（旧K列: インデックス10）を -1 して fps で割った時間 [s] を、新しいA列として先頭に追加する。
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
-    
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム。
+    l_col_index : int
+        計算に使う列のインデックス（0ベース）。
+    fps : float
+        フレームレート。
+
+    Returns:
+    -------
+    pd.DataFrame
+        A列を追加し、列番号を 0 から振り直したデータフレーム。
+    """
+    df.insert(0, 'A', (df.iloc[:, l_col_index] - 1) / fps)
+
+    # 保存して読み直したときと同じく、列番号を 0 から振り直す
+    df.columns = range(df.shape[1])
+    return df
+
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data_with_a_column.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_with_a_column.csv")
+
+def process_file(file_path, output_dir):
+    """
+    1つのCSVファイルにA列を追加し、"_with_a_column.csv" として保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+    output_dir : str
+        出力用ディレクトリ。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
     # CSVを読み込む（ヘッダーなし、0ベースのインデックスで処理）
     df = pd.read_csv(file_path, header=None)
-    
+
     # L列（旧K列: インデックス10）をもとに計算
     l_col_index = 10  # L列 (0ベースインデックス)
     if l_col_index >= df.shape[1]:
-        print(f"Error: L列(インデックス{l_col_index}）が存在しません。スキップします。")
-        continue
+        raise ValueError(f"L列(インデックス{l_col_index}）が存在しません。")
 
     # 新しいA列を作成（L列を-1して60で割る計算結果を追加）
-    df.insert(0, 'A', (df.iloc[:, l_col_index] - 1) / 60)
+    df = add_time_column(df, l_col_index)
 
     # 出力ファイル名を作成（例: "data.csv" → "data_with_a_column.csv"）
-    base_name = os.path.splitext(os.path.basename(file_path))[0]
-    new_file_name = f"{base_name}_with_a_column.csv"
-    output_path = os.path.join(output_dir, new_file_name)
+    output_path = output_path_for(file_path, output_dir)
 
     # CSVを保存（ヘッダーなし、インデックスなし）
     df.to_csv(output_path, index=False, header=False)
-    print(f"Saved to: {output_path}\n")
+    return output_path
+
+def process_all_files(input_dir, output_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、
+    A列を追加して "_with_a_column.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        CSVファイルが保存されているディレクトリのパス。
+    output_dir : str
+        出力用ディレクトリ。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    os.makedirs(output_dir, exist_ok=True)  # 出力用ディレクトリがなければ作成
 
-print("All files processed successfully.")
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
 
+    results = run_cached_stage(process_file, csv_files, partial(output_path_for, output_dir=output_dir), "blank_cycle",
+                               {"l_col_index": 10, "fps": 60}, output_dir, output_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
 
+# 使用例
+if __name__ == "__main__":
+    # 指定ディレクトリ内のすべてのCSVファイルを取得
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # CSVファイルが保存されているディレクトリのパス
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # 出力用ディレクトリ
+    process_all_files(input_dir, output_dir)
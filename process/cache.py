@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+
+from batch import BatchResult, run_batch
+
+# 各フォルダに置くキャッシュの記録ファイル（"*.csv" の glob に引っかからない名前にする）
+MANIFEST_NAME = ".cache_manifest.json"
+
+def file_hash(file_path, chunk_size=1 << 20):
+    """
+    ファイルの内容の SHA-256 ハッシュを計算する。
+
+    Parameters:
+    ----------
+    file_path : str
+        ファイルのパス。
+    chunk_size : int
+        一度に読み込むバイト数。
+
+    Returns:
+    -------
+    str
+        16進数のハッシュ値。
+    """
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def params_hash(params):
+    """ パラメータの辞書からハッシュ値を作る（キーの順番には依存しない） """
+    text = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def load_manifest(manifest_path):
+    """
+    キャッシュの記録ファイルを読み込む。存在しない・壊れている場合は空の記録を返す。
+
+    Parameters:
+    ----------
+    manifest_path : str
+        記録ファイルのパス。
+
+    Returns:
+    -------
+    dict
+        "<段階名>:<入力ファイル名>" -> 記録 の辞書。
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest, manifest_path):
+    """ キャッシュの記録ファイルを保存する（途中で落ちても壊れないよう一時ファイル経由で置き換える） """
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def extra_inputs_hash(paths):
+    """
+    入力ファイル以外に処理結果を左右するファイル（例: .h5 に対応する接地フラグの CSV）の内容のハッシュ。
+    存在しないファイルも「無い」こととして区別する（後から置かれた場合に再計算される）。
+
+    Parameters:
+    ----------
+    paths : list of str
+        ファイルのパス。
+
+    Returns:
+    -------
+    str
+        16進数のハッシュ値。
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.abspath(path).encode("utf-8"))
+        h.update((file_hash(path) if os.path.exists(path) else "missing").encode("utf-8"))
+    return h.hexdigest()
+
+def _entry_key(stage, input_path):
+    return f"{stage}:{os.path.abspath(input_path)}"
+
+def _stat(file_path):
+    st = os.stat(file_path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _output_paths(output_path):
+    """ 出力のパス（1つのパス、または複数のパスのタプル）をパスのリストにする """
+    return [output_path] if isinstance(output_path, str) else list(output_path)
+
+def _output_stats(paths):
+    """ 2つ目以降の出力の [絶対パス, [サイズ, 更新時刻]] のリスト（記録ファイルに保存する形） """
+    return [[os.path.abspath(p), _stat(p)] for p in paths]
+
+def current_input_hash(manifest, stage, input_path):
+    """
+    入力ファイルのハッシュを返す。サイズと更新時刻が前回と同じなら、記録済みのハッシュを使い回す。
+    """
+    entry = manifest.get(_entry_key(stage, input_path))
+    if entry is not None and entry["input_stat"] == _stat(input_path):
+        return entry["input_hash"]
+    return file_hash(input_path)
+
+def is_up_to_date(manifest, stage, params, input_path, output_path, input_hash=None, extra_hash=None):
+    """
+    前回と同じ入力内容・同じパラメータで作られた出力が残っているかを調べる。
+
+    Parameters:
+    ----------
+    manifest : dict
+        load_manifest の戻り値。
+    stage : str
+        処理段階の名前（例: "angle"）。
+    params : dict
+        処理のパラメータ。
+    input_path : str
+        入力ファイルのパス。
+    output_path : str or tuple of str
+        出力ファイルのパス（1つの入力から複数のファイルを作る場合はタプル。どれかが消えたり変わったりしたら再計算する）。
+    input_hash : str, optional
+        計算済みの入力のハッシュ。
+    extra_hash : str, optional
+        入力以外のファイルのハッシュ（extra_inputs_hash）。
+
+    Returns:
+    -------
+    bool
+        再計算が不要なら True。
+    """
+    entry = manifest.get(_entry_key(stage, input_path))
+    paths = _output_paths(output_path)
+    if entry is None or not all(os.path.exists(p) for p in paths):
+        return False
+    if input_hash is None:
+        input_hash = current_input_hash(manifest, stage, input_path)
+    return (entry["input_hash"] == input_hash
+            and entry["params_hash"] == params_hash(params)
+            and entry.get("extra_hash") == extra_hash
+            and entry["output"] == os.path.abspath(paths[0])
+            and entry["output_stat"] == _stat(paths[0])
+            and entry.get("extra_outputs", []) == _output_stats(paths[1:]))
+
+def record(manifest, stage, params, input_path, output_path, input_hash, extra_hash=None):
+    """
+    処理が終わった入力と出力の組を、出力がどの段階を経て作られたか（lineage）と共に記録する。
+    output_path が複数のパスのタプルの場合は、2つ目以降も "extra_outputs" に記録する。
+    """
+    lineage = output_lineage(manifest).get(os.path.abspath(input_path), [])
+    paths = _output_paths(output_path)
+    manifest[_entry_key(stage, input_path)] = {
+        "stage": stage,
+        "lineage": lineage + [stage],
+        "input_hash": input_hash,
+        "input_stat": _stat(input_path),
+        "params_hash": params_hash(params),
+        "extra_hash": extra_hash,
+        "output": os.path.abspath(paths[0]),
+        "output_stat": _stat(paths[0]),
+        "extra_outputs": _output_stats(paths[1:]),
+    }
+
+def output_lineage(manifest):
+    """ 記録済みの出力ファイル（2つ目以降の出力も含む）の絶対パス -> それを作るまでに通った段階のリスト """
+    lineage = {}
+    for entry in manifest.values():
+        for output in [entry["output"]] + [path for path, _ in entry.get("extra_outputs", [])]:
+            lineage[output] = entry.get("lineage", [entry["stage"]])
+    return lineage
+
+def derived_outputs(manifest, stage):
+    """ 指定した段階の出力、およびそれをもとに作られたファイルの絶対パスの集合 """
+    return {output for output, lineage in output_lineage(manifest).items() if stage in lineage}
+
+def run_cached_stage(func, csv_files, output_path_for, stage, params, manifest_dir, *args, max_workers=None,
+                     extra_inputs_for=None):
+    """
+    入力の内容・段階名・パラメータが前回から変わったファイルだけを run_batch で処理する。
+    上流の出力が変わると下流の入力のハッシュも変わるので、古い出力は自動的に作り直される。
+
+    Parameters:
+    ----------
+    func : callable
+        1ファイル分の処理関数（run_batch と同じく func(file_path, *args) の形で呼ばれる）。
+    csv_files : list of str
+        入力ファイルのリスト。この段階が以前に書き出したファイルとそれをもとに作られたファイルは自動的に除外する。
+    output_path_for : callable
+        入力ファイルのパスから出力ファイルのパス（複数の場合はタプル, is_up_to_date を参照）を返す関数。
+        func はこれと同じパス（またはタプル）を返すこと。
+    stage : str
+        処理段階の名前。
+    params : dict
+        処理のパラメータ（変わると再計算される）。
+    manifest_dir : str
+        記録ファイルを置くフォルダ（通常は出力先フォルダ）。
+    *args :
+        func に追加で渡す引数。
+    max_workers : int, optional
+        ワーカープロセス数。
+    extra_inputs_for : callable, optional
+        入力ファイルのパスから、処理結果を左右する他のファイルのパスのリストを返す関数
+        （それらの内容が変わった場合・置かれた場合も再計算する）。
+
+    Returns:
+    -------
+    list of BatchResult
+        除外後の入力ファイルと同じ順番の処理結果。再計算しなかったファイルは result に出力ファイルのパスが入る。
+    """
+    manifest_path = os.path.join(manifest_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    # この段階自身の出力（とそれをもとに作られたファイル）を再び入力として処理しない
+    outputs = derived_outputs(manifest, stage)
+    csv_files = [f for f in csv_files if os.path.abspath(f) not in outputs]
+
+    # 入力が消えた記録は削除する
+    for key, entry in list(manifest.items()):
+        if entry["stage"] == stage and not os.path.exists(key.split(":", 1)[1]):
+            print(f"Input removed, dropping cache entry: {entry['output']}")
+            del manifest[key]
+
+    input_hashes = {f: current_input_hash(manifest, stage, f) for f in csv_files}
+    extra_hashes = {f: extra_inputs_hash(extra_inputs_for(f)) if extra_inputs_for is not None else None
+                    for f in csv_files}
+    stale = [f for f in csv_files
+             if not is_up_to_date(manifest, stage, params, f, output_path_for(f), input_hashes[f], extra_hashes[f])]
+    print(f"{stage}: {len(csv_files) - len(stale)} up to date, {len(stale)} to process")
+
+    new_results = {r.item: r for r in run_batch(func, stale, *args, max_workers=max_workers)}
+
+    results = []
+    for f in csv_files:
+        if f in new_results:
+            r = new_results[f]
+            if r.error is None and r.result is not None:
+                record(manifest, stage, params, f, r.result, input_hashes[f], extra_hashes[f])
+            results.append(r)
+        else:
+            results.append(BatchResult(f, output_path_for(f), None))
+
+    save_manifest(manifest, manifest_path)
+    return results
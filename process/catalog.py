@@ -0,0 +1,190 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+
+from store import load_session, save_session
+
+# セッションのファイル名（例: "rat8_1106pre_3_processed.csv" → rat=8, date="1106", phase="pre", trial=3, stage="processed"）
+FILENAME_PATTERN = re.compile(r"^rat(?P<rat>\d+)_(?P<date>\d{4})(?P<phase>pre|propet|post)_(?P<trial>\d+)(?:_(?P<stage>.+))?$")
+
+# 条件の順番
+PHASES = ["pre", "propet", "post"]
+
+# 索引に使う列（folder は走査したフォルダからの相対パス。cut.py などは同じファイル名を別のフォルダに書き出すので区別する）
+KEYS = ["rat", "date", "phase", "trial", "stage", "folder", "extension"]
+
+# 対象とする拡張子
+EXTENSIONS = (".csv", ".parquet", ".feather", ".h5", ".npz")
+
+def parse_name(file_path):
+    """
+    ファイル名からラット番号・日付・条件・試行番号・処理段階を取り出す。
+
+    Parameters:
+    ----------
+    file_path : str
+        ファイルのパス。
+
+    Returns:
+    -------
+    dict or None
+        "rat", "date", "phase", "trial", "stage"（処理段階の接尾辞がなければ ""）の辞書。形式が違う場合は None。
+    """
+    match = FILENAME_PATTERN.match(os.path.splitext(os.path.basename(file_path))[0])
+    if match is None:
+        return None
+    return {
+        "rat": int(match.group("rat")),
+        "date": match.group("date"),
+        "phase": match.group("phase"),
+        "trial": int(match.group("trial")),
+        "stage": match.group("stage") or "",
+    }
+
+def subject_name(rat, date):
+    """ ラット番号と日付から被験体の名前を返す（例: 8, "1106" → "rat8_1106"） """
+    return f"rat{rat}_{date}"
+
+class SessionCatalog:
+    """
+    データフォルダ内のセッションのファイルの一覧。ファイル名を1回だけ解析し、
+    (rat, date, phase, trial, stage, folder, extension) の索引で引けるようにする（ファイルごとの glob や文字列の判定をしない）。
+
+    Attributes:
+    ----------
+    table : pd.DataFrame
+        1行1ファイルの表（"path" と KEYS の列。phase・stage はカテゴリ型。extension は ".csv" などの拡張子）。
+    """
+
+    def __init__(self, table):
+        table = table.copy()
+        if "folder" not in table:
+            table["folder"] = ""  # folder の列が無い古い一覧
+        table["extension"] = [os.path.splitext(p)[1] for p in table["path"]]
+        table["phase"] = pd.Categorical(table["phase"], categories=PHASES, ordered=True)
+        table["stage"] = table["stage"].astype("category")
+        self.table = table.sort_values(["rat", "date", "phase", "trial", "stage", "folder", "extension",
+                                        "path"]).reset_index(drop=True)
+        self._index = {key: rows for key, rows in
+                       self.table.groupby(KEYS, observed=True, sort=False).indices.items()}
+        self._extensions = sorted(self.table["extension"].unique())
+
+    @classmethod
+    def scan(cls, root, extensions=EXTENSIONS, recursive=False):
+        """
+        フォルダを1回だけ走査して一覧を作る。
+
+        Parameters:
+        ----------
+        root : str
+            データのフォルダ。
+        extensions : tuple of str
+            対象とする拡張子。
+        recursive : bool
+            True の場合はサブフォルダも走査する。同じファイル名が別のフォルダにある場合
+            （例: "cycle/processed" と "processed/cut"）は folder で区別するので、query / get で folder を指定すること。
+
+        Returns:
+        -------
+        SessionCatalog
+            ファイル名の形式に合うファイルの一覧。
+        """
+        rows = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            if not recursive:
+                dirnames.clear()
+            folder = os.path.relpath(dirpath, root).replace(os.sep, "/")
+            folder = "" if folder == "." else folder
+            for name in filenames:
+                if not name.endswith(extensions):
+                    continue
+                parsed = parse_name(name)
+                if parsed is not None:
+                    rows.append(dict(parsed, folder=folder, path=os.path.join(dirpath, name)))
+        if not rows:
+            return cls(pd.DataFrame({"path": [], "rat": [], "date": [], "phase": [], "trial": [], "stage": [],
+                                     "folder": []}))
+        return cls(pd.DataFrame(rows, columns=["path"] + KEYS))
+
+    @classmethod
+    def load(cls, path):
+        """ save で保存した一覧を読み込む """
+        return cls(load_session(path))
+
+    def save(self, path):
+        """ 一覧を Parquet（".feather" なら Feather）で保存する """
+        table = self.table.copy()
+        table["phase"] = table["phase"].astype(str)
+        table["stage"] = table["stage"].astype(str)
+        save_session(table, path)
+        return path
+
+    def __len__(self):
+        return len(self.table)
+
+    def query(self, rat=None, date=None, phase=None, trial=None, stage=None, extension=None, folder=None):
+        """
+        条件に合うファイルの行を返す。各条件は値または値のリスト（None の場合は絞り込まない）。
+        folder は走査したフォルダからの相対パス（"/" 区切り, 走査したフォルダ自身は ""）。
+
+        使用例:
+            catalog.query(rat=10, phase="propet", stage="processed", folder="scatter/modify/cycle/processed/cut")
+
+        Returns:
+        -------
+        pd.DataFrame
+            条件に合う行（rat, date, phase, trial, stage の順に並ぶ）。
+        """
+        mask = np.ones(len(self.table), dtype=bool)
+        for column, value in (("rat", rat), ("date", date), ("phase", phase), ("trial", trial), ("stage", stage),
+                              ("folder", folder)):
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.table[column].isin(values).to_numpy()
+        if extension is not None:
+            extensions = extension if isinstance(extension, (list, tuple, set)) else [extension]
+            mask &= self.table["extension"].isin(extensions).to_numpy()
+        return self.table[mask]
+
+    def paths(self, **conditions):
+        """ query の条件に合うファイルのパスのリスト """
+        return self.query(**conditions)["path"].tolist()
+
+    def get(self, rat, date, phase, trial, stage="", folder="", extension=None):
+        """
+        1つのファイルのパスを索引で引く（folder は query を参照。既定は走査したフォルダ自身）。
+        同じセッションの CSV と Parquet / Feather が並んでいる場合は extension（例: ".csv"）で選ぶ
+        （None の場合は拡張子で絞り込まない）。
+
+        Returns:
+        -------
+        str or None
+            ファイルのパス（無い場合は None、複数ある場合は ValueError）。
+        """
+        extensions = self._extensions if extension is None else [extension]
+        found = [self._index.get((rat, date, phase, trial, stage, folder, e)) for e in extensions]
+        rows = [row for r in found if r is not None for row in r]
+        if not rows:
+            return None
+        if len(rows) > 1:
+            raise ValueError(f"Multiple files for {subject_name(rat, date)}{phase}_{trial}_{stage} in '{folder}': "
+                             f"{self.table['path'].iloc[rows].tolist()}")
+        return self.table["path"].iloc[rows[0]]
+
+    def subjects(self, **conditions):
+        """
+        条件に合う (rat, date) の組をラット番号・日付の順に返す
+        （例: [(8, "1106"), (9, "1106"), (10, "1102"), ...]）。
+        """
+        table = self.query(**conditions)
+        return list(table[["rat", "date"]].drop_duplicates().itertuples(index=False, name=None))
+
+# 使用例
+if __name__ == "__main__":
+    root = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki'  # データのフォルダ
+    catalog = SessionCatalog.scan(root, recursive=True)
+    catalog.save(os.path.join(root, "catalog.parquet"))
+    # cut 前（scatter/modify/cycle/processed）と cut 後は同じファイル名なので、フォルダで選ぶ
+    print(catalog.query(rat=10, phase="propet", stage="processed", folder="scatter/modify/cycle/processed/cut"))
@@ -0,0 +1,269 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+from batch import report_errors
+from cache import run_cached_stage
+from cycle import find_runs
+
+# modify.py の前（DeepLabCut の CSV）での各キーポイントの x, y の列インデックス
+# （modify.py が列 0~5 を削除した後の wrist / elbow / shoulder の列 0~5 に当たる）
+KEYPOINT_COLUMNS = {"wrist": (6, 7), "elbow": (8, 9), "shoulder": (10, 11)}
+
+# 既定のパラメータ
+LIKELIHOOD_THRESHOLD = 0.6  # DeepLabCut の pcutoff の既定値
+MAX_GAP = 5  # 補間で埋める欠損の最大フレーム数
+FPS = 60
+
+def mask_low_likelihood(xy, likelihood, threshold=LIKELIHOOD_THRESHOLD):
+    """
+    尤度が閾値未満の点を NaN にする。
+
+    Parameters:
+    ----------
+    xy : np.ndarray
+        (フレーム数, キーポイント数, 2) の座標。
+    likelihood : np.ndarray
+        (フレーム数, キーポイント数) の DeepLabCut の尤度。
+    threshold : float
+        閾値。
+
+    Returns:
+    -------
+    np.ndarray
+        尤度の低い点を NaN にした座標（コピー）。
+    """
+    xy = np.array(xy, dtype=float)
+    xy[np.asarray(likelihood) < threshold] = np.nan
+    return xy
+
+def reject_velocity_outliers(xy, max_speed, fps=FPS):
+    """
+    前後のフレームとの間の速さがどちらも max_speed を超える点（1〜数フレームだけ飛んだ誤検出）を NaN にする。
+    前後のどちらかが欠損している場合は、残った側の速さだけで判定する。
+
+    Parameters:
+    ----------
+    xy : np.ndarray
+        (フレーム数, キーポイント数, 2) の座標。
+    max_speed : float
+        許容する最大の速さ [px/s]。
+    fps : float
+        フレームレート。
+
+    Returns:
+    -------
+    np.ndarray
+        外れ値を NaN にした座標（コピー）。
+    """
+    xy = np.array(xy, dtype=float)
+    speed = np.sqrt(np.sum(np.diff(xy, axis=0)**2, axis=-1)) * fps  # (フレーム数 - 1, キーポイント数)
+    nan_row = np.full((1, xy.shape[1]), np.nan)
+    speed_in = np.concatenate([nan_row, speed])
+    speed_out = np.concatenate([speed, nan_row])
+
+    fast_in = speed_in > max_speed
+    fast_out = speed_out > max_speed
+    outlier = (fast_in & (fast_out | np.isnan(speed_out))) | (np.isnan(speed_in) & fast_out)
+    xy[outlier] = np.nan
+    return xy
+
+def fill_gaps(values, max_gap=MAX_GAP):
+    """
+    前後を有効な値に挟まれた、長さ max_gap フレーム以下の欠損だけを線形補間で埋める。
+    それより長い欠損や先頭・末尾の欠損は NaN のまま残す。
+
+    Parameters:
+    ----------
+    values : np.ndarray
+        (フレーム数, 列数) または (フレーム数,) の配列。
+    max_gap : int
+        補間する欠損の最大フレーム数。
+
+    Returns:
+    -------
+    np.ndarray
+        欠損を埋めた配列（コピー）。
+    """
+    values = np.array(values, dtype=float)
+    flat = values.reshape(len(values), -1)
+    n = len(flat)
+    index = np.arange(n)
+
+    for j in range(flat.shape[1]):
+        col = flat[:, j]
+        missing = np.isnan(col)
+        if not missing.any() or missing.all():
+            continue
+
+        # 各フレームが属する欠損区間の長さと、その区間が前後を有効な値に挟まれているか
+        starts, lengths = find_runs(missing)
+        run_missing = missing[starts]
+        inside = (starts > 0) & (starts + lengths < n)
+        fillable_run = run_missing & inside & (lengths <= max_gap)
+        fillable = np.repeat(fillable_run, lengths)
+
+        if fillable.any():
+            col[fillable] = np.interp(index[fillable], index[~missing], col[~missing])
+
+    return flat.reshape(values.shape)
+
+def smooth(values, method="savgol", window=7, polyorder=2):
+    """
+    全列をまとめて Savitzky-Golay フィルタまたはメディアンフィルタで平滑化する。
+    欠損を含む場合は、欠損で区切られた区間ごとに平滑化する（window より短い区間はそのまま）。
+
+    Parameters:
+    ----------
+    values : np.ndarray
+        (フレーム数, 列数) または (フレーム数,) の配列。
+    method : str
+        "savgol" または "median"。
+    window : int
+        窓の長さ（奇数）。
+    polyorder : int
+        Savitzky-Golay フィルタの多項式の次数。
+
+    Returns:
+    -------
+    np.ndarray
+        平滑化した配列。
+    """
+    from scipy.signal import savgol_filter
+    from scipy.ndimage import median_filter
+
+    def apply(block):
+        if method == "savgol":
+            return savgol_filter(block, window, polyorder, axis=0)
+        if method == "median":
+            return median_filter(block, size=(window,) + (1,) * (block.ndim - 1), mode="nearest")
+        raise ValueError(f"Unknown smoothing method: {method}")
+
+    values = np.array(values, dtype=float)
+    if not np.isnan(values).any():
+        return apply(values)  # 欠損がなければ全列を1回で処理する
+
+    flat = values.reshape(len(values), -1)
+    for j in range(flat.shape[1]):
+        starts, lengths = find_runs(np.isnan(flat[:, j]))
+        for s, length in zip(starts, lengths):
+            if length >= window and not np.isnan(flat[s, j]):
+                flat[s:s + length, j] = apply(flat[s:s + length, j])
+    return flat.reshape(values.shape)
+
+def clean_coordinates(xy, likelihood=None, threshold=LIKELIHOOD_THRESHOLD, max_speed=None, fps=FPS,
+                      max_gap=MAX_GAP, smoothing=None, window=7, polyorder=2):
+    """
+    キーポイントの座標に 尤度によるマスク → 速度による外れ値除去 → 短い欠損の補間 → 平滑化 を順に適用する。
+
+    Parameters:
+    ----------
+    xy : np.ndarray
+        (フレーム数, キーポイント数, 2) の座標。
+    likelihood : np.ndarray, optional
+        (フレーム数, キーポイント数) の尤度。None の場合はマスクしない。
+    threshold : float
+        尤度の閾値。
+    max_speed : float, optional
+        許容する最大の速さ [px/s]。None の場合は外れ値除去をしない。
+    fps : float
+        フレームレート。
+    max_gap : int
+        補間する欠損の最大フレーム数（0 の場合は補間しない）。
+    smoothing : str, optional
+        "savgol" または "median"。None の場合は平滑化しない。
+    window, polyorder : int
+        smooth を参照。
+
+    Returns:
+    -------
+    np.ndarray
+        処理後の座標。
+    """
+    xy = np.array(xy, dtype=float)
+    if likelihood is not None:
+        xy = mask_low_likelihood(xy, likelihood, threshold)
+    if max_speed is not None:
+        xy = reject_velocity_outliers(xy, max_speed, fps)
+
+    n_frames, n_keypoints = xy.shape[:2]
+    flat = xy.reshape(n_frames, n_keypoints * 2)
+    if max_gap > 0:
+        flat = fill_gaps(flat, max_gap)
+    if smoothing is not None:
+        flat = smooth(flat, smoothing, window, polyorder)
+    return flat.reshape(xy.shape)
+
+def clean_dataframe(df, likelihood=None, keypoint_columns=KEYPOINT_COLUMNS, **params):
+    """
+    modify.py の前の DeepLabCut の CSV（ヘッダーなし）のキーポイント座標を clean_coordinates で処理する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだ DeepLabCut の CSV。
+    likelihood : np.ndarray, optional
+        (フレーム数, キーポイント数) の尤度（keypoint_columns と同じ順番）。
+    keypoint_columns : dict
+        キーポイント名 -> (x の列, y の列)。
+    **params :
+        clean_coordinates に渡すパラメータ。
+
+    Returns:
+    -------
+    pd.DataFrame
+        座標の列を置き換えたデータフレーム。
+    """
+    columns = [c for pair in keypoint_columns.values() for c in pair]
+    xy = df.iloc[:, columns].to_numpy(dtype=float).reshape(len(df), len(keypoint_columns), 2)
+    cleaned = clean_coordinates(xy, likelihood, **params)
+
+    df = df.copy()
+    df[df.columns[columns]] = cleaned.reshape(len(df), -1)
+    return df
+
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data.csv"）を返す（modify.py 以降はそのまま使える） """
+    return os.path.join(output_dir, os.path.basename(file_path))
+
+def process_file(file_path, output_dir, params):
+    """ 1つのCSVファイルのキーポイント座標を処理し、output_dir に同じファイル名で保存する """
+    df = clean_dataframe(pd.read_csv(file_path, header=None), **params)
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = output_path_for(file_path, output_dir)
+    df.to_csv(output_file, index=False, header=False)
+    return output_file
+
+def process_all_files(input_dir, output_dir, max_workers=None, **params):
+    """
+    フォルダ内の DeepLabCut の CSV のうち、前回の処理から変わったものだけを処理して output_dir に保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_dir : str
+        出力先のフォルダ（modify.py / pipeline.py の入力フォルダとして使う）。
+    max_workers : int, optional
+        ワーカープロセス数。
+    **params :
+        clean_coordinates に渡すパラメータ（例: max_speed=3000, max_gap=5, smoothing="savgol"）。
+    """
+    if os.path.abspath(input_dir) == os.path.abspath(output_dir):
+        raise ValueError("output_dir must differ from input_dir (cleaned files keep the original names)")
+    os.makedirs(output_dir, exist_ok=True)
+    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+
+    results = run_cached_stage(process_file, csv_files, lambda f: output_path_for(f, output_dir), "clean", params,
+                               output_dir, output_dir, params, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to {r.result}")
+    report_errors(results)
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter'  # DeepLabCut から書き出した CSV のフォルダ
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # modify.py / pipeline.py の入力フォルダ
+    process_all_files(input_dir, output_dir, max_speed=3000, max_gap=5, smoothing="savgol")
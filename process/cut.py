@@ -1,6 +1,34 @@
 import pandas as pd
 import os
 import glob
+from functools import partial
+
+from batch import report_errors
+from cache import run_cached_stage
+
+def drop_last_rows(df, n_rows=4):
+    """
+    データフレームの下 n_rows 行を削除する（行数が n_rows 以下ならそのまま返す）。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        対象のデータフレーム。
+    n_rows : int
+        削除する行数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        下 n_rows 行を削除したデータフレーム。
+    """
+    if len(df) > n_rows:
+        df = df.iloc[:-n_rows]
+    return df
+
+def output_path_for(input_file, output_dir):
+    """ 出力ファイルのパス（output_dir 内の同じファイル名）を返す """
+    return os.path.join(output_dir, os.path.basename(input_file))
 
 def remove_last_4_rows(input_file, output_dir):
     """
@@ -12,29 +40,54 @@ def remove_last_4_rows(input_file, output_dir):
         入力CSVファイルのパス。
     output_dir : str
         出力ディレクトリ。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
     """
     # CSVファイルを読み込む
     df = pd.read_csv(input_file, header=None)
 
     # 下4行を削除
-    if len(df) > 4:
-        df = df.iloc[:-4]
+    df = drop_last_rows(df, 4)
 
     # 保存先ファイル名の生成
     os.makedirs(output_dir, exist_ok=True)
-    base_name = os.path.basename(input_file)
-    output_file = os.path.join(output_dir, base_name)
+    output_file = output_path_for(input_file, output_dir)
 
     # 処理後のデータを保存
     df.to_csv(output_file, index=False, header=False)
-    print(f"Processed file saved to {output_file}")
+    return output_file
+
+def process_all_files(input_dir, output_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、下4行を削除して保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        処理対象のCSVファイルが入ったフォルダ。
+    output_dir : str
+        処理後のCSVファイルを保存するフォルダ。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
 
-# 入力ディレクトリと出力ディレクトリ
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed"  # 処理対象のCSVファイルが入ったフォルダ
-output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 処理後のCSVファイルを保存するフォルダ
+    # ディレクトリ内のすべてのCSVファイルを処理
+    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
 
-# ディレクトリ内のすべてのCSVファイルを処理
-csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+    results = run_cached_stage(remove_last_4_rows, csv_files, partial(output_path_for, output_dir=output_dir), "cut",
+                               {"n_rows": 4}, output_dir, output_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Processed file saved to {r.result}")
+    report_errors(results)
 
-for csv_file in csv_files:
-    remove_last_4_rows(csv_file, output_dir)
+# 使用例
+if __name__ == "__main__":
+    # 入力ディレクトリと出力ディレクトリ
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed"  # 処理対象のCSVファイルが入ったフォルダ
+    output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 処理後のCSVファイルを保存するフォルダ
+    process_all_files(input_dir, output_dir)
@@ -3,74 +3,241 @@ import numpy as np
 import glob
 import os
 
-def process_csv(file_path):
-    # ヘッダーなしで読み込む
-    df = pd.read_csv(file_path, header=None)
-    
-    # 列数確認（最低限 H 列 (列インデックス 7) 必要）
-    if df.shape[1] < 8:
-        print(f"Error: {file_path} has fewer than 8 columns. Skipping.")
-        return None
-    
-    # K列 (列インデックス 10)
-    K = [1]  # K1 は 1
-    for i in range(1, len(df)):
-        if df.iloc[i - 1, 7] == 0 and (i < len(df) - 1 and df.iloc[i, 7] == 1):
-            K.append(1)
-        else:
-            K.append(K[-1] + 1 if i > 0 else 1)
-    
-    # L列 (列インデックス 11)
-    L = []
-    for i in range(len(K)):
-        if i < len(K) - 1 and K[i + 1] == 1:
-            L.append(K[i])
-        else:
-            L.append(" ")
-    
-    # M列 (列インデックス 12)
-    M = [1]  # M1 は 1
-    for i in range(1, len(df)):
-        if df.iloc[i, 7] != df.iloc[i - 1, 7]:
-            M.append(1)
-        else:
-            M.append(M[-1] + 1 if i > 0 else 1)
-    
-    # N列 (列インデックス 13)
-    N = []
-    for i in range(len(M)):
-        if i < len(M) - 1 and M[i + 1] == 1:
-            N.append(M[i])
-        else:
-            N.append(" ")
-    
+from functools import partial
+
+from batch import report_errors
+from cache import run_cached_stage
+
+def find_runs(values):
+    """
+    配列を同じ値が続く区間（ラン）に分割する（ランレングス符号化）。
+    NaN は前後の値と常に異なるものとして扱う。
+
+    Parameters:
+    ----------
+    values : array-like
+        1次元配列（接地フラグなど）。
+
+    Returns:
+    -------
+    starts : np.ndarray
+        各ランの開始フレーム。
+    lengths : np.ndarray
+        各ランの長さ。
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    change = np.ones(n, dtype=bool)
+    change[1:] = values[1:] != values[:-1]
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, n))
+    return starts, lengths
+
+def find_cycle_starts(contact):
+    """
+    接地フラグの 0→1 の切り替わり（サイクルの開始）を検出する。
+    process_csv の K 列と同じく、最後のフレームは開始とみなさない。
+
+    Parameters:
+    ----------
+    contact : array-like
+        接地フラグ（H列, 列インデックス 7）。
+
+    Returns:
+    -------
+    np.ndarray
+        サイクル開始フレームのインデックス。
+    """
+    contact = np.asarray(contact)
+    is_start = np.zeros(len(contact), dtype=bool)
+    is_start[1:-1] = (contact[:-2] == 0) & (contact[1:-1] == 1)
+    return np.flatnonzero(is_start)
+
+def _count_from(n, starts):
+    """ starts の位置で 1 に戻り、それ以外は 1 ずつ増えるカウンタを作る """
+    reset = np.zeros(n, dtype=bool)
+    reset[0] = True
+    reset[starts] = True
+    index = np.arange(n)
+    return index - np.maximum.accumulate(np.where(reset, index, 0)) + 1
+
+def _last_counts(counter, starts):
+    """ 次のフレームでカウンタが 1 に戻るフレームだけカウンタの値を残し、それ以外は " " にする """
+    last = np.full(len(counter), " ", dtype=object)
+    ends = starts[starts > 0] - 1
+    last[ends] = counter[ends].tolist()
+    return last
+
+def compute_cycle_columns(contact):
+    """
+    接地フラグから K/L/M/N 列をまとめて計算する。
+
+    K : サイクル開始（0→1）からのフレーム数（1始まり）
+    L : サイクル最終フレームにおける K の値（それ以外は " "）
+    M : 接地/遊脚の各相の開始からのフレーム数（1始まり）
+    N : 各相の最終フレームにおける M の値（それ以外は " "）
+
+    Parameters:
+    ----------
+    contact : array-like
+        接地フラグ（H列, 列インデックス 7）。
+
+    Returns:
+    -------
+    tuple of np.ndarray
+        (K, L, M, N)
+    """
+    contact = np.asarray(contact)
+    n = len(contact)
+
+    cycle_starts = find_cycle_starts(contact)
+    K = _count_from(n, cycle_starts)
+    L = _last_counts(K, cycle_starts)
+
+    phase_starts, _ = find_runs(contact)
+    M = _count_from(n, phase_starts)
+    N = _last_counts(M, phase_starts)
+
+    return K, L, M, N
+
+def cycle_table(contact):
+    """
+    接地フラグから完全なサイクル（0→1 から次の 0→1 の直前まで）の一覧を作る。
+
+    Parameters:
+    ----------
+    contact : array-like
+        接地フラグ（H列, 列インデックス 7）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        サイクルごとの開始フレーム、終了フレーム、サイクル長、接地期長、遊脚期長。
+    """
+    contact = np.asarray(contact)
+    starts = find_cycle_starts(contact)
+    if len(starts) < 2:
+        return pd.DataFrame({
+            "start_frame": np.zeros(0, dtype=int),
+            "end_frame": np.zeros(0, dtype=int),
+            "cycle_length": np.zeros(0, dtype=int),
+            "stance_length": np.zeros(0, dtype=int),
+            "swing_length": np.zeros(0, dtype=int),
+        })
+
+    ends = starts[1:] - 1
+    starts = starts[:-1]
+
+    # 累積和の差で各サイクル内の接地・遊脚フレーム数を数える
+    stance_count = np.concatenate(([0], np.cumsum(contact == 1)))
+    swing_count = np.concatenate(([0], np.cumsum(contact == 0)))
+    stance = stance_count[ends + 1] - stance_count[starts]
+    swing = swing_count[ends + 1] - swing_count[starts]
+
+    return pd.DataFrame({
+        "start_frame": starts,
+        "end_frame": ends,
+        "cycle_length": ends - starts + 1,
+        "stance_length": stance,
+        "swing_length": swing,
+    })
+
+def add_cycle_columns(df):
+    """
+    H列 (列インデックス 7) の接地フラグから K/L/M/N 列 (列インデックス 10-13) を追加する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム（最低限8列必要）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        K/L/M/N 列を追加したデータフレーム。
+    """
+    K, L, M, N = compute_cycle_columns(df.iloc[:, 7].values)
+
     # 新しい列を DataFrame に追加
     df[10] = K  # K列
     df[11] = L  # L列
     df[12] = M  # M列
     df[13] = N  # N列
-    
+
     return df
 
-# CSV ファイルが保存されているディレクトリのパス
-input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/nye'  # 実際のパスに変更
-output_dir ='/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # 出力用ディレクトリを指定
-os.makedirs(output_dir, exist_ok=True)
+def process_csv(file_path):
+    # ヘッダーなしで読み込む
+    df = pd.read_csv(file_path, header=None)
+
+    # 列数確認（最低限 H 列 (列インデックス 7) 必要）
+    if df.shape[1] < 8:
+        raise ValueError(f"{file_path} has fewer than 8 columns.")
+
+    return add_cycle_columns(df)
 
-# 指定ディレクトリ内の全ての CSV ファイルを取得
-csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data_processed.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_processed.csv")
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
+def process_file(file_path, output_dir):
+    """
+    1つのCSVファイルに K/L/M/N 列を追加し、"_processed.csv" として保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+    output_dir : str
+        出力用フォルダ。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス（列が足りない場合は ValueError）。
+    """
     processed_df = process_csv(file_path)
-    if processed_df is not None:
-        # 出力ファイル名を作成（例: "data.csv" → "data_processed.csv"）
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        new_file_name = f"{base_name}_processed.csv"
-        output_path = os.path.join(output_dir, new_file_name)
-        
-        # CSV を保存（ヘッダーなし、インデックスなし）
-        processed_df.to_csv(output_path, index=False, header=False)
-        print(f"Saved to: {output_path}\n")
-
-print("All files processed successfully.")
+
+    # 出力ファイル名を作成（例: "data.csv" → "data_processed.csv"）
+    output_path = output_path_for(file_path, output_dir)
+
+    # CSV を保存（ヘッダーなし、インデックスなし）
+    processed_df.to_csv(output_path, index=False, header=False)
+    return output_path
+
+def process_all_files(input_dir, output_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、K/L/M/N 列を追加して "_processed.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_dir : str
+        出力用フォルダ。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 指定ディレクトリ内の全ての CSV ファイルを取得
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+
+    results = run_cached_stage(process_file, csv_files, partial(output_path_for, output_dir=output_dir), "cycle", {},
+                               output_dir, output_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
+
+# 使用例
+if __name__ == "__main__":
+    # CSV ファイルが保存されているディレクトリのパス
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/nye'  # 実際のパスに変更
+    output_dir ='/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle'  # 出力用ディレクトリを指定
+    process_all_files(input_dir, output_dir)
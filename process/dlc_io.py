@@ -0,0 +1,198 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+from collections import namedtuple
+
+# DeepLabCut が .h5 を保存するときのキー
+DEFAULT_KEY = "df_with_missing"
+
+# 前処理で使うキーポイント（modify.py の前の CSV の列 6~11 の順）
+BODYPARTS = ("wrist", "elbow", "shoulder")
+
+# 1セッション分の姿勢推定の結果
+# bodyparts: キーポイント名のタプル, xy: (フレーム数, キーポイント数, 2) の座標,
+# likelihood: (フレーム数, キーポイント数) の尤度, scorer: DeepLabCut のモデル名
+Pose = namedtuple("Pose", ["bodyparts", "xy", "likelihood", "scorer"])
+
+def list_columns(file_path, key=DEFAULT_KEY):
+    """
+    DeepLabCut の .h5 の列（scorer / (individuals /) bodyparts / coords の MultiIndex）をデータを読まずに返す。
+
+    Parameters:
+    ----------
+    file_path : str
+        .h5 ファイルのパス。
+    key : str
+        HDF5 のキー。
+
+    Returns:
+    -------
+    pd.MultiIndex
+        列のインデックス。
+    """
+    with pd.HDFStore(file_path, "r") as store:
+        storer = store.get_storer(key)
+        if storer.is_table:
+            names = storer.non_index_axes[0][1]
+            return pd.MultiIndex.from_tuples(names, names=_level_names(len(names[0])))
+        return store.select(key).columns
+
+def _level_names(n_levels):
+    """ 列の階層数から DeepLabCut の列の階層名を返す """
+    if n_levels == 4:
+        return ["scorer", "individuals", "bodyparts", "coords"]
+    return ["scorer", "bodyparts", "coords"]
+
+def read_pose(file_path, bodyparts=BODYPARTS, individual=None, key=DEFAULT_KEY):
+    """
+    DeepLabCut の .h5 から、指定したキーポイントの列だけを読み込む。
+    table 形式（DeepLabCut の既定）の場合は、必要な列だけを HDF5 から読み出す。
+
+    Parameters:
+    ----------
+    file_path : str
+        .h5 ファイルのパス。
+    bodyparts : tuple of str
+        読み込むキーポイント。
+    individual : str, optional
+        multi-animal のプロジェクトの場合の個体名。
+    key : str
+        HDF5 のキー。
+
+    Returns:
+    -------
+    Pose
+        指定した順番に並べたキーポイントの座標と尤度。
+    """
+    columns = list_columns(file_path, key)
+    if columns.nlevels == 4:
+        if individual is None:
+            individual = columns.get_level_values(1)[0]
+        columns = columns[columns.get_level_values(1) == individual]
+    elif individual is not None:
+        raise ValueError(f"Not a multi-animal file: {file_path}")
+
+    scorer = columns.get_level_values(0)[0]
+    available = set(columns.get_level_values(-2))
+    missing = [b for b in bodyparts if b not in available]
+    if missing:
+        raise ValueError(f"Bodyparts {missing} missing in file: {file_path}")
+
+    prefix = (scorer,) if individual is None else (scorer, individual)
+    wanted = [prefix + (b, c) for b in bodyparts for c in ("x", "y", "likelihood")]
+    with pd.HDFStore(file_path, "r") as store:
+        if store.get_storer(key).is_table:
+            df = store.select(key, columns=wanted)
+        else:
+            df = store.select(key)
+    values = df[wanted].to_numpy(dtype=float).reshape(len(df), len(bodyparts), 3)
+
+    return Pose(tuple(bodyparts), values[:, :, :2], values[:, :, 2], scorer)
+
+def bodypart(pose, name):
+    """ キーポイント名から (フレーム数, 2) の座標を返す """
+    return pose.xy[:, pose.bodyparts.index(name)]
+
+def session_name(file_path):
+    """
+    .h5 のファイル名から DeepLabCut のモデル名を除いたセッション名を返す
+    （例: "rat8_1106pre_1DLC_resnet50_NewLabelingDec26shuffle1_100000.h5" → "rat8_1106pre_1"）。
+    """
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    return re.split(r"DLC_", base, maxsplit=1)[0]
+
+def read_contact(file_path):
+    """
+    接地フラグだけの小さな CSV（"contact" 列のヘッダー付き, write_contact で作る）を読み込む。
+
+    Parameters:
+    ----------
+    file_path : str
+        接地フラグの CSV のパス。
+
+    Returns:
+    -------
+    np.ndarray
+        (フレーム数,) の接地フラグ。
+    """
+    return pd.read_csv(file_path, usecols=["contact"])["contact"].to_numpy()
+
+def write_contact(contact, file_path):
+    """ 接地フラグを read_contact で読める CSV（"contact" 列のみ）として保存する """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    pd.DataFrame({"contact": np.asarray(contact)}).to_csv(file_path, index=False)
+    return file_path
+
+def export_contact(legacy_csv, file_path):
+    """
+    手作業でラベル付けした従来の CSV（ヘッダーなし, 列 13 が接地フラグ）から、接地フラグだけの CSV を作る。
+    セッションごとに1回だけ実行すれば、以降は姿勢推定の結果を CSV に書き出す必要はない。
+    """
+    return write_contact(pd.read_csv(legacy_csv, header=None, usecols=[13])[13].to_numpy(), file_path)
+
+def to_raw_frame(pose, contact):
+    """
+    姿勢推定の結果を、modify.py の前の CSV と同じ列の並びのデータフレームにする。
+    列 0~5 は modify.py で削除されるので NaN、列 6~11 が wrist / elbow / shoulder の x, y、
+    列 12（G列, 前処理では使わない）は 0、列 13 が接地フラグ。
+
+    Parameters:
+    ----------
+    pose : Pose
+        read_pose の戻り値（BODYPARTS の順）。
+    contact : np.ndarray
+        (フレーム数,) の接地フラグ（read_contact の戻り値）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        ヘッダーなしの CSV を読み込んだときと同じ形のデータフレーム。
+    """
+    if pose.bodyparts != BODYPARTS:
+        raise ValueError(f"Expected bodyparts {BODYPARTS}, got {pose.bodyparts}")
+    if len(contact) != len(pose.xy):
+        raise ValueError(f"Frame count mismatch: {len(pose.xy)} poses, {len(contact)} contact rows")
+
+    n_frames = len(pose.xy)
+    values = np.column_stack([np.full((n_frames, 6), np.nan), pose.xy.reshape(n_frames, -1)])
+    df = pd.DataFrame(values)
+    df[12] = 0
+    df[13] = contact
+    return df
+
+def load_raw(file_path, contact_file=None, key=DEFAULT_KEY):
+    """
+    DeepLabCut の .h5 と接地フラグの CSV から、pipeline.py にそのまま渡せるデータフレームを作る。
+
+    Parameters:
+    ----------
+    file_path : str
+        .h5 ファイルのパス。
+    contact_file : str, optional
+        接地フラグだけの CSV（read_contact を参照）のパス。None の場合は接地フラグを 0 にする
+        （接地フラグを events.py で求める場合）。
+    key : str
+        HDF5 のキー。
+
+    Returns:
+    -------
+    df : pd.DataFrame
+        modify.py の前の CSV と同じ形のデータフレーム。
+    likelihood : np.ndarray
+        (フレーム数, 3) の尤度（clean.clean_dataframe の likelihood に渡す）。
+    """
+    pose = read_pose(file_path, BODYPARTS, key=key)
+    contact = read_contact(contact_file) if contact_file is not None else np.zeros(len(pose.xy))
+    return to_raw_frame(pose, contact), pose.likelihood
+
+# 使用例
+if __name__ == "__main__":
+    file_path = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/videos/rat8_1106pre_1DLC_resnet50_NewLabelingDec26shuffle1_100000.h5'
+    pose = read_pose(file_path)
+    print(pose.scorer, pose.bodyparts, pose.xy.shape)
+    print(bodypart(pose, "wrist")[:5])
+
+    # 手作業でラベル付けした従来の CSV から、接地フラグだけの CSV を1回だけ作っておく
+    legacy_csv = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/rat8_1106pre_1.csv'
+    export_contact(legacy_csv, '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/videos/rat8_1106pre_1_contact.csv')
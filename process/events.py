@@ -0,0 +1,261 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+from batch import report_errors
+from cache import run_cached_stage
+from cycle import find_runs
+
+FPS = 60
+
+# modify.py の後の手首の y 座標の列（符号を反転済みなので、値が大きいほど高い）
+PAW_Y_COLUMN = 1
+
+# 接地・離地の閾値（床の高さから、手首の高さの範囲 [5, 95 パーセンタイル] に対する割合）
+LOW = 0.15
+HIGH = 0.3
+
+def paw_height(y, floor_percentile=5, top_percentile=95):
+    """
+    手首の y 座標を、床の高さを 0、手首の高さの範囲を 1 とした高さに変換する。
+
+    Parameters:
+    ----------
+    y : array-like
+        (フレーム数,) の手首の y 座標（値が大きいほど高い）。
+    floor_percentile, top_percentile : float
+        床と最高点とみなすパーセンタイル。
+
+    Returns:
+    -------
+    np.ndarray
+        正規化した高さ。
+    """
+    y = np.asarray(y, dtype=float)
+    floor, top = np.nanpercentile(y, [floor_percentile, top_percentile])
+    return (y - floor) / (top - floor)
+
+def detect_contact(height, low=LOW, high=HIGH, max_speed=None, fps=FPS):
+    """
+    手首の高さからヒステリシス付きで接地フラグを求める。
+    高さが low 以下（かつ速さが max_speed 以下）になったら接地、high 以上になったら遊脚とし、その間は直前の状態を保つ。
+
+    Parameters:
+    ----------
+    height : array-like
+        paw_height で正規化した高さ。
+    low, high : float
+        接地・離地の閾値（low < high）。
+    max_speed : float, optional
+        接地とみなす高さ方向の最大の速さ [1/s]。None の場合は速さで判定しない。
+    fps : float
+        フレームレート。
+
+    Returns:
+    -------
+    np.ndarray
+        (フレーム数,) の接地フラグ（1: 接地, 0: 遊脚）。最初の状態が決まるまでは 0。
+    """
+    if not low < high:
+        raise ValueError(f"low ({low}) must be smaller than high ({high})")
+    height = np.asarray(height, dtype=float)
+    n = len(height)
+
+    enter = height <= low
+    if max_speed is not None:
+        enter &= np.abs(np.gradient(height) * fps) <= max_speed
+    leave = height >= high
+
+    # 閾値を越えたフレームの状態を、次に閾値を越えるフレームまで引き継ぐ（前方補完）
+    decided = enter | leave
+    index = np.arange(n)
+    last = np.maximum.accumulate(np.where(decided, index, -1))
+    contact = np.where(last >= 0, enter[np.maximum(last, 0)], False)
+    return contact.astype(np.int8)
+
+def _crossing(height, before, level):
+    """ フレーム before と before + 1 の間で高さが level を横切る位置（小数のフレーム）を線形補間で求める """
+    h0 = height[before]
+    h1 = height[before + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.clip((h0 - level) / (h0 - h1), 0, 1)
+    return before + np.where(np.isfinite(frac), frac, 1)
+
+def refine_events(height, contact, low=LOW):
+    """
+    接地フラグの切り替わりを、高さが low を横切る時刻まで線形補間して小数のフレームで求める。
+    接地は接地直前に low を下回った位置、離地は遊脚になる前に最後に low を上回った位置とする。
+
+    Parameters:
+    ----------
+    height : array-like
+        paw_height で正規化した高さ。
+    contact : array-like
+        detect_contact の接地フラグ。
+    low : float
+        接地の閾値。
+
+    Returns:
+    -------
+    pd.DataFrame
+        "event"（"touchdown" / "liftoff"）、"frame"（切り替わったフレーム）、"time_frame"（小数のフレーム）の表（時刻順）。
+    """
+    height = np.asarray(height, dtype=float)
+    contact = np.asarray(contact)
+    n = len(height)
+    index = np.arange(n)
+
+    starts, _ = find_runs(contact)
+    starts = starts[starts > 0]
+    touchdowns = starts[contact[starts] == 1]
+    liftoffs = starts[contact[starts] == 0]
+
+    below = height <= low
+    # 各フレームが属する「low 以下の区間」の開始フレームと、直近の low 以下のフレーム
+    below_start = np.maximum.accumulate(np.where(below & ~np.concatenate(([False], below[:-1])), index, 0))
+    last_below = np.maximum.accumulate(np.where(below, index, -1))
+
+    td_before = below_start[touchdowns] - 1
+    td_time = np.where(td_before >= 0, _crossing(height, np.maximum(td_before, 0), low), touchdowns)
+
+    lo_before = last_below[liftoffs]
+    valid = (lo_before >= 0) & (lo_before + 1 < n)
+    lo_time = np.where(valid, _crossing(height, np.clip(lo_before, 0, n - 2), low), liftoffs)
+
+    events = pd.DataFrame({
+        "event": np.concatenate([np.full(len(touchdowns), "touchdown"), np.full(len(liftoffs), "liftoff")]),
+        "frame": np.concatenate([touchdowns, liftoffs]),
+        "time_frame": np.concatenate([td_time, lo_time]).astype(float),
+    })
+    return events.sort_values("frame", kind="stable").reset_index(drop=True)
+
+def detect_events(y, low=LOW, high=HIGH, max_speed=None, fps=FPS):
+    """
+    手首の y 座標から接地フラグと接地・離地の時刻をまとめて求める。
+
+    Parameters:
+    ----------
+    y : array-like
+        (フレーム数,) の手首の y 座標（値が大きいほど高い）。
+    low, high, max_speed, fps :
+        detect_contact を参照。
+
+    Returns:
+    -------
+    contact : np.ndarray
+        接地フラグ。
+    events : pd.DataFrame
+        refine_events の表に "time"（秒）の列を加えたもの。
+    """
+    height = paw_height(y)
+    contact = detect_contact(height, low, high, max_speed, fps)
+    events = refine_events(height, contact, low)
+    events["time"] = events["time_frame"] / fps
+    return contact, events
+
+def event_cycle_table(events):
+    """
+    小数のフレームの接地・離地の時刻から、サイクルごとの時間を求める（blank_cycle.py / stsw.py の (L - 1) / 60 より細かい）。
+
+    Parameters:
+    ----------
+    events : pd.DataFrame
+        detect_events の表。
+
+    Returns:
+    -------
+    pd.DataFrame
+        接地から次の接地までのサイクルごとの "touchdown", "liftoff", "next_touchdown",
+        "cycle_time", "stance_time", "swing_time"（秒）の表。離地が1つでないサイクルは除く。
+    """
+    td = events.loc[events["event"] == "touchdown", "time"].to_numpy()
+    lo = events.loc[events["event"] == "liftoff", "time"].to_numpy()
+    if len(td) < 2:
+        return pd.DataFrame(columns=["touchdown", "liftoff", "next_touchdown", "cycle_time", "stance_time", "swing_time"])
+
+    start, end = td[:-1], td[1:]
+    # 各サイクル内の最初の離地と、サイクル内の離地の数
+    first = np.searchsorted(lo, start, side="right")
+    count = np.searchsorted(lo, end, side="left") - first
+    ok = count == 1
+    liftoff = lo[np.minimum(first, len(lo) - 1)] if len(lo) else np.full(len(start), np.nan)
+
+    return pd.DataFrame({
+        "touchdown": start[ok],
+        "liftoff": liftoff[ok],
+        "next_touchdown": end[ok],
+        "cycle_time": (end - start)[ok],
+        "stance_time": (liftoff - start)[ok],
+        "swing_time": (end - liftoff)[ok],
+    })
+
+def add_contact_column(df, y_column=PAW_Y_COLUMN, contact_column=7, low=LOW, high=HIGH, max_speed=None, fps=FPS):
+    """
+    modify.py の後のデータフレームの接地フラグ（H列, 列インデックス 7）を手首の軌跡から求めた値で置き換える。
+    pipeline.py の modify の直後に使うと、手作業の接地のラベル付けが不要になる。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        modify.py の後のヘッダーなしのデータフレーム。
+    y_column : int
+        手首の y 座標の列。
+    contact_column : int
+        接地フラグの列。
+    low, high, max_speed, fps :
+        detect_contact を参照。
+
+    Returns:
+    -------
+    pd.DataFrame
+        接地フラグを置き換えたデータフレーム。
+    """
+    contact, _ = detect_events(df.iloc[:, y_column].to_numpy(dtype=float), low, high, max_speed, fps)
+    df[df.columns[contact_column]] = contact
+    return df
+
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data_events.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_events.csv")
+
+def process_file(file_path, output_dir, params):
+    """ modify.py の後の1つのCSVファイルから接地・離地の時刻を求め、"_events.csv" として保存する """
+    df = pd.read_csv(file_path, header=None)
+    _, events = detect_events(df.iloc[:, PAW_Y_COLUMN].to_numpy(dtype=float), **params)
+    output_path = output_path_for(file_path, output_dir)
+    events.to_csv(output_path, index=False)
+    return output_path
+
+def process_all_files(input_dir, output_dir, low=LOW, high=HIGH, max_speed=None, fps=FPS, max_workers=None):
+    """
+    フォルダ内の modify.py の後の CSV から、接地・離地の時刻の表 "_events.csv" を作る。
+
+    Parameters:
+    ----------
+    input_dir : str
+        modify.py の出力フォルダ。
+    output_dir : str
+        出力先のフォルダ。
+    low, high, max_speed, fps :
+        detect_contact を参照。
+    max_workers : int, optional
+        ワーカープロセス数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    csv_files = glob.glob(os.path.join(input_dir, "*_modified.csv"))
+
+    params = {"low": low, "high": high, "max_speed": max_speed, "fps": fps}
+    results = run_cached_stage(process_file, csv_files, lambda f: output_path_for(f, output_dir), "events", params,
+                               output_dir, output_dir, params, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to {r.result}")
+    report_errors(results)
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter'  # modify.py の出力フォルダ
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/events'  # 出力先
+    process_all_files(input_dir, output_dir)
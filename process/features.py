@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+from aggregate import key_columns, save_aggregate
+from batch import run_batch, report_errors
+from cycle import cycle_table
+from waveform import load_named
+
+FPS = 60
+
+# サイクルごとの特徴量の列
+FEATURE_COLUMNS = [
+    "cycle", "start_frame", "end_frame",
+    "cycle_time", "stance_time", "swing_time", "duty_factor",
+    "angle_min", "angle_max", "angle_first", "angle_last", "angle_max_frame",
+    "stride_length", "peak_paw_speed",
+]
+
+def _segment_argmax(values, starts):
+    """
+    各区間（starts から次の starts の直前まで）で最大値をとる最初の位置（区間の先頭からのフレーム数）。
+    NaN を含む区間は NaN。
+    """
+    values = values[starts[0]:]  # 最初の区間より前のフレームは使わない
+    starts = starts - starts[0]
+    seg_max = np.maximum.reduceat(values, starts)
+    seg_id = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+    index = np.arange(len(values))
+    first = np.minimum.reduceat(np.where(values == seg_max[seg_id], index, len(values)), starts)
+    return np.where(np.isnan(seg_max), np.nan, first - starts)
+
+def cycle_features(df, fps=FPS):
+    """
+    1セッションの完全なサイクルごとの特徴量を、区間ごとの集約（reduceat）でまとめて計算する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        列名付きのセッション（waveform.load_named の戻り値。"contact", "angle", "distance", "wrist_x", "wrist_y" を使う）。
+    fps : float
+        フレームレート。
+
+    Returns:
+    -------
+    pd.DataFrame
+        1行1サイクルの FEATURE_COLUMNS の表。
+        時間は秒、angle_max_frame はサイクル開始からのフレーム数、
+        stride_length はサイクル開始から次のサイクル開始までの手首の移動距離 [px]、
+        peak_paw_speed はサイクル内の手首の最大の速さ [px/s]。
+    """
+    table = cycle_table(df["contact"].to_numpy())
+    if len(table) == 0:
+        return pd.DataFrame({c: np.zeros(0) for c in FEATURE_COLUMNS})
+
+    starts = table["start_frame"].to_numpy()
+    ends = table["end_frame"].to_numpy()
+    stop = ends[-1] + 1  # 最後の完全なサイクルの次のフレーム（reduceat の最後の区間をここで打ち切る）
+
+    angle = df["angle"].to_numpy(dtype=float)[:stop]
+    speed = df["distance"].to_numpy(dtype=float)[:stop] * fps
+    wrist = df[["wrist_x", "wrist_y"]].to_numpy(dtype=float)
+
+    cycle_frames = table["cycle_length"].to_numpy()
+    stance_frames = table["stance_length"].to_numpy()
+
+    return pd.DataFrame({
+        "cycle": np.arange(len(table)),
+        "start_frame": starts,
+        "end_frame": ends,
+        "cycle_time": cycle_frames / fps,
+        "stance_time": stance_frames / fps,
+        "swing_time": table["swing_length"].to_numpy() / fps,
+        "duty_factor": stance_frames / cycle_frames,
+        "angle_min": np.minimum.reduceat(angle, starts),
+        "angle_max": np.maximum.reduceat(angle, starts),
+        "angle_first": angle[starts],
+        "angle_last": angle[ends],
+        "angle_max_frame": _segment_argmax(angle, starts),
+        # 次のサイクルの開始フレーム（ends + 1）は必ずデータの範囲内にある
+        "stride_length": np.sqrt(np.sum((wrist[ends + 1] - wrist[starts])**2, axis=1)),
+        "peak_paw_speed": np.maximum.reduceat(speed, starts),
+    })
+
+def session_features(file_path, fps=FPS, timed=True):
+    """ 前処理後のセッションのファイルを読み込み、サイクルごとの特徴量を計算する """
+    return cycle_features(load_named(file_path, timed), fps)
+
+def build_feature_table(files, fps=FPS, timed=True, max_workers=None):
+    """
+    全セッションのサイクルごとの特徴量を1つの表にまとめる。
+
+    Parameters:
+    ----------
+    files : list of str
+        前処理後のセッションのファイルのパス。
+    fps : float
+        フレームレート。
+    timed : bool
+        waveform.load_named を参照。
+    max_workers : int, optional
+        ワーカープロセス数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        "Section", "rat", "date", "phase"（カテゴリ型, aggregate.key_columns）と FEATURE_COLUMNS の列を持つ表。
+    """
+    results = run_batch(session_features, files, fps, timed, max_workers=max_workers)
+    report_errors(results)
+    ok = [r for r in results if r.error is None]
+    if not ok:
+        return pd.DataFrame(columns=["Section", "rat", "date", "phase"] + FEATURE_COLUMNS)
+
+    table = pd.concat([r.result for r in ok], ignore_index=True)
+    keys = key_columns([r.item for r in ok], [len(r.result) for r in ok])
+    return pd.concat([keys, table], axis=1)
+
+def process_all_files(input_dir, output_file, fps=FPS, timed=True, max_workers=None):
+    """
+    フォルダ内の前処理後のセッションから、サイクルごとの特徴量の表を作って保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        前処理後のセッション（pipeline.py の出力）が保存されているフォルダ。
+    output_file : str
+        保存先のパス（".parquet" / ".feather" の場合はカテゴリ型のまま保存する）。
+    fps, timed, max_workers :
+        build_feature_table を参照。
+    """
+    files = sorted(glob.glob(os.path.join(input_dir, "*_processed.*")))
+    files = [f for f in files if f.endswith((".csv", ".parquet", ".feather"))]
+
+    features = build_feature_table(files, fps, timed, max_workers)
+    save_aggregate(features, output_file)
+    print(f"Features of {len(features)} cycles saved to {output_file}")
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut'  # pipeline.py の出力フォルダ
+    output_file = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/features.parquet'  # 保存先
+    process_all_files(input_dir, output_file)
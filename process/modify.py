@@ -2,18 +2,23 @@ import pandas as pd
 import glob
 import os
 
-# CSV ファイルが入っているディレクトリのパス
-input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'
+from batch import report_errors
+from cache import run_cached_stage
 
-# 18 枚の csv ファイルをまとめて取得
-csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+def modify_dataframe(df):
+    """
+    y座標の列（7, 9, 11）の符号を反転し、列 0~5 を削除する。
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
-    
-    # ヘッダーがないと仮定 -> header=None で読み込む
-    df = pd.read_csv(file_path, header=None)
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだ DeepLabCut の CSV。
 
+    Returns:
+    -------
+    pd.DataFrame
+        列を詰め直した（0 始まりの列番号を振り直した）データフレーム。
+    """
     # 列 7, 9, 11 を -1 倍する
     # （ファイルによっては列が不足する場合もあるので、index 範囲チェックしておくと安心）
     for col_idx in [7, 9, 11]:
@@ -23,12 +28,65 @@ for file_path in csv_files:
     # 列 0~5 (6 列ぶん) を削除
     # たとえば、列数が 12 以上あることを前提にすると下記で OK
     # (あるいは df.shape[1] > 6 のときだけ削除する、などエラー回避するなら要チェック)
-    df.drop(df.columns[0:6], axis=1, inplace=True)
+    df = df.drop(df.columns[0:6], axis=1)
 
-    # 出力ファイル名: 元のファイル名 + "_modified.csv"
+    # 保存して読み直したときと同じく、列番号を 0 から振り直す
+    df.columns = range(df.shape[1])
+    return df
+
+def output_path_for(file_path):
+    """ 出力ファイルのパス（元のファイル名 + "_modified.csv"、入力と同じフォルダ）を返す """
     base, ext = os.path.splitext(os.path.basename(file_path))
-    output_file = os.path.join(input_dir, f"{base}_modified.csv")
+    return os.path.join(os.path.dirname(file_path), f"{base}_modified.csv")
+
+def modify_file(file_path):
+    """
+    1つのCSVファイルを処理し、"_modified.csv" として同じフォルダに保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    # ヘッダーがないと仮定 -> header=None で読み込む
+    df = pd.read_csv(file_path, header=None)
+    df = modify_dataframe(df)
+
+    # 出力ファイル名: 元のファイル名 + "_modified.csv"
+    output_file = output_path_for(file_path)
 
     # ヘッダー行も不要なら header=False で出力
     df.to_csv(output_file, index=False, header=False)
-    print(f"Saved to {output_file}")
\ No newline at end of file
+    return output_file
+
+def process_all_files(input_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、"_modified.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ（出力先も同じ）。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    # 18 枚の csv ファイルをまとめて取得
+    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+
+    results = run_cached_stage(modify_file, csv_files, output_path_for, "modify", {"flip": [7, 9, 11], "drop": 6},
+                               input_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to {r.result}")
+    report_errors(results)
+
+# 使用例
+if __name__ == "__main__":
+    # CSV ファイルが入っているディレクトリのパス
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'
+    process_all_files(input_dir)
@@ -0,0 +1,217 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+from functools import partial
+
+from batch import report_errors
+from cache import run_cached_stage
+from cycle import find_cycle_starts, find_runs
+from waveform import load_named
+
+FPS = 60
+
+# 接地（0→1）・離地（1→0）の前後に切り出すフレーム数
+BEFORE = 5
+AFTER = 5
+
+def angular_derivatives(angle, fps=FPS, method="gradient", window=7, polyorder=2):
+    """
+    肘角度から角速度と角加速度を計算する。
+
+    Parameters:
+    ----------
+    angle : array-like
+        (フレーム数,) の肘角度 [deg]（angle.py の列 8）。
+    fps : float
+        フレームレート。
+    method : str
+        "gradient"（中心差分）または "savgol"（Savitzky-Golay フィルタの微分）。
+    window, polyorder : int
+        "savgol" の場合の窓の長さと多項式の次数。
+
+    Returns:
+    -------
+    omega : np.ndarray
+        角速度 [deg/s]。
+    alpha : np.ndarray
+        角加速度 [deg/s^2]。
+    """
+    angle = np.asarray(angle, dtype=float)
+    dt = 1 / fps
+    if method == "gradient":
+        omega = np.gradient(angle, dt)
+        alpha = np.gradient(omega, dt)
+    elif method == "savgol":
+        from scipy.signal import savgol_filter
+        omega = savgol_filter(angle, window, polyorder, deriv=1, delta=dt)
+        alpha = savgol_filter(angle, window, polyorder, deriv=2, delta=dt)
+    else:
+        raise ValueError(f"Unknown derivative method: {method}")
+    return omega, alpha
+
+def find_takeoffs(contact):
+    """
+    接地フラグの 1→0 の切り替わり（離地）を検出する。
+
+    Parameters:
+    ----------
+    contact : array-like
+        接地フラグ。
+
+    Returns:
+    -------
+    np.ndarray
+        離地後の最初のフレーム（フラグが 0 になったフレーム）のインデックス。
+    """
+    contact = np.asarray(contact)
+    starts, _ = find_runs(contact)
+    starts = starts[starts > 0]
+    return starts[(contact[starts - 1] == 1) & (contact[starts] == 0)]
+
+def extract_windows(values, events, before=BEFORE, after=AFTER):
+    """
+    各イベントの前後のフレームをまとめて切り出す。前後がデータの範囲外になるイベントは除く。
+
+    Parameters:
+    ----------
+    values : np.ndarray
+        (フレーム数, 列数) のデータ。
+    events : np.ndarray
+        イベントのフレーム。
+    before, after : int
+        イベントの前・後に切り出すフレーム数。
+
+    Returns:
+    -------
+    events : np.ndarray
+        範囲内に収まったイベントのフレーム。
+    windows : np.ndarray
+        (イベント数, before + after + 1, 列数) の配列。
+    """
+    events = np.asarray(events)
+    events = events[(events - before >= 0) & (events + after < len(values))]
+    index = events[:, None] + np.arange(-before, after + 1)[None, :]
+    return events, values[index]
+
+def window_table(events, windows, fps=FPS, before=BEFORE):
+    """
+    切り出した区間を、1行1フレームの表にする（archive/angular.py・omegamean.py の入力形式）。
+
+    Parameters:
+    ----------
+    events : np.ndarray
+        イベントのフレーム。
+    windows : np.ndarray
+        (イベント数, 区間のフレーム数, 3) の配列（角度・角速度・角加速度）。
+    fps : float
+        フレームレート。
+    before : int
+        イベントの前に切り出したフレーム数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        "Event", "Frame", "Offset", "Time", "Angle", "Angular Velocity", "Angular Acceleration" の列を持つ表。
+    """
+    n_events, width = windows.shape[:2]
+    offsets = np.arange(width) - before
+    return pd.DataFrame({
+        "Event": np.repeat(np.arange(n_events), width),
+        "Frame": (events[:, None] + offsets[None, :]).ravel(),
+        "Offset": np.tile(offsets, n_events),
+        "Time": np.tile(offsets / fps, n_events),
+        "Angle": windows[:, :, 0].ravel(),
+        "Angular Velocity": windows[:, :, 1].ravel(),
+        "Angular Acceleration": windows[:, :, 2].ravel(),
+    })
+
+def session_windows(df, fps=FPS, before=BEFORE, after=AFTER, method="gradient", window=7, polyorder=2):
+    """
+    1セッションの角速度・角加速度を計算し、接地・離地の前後の区間を切り出す。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        列名付きのセッション（waveform.load_named の戻り値）。
+    fps, before, after, method, window, polyorder :
+        angular_derivatives / extract_windows を参照。
+
+    Returns:
+    -------
+    landing : pd.DataFrame
+        接地（0→1）の前後の表。
+    takeoff : pd.DataFrame
+        離地（1→0）の前後の表。
+    """
+    angle = df["angle"].to_numpy(dtype=float)
+    contact = df["contact"].to_numpy()
+    omega, alpha = angular_derivatives(angle, fps, method, window, polyorder)
+    values = np.column_stack([angle, omega, alpha])
+
+    tables = []
+    for events in (find_cycle_starts(contact), find_takeoffs(contact)):
+        events, windows = extract_windows(values, events, before, after)
+        tables.append(window_table(events, windows, fps, before))
+    return tuple(tables)
+
+def output_paths_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "x_processed.csv" → "<output_dir>/x_landing_omega.csv", "x_takeoff_omega.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    if base_name.endswith("_processed"):
+        base_name = base_name[:-len("_processed")]
+    return (os.path.join(output_dir, f"{base_name}_landing_omega.csv"),
+            os.path.join(output_dir, f"{base_name}_takeoff_omega.csv"))
+
+def process_file(file_path, output_dir, params, timed=True):
+    """
+    1セッションを1回だけ読み込み、接地・離地の区間の表をそれぞれ保存する。
+
+    Returns:
+    -------
+    tuple of str
+        保存した接地の表と離地の表のパス（output_paths_for と同じ）。
+    """
+    landing, takeoff = session_windows(load_named(file_path, timed), **params)
+    landing_path, takeoff_path = output_paths_for(file_path, output_dir)
+    landing.to_csv(landing_path, index=False)
+    takeoff.to_csv(takeoff_path, index=False)
+    return landing_path, takeoff_path
+
+def process_all_files(input_dir, output_dir, fps=FPS, before=BEFORE, after=AFTER, method="gradient",
+                      window=7, polyorder=2, timed=True, max_workers=None):
+    """
+    フォルダ内の前処理後のセッションから、"<セッション名>_landing_omega.csv" と "_takeoff_omega.csv" を作る。
+
+    Parameters:
+    ----------
+    input_dir : str
+        前処理後のセッション（pipeline.py の出力）が保存されているフォルダ。
+    output_dir : str
+        出力先のフォルダ（archive/angular.py・omegamean.py の入力フォルダ）。
+    fps, before, after, method, window, polyorder :
+        session_windows を参照。
+    timed : bool
+        waveform.load_named を参照。
+    max_workers : int, optional
+        ワーカープロセス数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = sorted(glob.glob(os.path.join(input_dir, "*_processed.*")))
+    files = [f for f in files if f.endswith((".csv", ".parquet", ".feather"))]
+
+    params = {"fps": fps, "before": before, "after": after, "method": method, "window": window, "polyorder": polyorder}
+    # 接地・離地の両方の表を出力として記録する（どちらかが消えたり変わったりしたら作り直す）
+    results = run_cached_stage(process_file, files, partial(output_paths_for, output_dir=output_dir), "omega",
+                               dict(params, timed=timed), output_dir, output_dir, params, timed,
+                               max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to {', '.join(r.result)}")
+    report_errors(results)
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut'  # pipeline.py の出力フォルダ
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/omega'  # angular.py・omegamean.py の入力フォルダ
+    process_all_files(input_dir, output_dir)
@@ -0,0 +1,188 @@
+import pandas as pd
+import glob
+import os
+import sys
+from functools import partial
+
+# used_code 内の angle.py / distance.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "used_code"))
+
+from batch import report_errors
+from cache import run_cached_stage
+from clean import clean_dataframe
+from dlc_io import load_raw, session_name
+from events import add_contact_column
+from modify import modify_dataframe
+from angle import add_angle_column
+from distance import add_distance_column
+from cycle import add_cycle_columns
+from blank_cycle import add_time_column
+from cut import drop_last_rows
+from store import from_legacy, save_session
+
+# 前処理の各段階（名前, 処理関数, 中間ファイルの接尾辞）
+STAGES = [
+    ("modify", modify_dataframe, "modified"),
+    ("angle", add_angle_column, "with_angle"),
+    ("distance", add_distance_column, "with_distance"),
+    ("cycle", add_cycle_columns, "processed"),
+    ("blank_cycle", add_time_column, "with_a_column"),
+    ("cut", drop_last_rows, "cut"),
+]
+
+def run_stages(df, base_name=None, debug_dir=None, clean_params=None, contact_params=None):
+    """
+    読み込んだ DeepLabCut の CSV に (clean →) modify → angle → distance → cycle → blank_cycle → cut を
+    メモリ上で順に適用する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだ DeepLabCut の CSV。
+    base_name : str, optional
+        中間ファイル名に使うセッション名。
+    debug_dir : str, optional
+        指定した場合、各段階の結果を "<base_name>_<接尾辞>.csv" として保存する（デバッグ用）。
+    clean_params : dict, optional
+        指定した場合、最初に clean.clean_dataframe をこのパラメータで適用する（例: {"max_speed": 3000, "smoothing": "savgol"}）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        全段階を適用したデータフレーム。
+    """
+    stages = list(STAGES)
+    if contact_params is not None:
+        stages.insert(1, ("contact", partial(add_contact_column, **contact_params), "with_contact"))
+    if clean_params is not None:
+        stages.insert(0, ("clean", partial(clean_dataframe, **clean_params), "cleaned"))
+
+    for stage_name, stage, suffix in stages:
+        df = stage(df)
+
+        if debug_dir is not None:
+            os.makedirs(debug_dir, exist_ok=True)
+            df.to_csv(os.path.join(debug_dir, f"{base_name}_{suffix}.csv"), index=False, header=False)
+
+    return df
+
+def output_path_for(file_path, output_dir, output_format="csv"):
+    """ 最終結果のパス（例: "data.csv" → "<output_dir>/data_processed.csv"、.h5 はモデル名を除いたセッション名）を返す """
+    base_name = session_name(file_path) if file_path.endswith(".h5") else os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_processed.{output_format}")
+
+def contact_path_for(file_path, contact_dir):
+    """ .h5 に対応する接地フラグだけの CSV（dlc_io.read_contact）のパス（"<contact_dir>/<セッション名>_contact.csv"）を返す """
+    return os.path.join(contact_dir or os.path.dirname(file_path), f"{session_name(file_path)}_contact.csv")
+
+def contact_inputs_for(file_path, contact_dir):
+    """ キャッシュの判定に加える接地フラグの CSV（.h5 の場合のみ。存在しなくてもよい） """
+    return [contact_path_for(file_path, contact_dir)] if file_path.endswith(".h5") else []
+
+def process_file(file_path, output_dir, keep_intermediates=False, output_format="csv", clean_params=None,
+                 contact_dir=None, contact_params=None):
+    """
+    1 セッション分の CSV（または DeepLabCut の .h5）を 1 回だけ読み込んで全段階を処理し、
+    最終結果を "_processed.<形式>" として保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力ファイル（DeepLabCut から書き出したヘッダーなしの CSV、または DeepLabCut の .h5）のパス。
+    output_dir : str
+        最終結果を保存するフォルダ。
+    keep_intermediates : bool
+        True の場合、各段階の中間ファイルを output_dir/intermediate に保存する。
+    output_format : str
+        "csv"（従来のヘッダーなし CSV）、"parquet" または "feather"（列名付きの列指向形式, store.py）。
+    clean_params : dict, optional
+        run_stages を参照。.h5 の場合は尤度も clean.clean_dataframe に渡す。
+    contact_dir : str, optional
+        .h5 の場合に、接地フラグだけの CSV（contact_path_for）を読むフォルダ。None の場合は .h5 と同じフォルダ。
+        その CSV が無い場合は、接地フラグを events.py の既定のパラメータで手首の軌跡から求める。
+    contact_params : dict, optional
+        run_stages を参照。指定した場合、接地フラグの CSV は使わない。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    debug_dir = os.path.join(output_dir, "intermediate") if keep_intermediates else None
+
+    if file_path.endswith(".h5"):
+        base_name = session_name(file_path)
+        contact_file = contact_path_for(file_path, contact_dir)
+        if contact_params is None and not os.path.exists(contact_file):
+            contact_params = {}  # 接地フラグの CSV が無いので、events.py の既定のパラメータで求める
+        df, likelihood = load_raw(file_path, contact_file if contact_params is None else None)
+        if clean_params is not None:
+            clean_params = dict(clean_params, likelihood=likelihood)
+    else:
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        df = pd.read_csv(file_path, header=None)
+    df = run_stages(df, base_name, debug_dir, clean_params, contact_params)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = output_path_for(file_path, output_dir, output_format)
+    if output_format == "csv":
+        df.to_csv(output_path, index=False, header=False)
+    else:
+        # cut 後のファイルは先頭に blank_cycle.py の A列がある
+        save_session(from_legacy(df, timed=True), output_path)
+    return output_path
+
+def process_all_files(input_dir, output_dir, keep_intermediates=False, output_format="csv", max_workers=None,
+                      clean_params=None, input_format="csv", contact_dir=None, contact_params=None):
+    """
+    フォルダ内の DeepLabCut の CSV（または .h5）のうち、前回の処理から変わったものだけをまとめて前処理する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力ファイルが保存されているフォルダ。
+    output_dir : str
+        最終結果を保存するフォルダ。
+    keep_intermediates : bool
+        True の場合、各段階の中間ファイルも保存する。
+    output_format : str
+        "csv", "parquet" または "feather"。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    clean_params : dict, optional
+        指定した場合、modify の前に clean.py の処理をこのパラメータで行う。
+    input_format : str
+        "csv" または "h5"（DeepLabCut の .h5 を直接読み込む。CSV への書き出しは不要）。
+    contact_dir : str, optional
+        .h5 の場合に、接地フラグだけの CSV を読むフォルダ（process_file を参照）。
+        接地フラグの CSV の内容（と有無）もキャッシュの判定に含めるので、直した場合は自動的に再計算される。
+    contact_params : dict, optional
+        指定した場合、接地フラグを events.py で手首の軌跡から求める（run_stages を参照）。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    input_files = glob.glob(os.path.join(input_dir, f"*.{input_format}"))
+
+    params = {"stages": [name for name, _, _ in STAGES], "output_format": output_format}
+    if clean_params is not None:
+        params["clean"] = clean_params
+    if contact_params is not None:
+        params["contact"] = contact_params
+    if input_format != "csv":
+        params["input_format"] = input_format
+    extra_inputs_for = partial(contact_inputs_for, contact_dir=contact_dir) if contact_params is None else None
+    results = run_cached_stage(process_file, input_files,
+                               partial(output_path_for, output_dir=output_dir, output_format=output_format),
+                               "pipeline", params,
+                               output_dir, output_dir, keep_intermediates, output_format, clean_params, contact_dir,
+                               contact_params, max_workers=max_workers, extra_inputs_for=extra_inputs_for)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # DeepLabCut から書き出した CSV のフォルダ
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut'  # 最終結果を保存するフォルダ
+    process_all_files(input_dir, output_dir, keep_intermediates=False)
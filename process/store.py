@@ -0,0 +1,179 @@
+import pandas as pd
+import numpy as np
+import os
+
+# 前処理後（cycle.py の "_processed.csv"）の列インデックスと列名の対応
+SESSION_COLUMNS = [
+    "wrist_x",       # 0
+    "wrist_y",       # 1
+    "elbow_x",       # 2
+    "elbow_y",       # 3
+    "shoulder_x",    # 4
+    "shoulder_y",    # 5
+    "col6",          # 6 (G列)
+    "contact",       # 7 接地フラグ (H列)
+    "angle",         # 8 肘角度 (angle.py)
+    "distance",      # 9 手首の移動距離 (distance.py)
+    "cycle_frame",   # 10 K列
+    "cycle_length",  # 11 L列
+    "phase_frame",   # 12 M列
+    "phase_length",  # 13 N列
+]
+
+# blank_cycle.py が先頭に追加する A列（サイクル開始からの時間 [s]）
+TIME_COLUMN = "cycle_time"
+
+# CSV では該当しない行が " " になっている列
+BLANK_COLUMNS = ["cycle_length", "phase_length"]
+
+def legacy_column_names(n_columns, timed=False):
+    """
+    ヘッダーなし CSV の列数から、各列の名前のリストを作る。
+    SESSION_COLUMNS に無い列は "col<インデックス>" とする。
+
+    Parameters:
+    ----------
+    n_columns : int
+        CSV の列数。
+    timed : bool
+        True の場合、先頭に blank_cycle.py の A列がある（"_with_a_column.csv" や cut 後のファイル）。
+
+    Returns:
+    -------
+    list of str
+        列名のリスト。
+    """
+    names = [TIME_COLUMN] if timed else []
+    offset = len(names)
+    for i in range(n_columns - offset):
+        names.append(SESSION_COLUMNS[i] if i < len(SESSION_COLUMNS) else f"col{i}")
+    return names
+
+def from_legacy(df, timed=False):
+    """
+    ヘッダーなしで読み込んだデータフレームに列名と型を付ける。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム。
+    timed : bool
+        True の場合、先頭に blank_cycle.py の A列がある。
+
+    Returns:
+    -------
+    pd.DataFrame
+        列名付きのデータフレーム。" " の列は欠損値付きの整数型、整数の列は int32 になる。
+    """
+    df = df.copy()
+    df.columns = legacy_column_names(df.shape[1], timed)
+
+    for name in df.columns:
+        if name in BLANK_COLUMNS:
+            values = df[name].astype(object).where(df[name].astype(str).str.strip() != "", None)
+            df[name] = pd.to_numeric(values).astype("Int32")
+        elif pd.api.types.is_integer_dtype(df[name]) and df[name].abs().max() < 2**31:
+            df[name] = df[name].astype(np.int32)
+
+    return df
+
+def to_legacy(df):
+    """
+    from_legacy / load_session で読み込んだデータフレームを、元のヘッダーなし CSV と同じ形に戻す。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        列名付きのデータフレーム。
+
+    Returns:
+    -------
+    pd.DataFrame
+        列番号 0, 1, 2, ... のデータフレーム（to_csv(header=False, index=False) で元の CSV になる）。
+    """
+    df = df.copy()
+    for name in BLANK_COLUMNS:
+        if name in df.columns:
+            df[name] = df[name].astype(object).where(df[name].notna(), " ")
+    df.columns = range(df.shape[1])
+    return df
+
+def save_session(df, path):
+    """
+    列名付きのデータフレームを列指向のバイナリ形式で保存する。
+    拡張子が ".feather" なら Feather、それ以外は Parquet。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        列名付きのデータフレーム。
+    path : str
+        保存先のパス。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".feather"):
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_parquet(path, index=False)
+
+def load_session(path, columns=None):
+    """
+    save_session で保存したセッションを読み込む。必要な列だけを読むこともできる。
+
+    Parameters:
+    ----------
+    path : str
+        Parquet / Feather ファイルのパス。
+    columns : list of str, optional
+        読み込む列名（例: ["angle", "contact"]）。None の場合は全列。
+
+    Returns:
+    -------
+    pd.DataFrame
+        列名付きのデータフレーム。
+    """
+    if path.endswith(".feather"):
+        return pd.read_feather(path, columns=columns)
+    return pd.read_parquet(path, columns=columns)
+
+def convert_csv(csv_path, store_path, timed=False):
+    """
+    ヘッダーなし CSV を列指向のバイナリ形式に変換する。
+
+    Parameters:
+    ----------
+    csv_path : str
+        入力CSVファイルのパス。
+    store_path : str
+        保存先のパス（".parquet" または ".feather"）。
+    timed : bool
+        True の場合、先頭に blank_cycle.py の A列がある。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    # 書き戻したときに元の CSV と一致するよう、浮動小数点数は丸めずに読み込む
+    df = pd.read_csv(csv_path, header=None, float_precision="round_trip")
+    save_session(from_legacy(df, timed), store_path)
+    return store_path
+
+def export_csv(store_path, csv_path):
+    """
+    列指向のバイナリ形式のセッションを、従来のヘッダーなし CSV に書き戻す。
+
+    Parameters:
+    ----------
+    store_path : str
+        Parquet / Feather ファイルのパス。
+    csv_path : str
+        出力CSVファイルのパス。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    to_legacy(load_session(store_path)).to_csv(csv_path, index=False, header=False)
+    return csv_path
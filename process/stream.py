@@ -0,0 +1,205 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+import sys
+from functools import partial
+
+# used_code 内の angle.py / distance.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "used_code"))
+
+from batch import report_errors
+from cache import run_cached_stage
+from modify import modify_dataframe
+from angle import add_angle_column
+from distance import add_distance_column, calculate_step_distances
+from blank_cycle import add_time_column
+
+# 1回に読み込む行数の既定値
+CHUNK_SIZE = 100000
+
+# cycle.py の L/N 列を確定させるために、次のチャンクまで持ち越す行数
+# （L[i] は i+1 行目がサイクル開始かどうか、それは i+2 行目があるかどうかで決まる）
+LOOKAHEAD = 2
+
+def _counter(reset, prev_count):
+    """ reset の位置で 1 に戻るカウンタ。最初の reset より前は prev_count から続けて数える """
+    index = np.arange(len(reset))
+    last_reset = np.maximum.accumulate(np.where(reset, index, -1))
+    return np.where(last_reset >= 0, index - last_reset + 1, prev_count + index + 1)
+
+def cycle_columns_chunk(contact, state, final):
+    """
+    cycle.py の K/L/M/N 列を、前のチャンクの状態を引き継いでチャンク単位で計算する。
+
+    Parameters:
+    ----------
+    contact : np.ndarray
+        このチャンクの接地フラグ（H列, 列インデックス 7）。
+    state : dict or None
+        前のチャンクの最終行の状態（"contact", "K", "M"）。ファイルの先頭なら None。
+    final : bool
+        True の場合、このチャンクがファイルの最後（最終行はサイクル開始とみなさない）。
+
+    Returns:
+    -------
+    tuple
+        (K, L, M, N)。final=False の場合、最後の LOOKAHEAD 行の L/N はまだ確定していないので使わないこと。
+    """
+    n = len(contact)
+    prev = np.concatenate(([np.nan if state is None else state["contact"]], contact[:-1]))
+
+    is_start = (prev == 0) & (contact == 1)
+    if final and n > 0:
+        is_start[-1] = False  # 最後のフレームは開始とみなさない
+    change = prev != contact
+    if state is None and n > 0:
+        # ファイルの先頭行は K=1, M=1
+        is_start[0] = True
+        change[0] = True
+
+    K = _counter(is_start, 0 if state is None else state["K"])
+    M = _counter(change, 0 if state is None else state["M"])
+
+    L = np.full(n, " ", dtype=object)
+    N = np.full(n, " ", dtype=object)
+    ends = np.flatnonzero(is_start[1:])
+    L[ends] = K[ends].tolist()
+    ends = np.flatnonzero(change[1:])
+    N[ends] = M[ends].tolist()
+
+    return K, L, M, N
+
+def stream_file(file_path, output_path, chunksize=CHUNK_SIZE):
+    """
+    1 セッション分の CSV をチャンク単位で読み込み、pipeline.py と同じ
+    modify → angle → distance → cycle → blank_cycle → cut を適用して書き出す。
+    メモリに載るのは最大で chunksize + 数行だけなので、長時間の録画にも使える。
+
+    前フレームが必要な移動距離と、直前の接地状態・カウンタが必要な K/L/M/N 列は、
+    チャンクの境目をまたいで状態を引き継ぐ。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイル（DeepLabCut から書き出したヘッダーなしの CSV）のパス。
+    output_path : str
+        出力CSVファイルのパス。
+    chunksize : int
+        1回に読み込む行数。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+
+    Notes:
+    -----
+    値は pipeline.py と同じになるが、型の推定はチャンクごとに行われるので、
+    欠損値が一部のチャンクにしかない整数の列は、そのチャンクだけ "1.0" のように書き出される。
+    """
+    cut_rows = 4  # cut.py と同じく最後の4行を削除する
+    n_total = 0
+    prev_xy = None
+    state = None
+    pending = None  # L/N 列がまだ確定していない行
+    tail = None  # cut のために書き出しを保留している行
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", newline="") as f:
+        reader = pd.read_csv(file_path, header=None, chunksize=chunksize)
+        chunk = next(reader, None)
+        while chunk is not None:
+            next_chunk = next(reader, None)
+            final = next_chunk is None
+            n_total += len(chunk)
+
+            # 行ごとに独立な段階
+            df = modify_dataframe(chunk)
+            df = add_angle_column(df)
+            df = add_distance_column(df)
+            if prev_xy is not None:
+                # 前のチャンクの最終フレームからの移動距離
+                df.iloc[0, 9] = calculate_step_distances(np.vstack([prev_xy, df.iloc[0, [0, 1]].values]))[1]
+            prev_xy = df.iloc[-1, [0, 1]].values.astype(float)
+
+            # L/N 列が未確定の行を前に付けて、カウンタを計算する
+            if pending is not None:
+                df = pd.concat([pending, df], ignore_index=True)
+            K, L, M, N = cycle_columns_chunk(df.iloc[:, 7].values, state, final)
+            df[10] = K
+            df[11] = L
+            df[12] = M
+            df[13] = N
+
+            if final:
+                ready, pending = df, None
+            else:
+                n_ready = max(len(df) - LOOKAHEAD, 0)
+                ready, pending = df.iloc[:n_ready], df.iloc[n_ready:, :10]
+                if n_ready > 0:
+                    state = {"contact": df.iloc[n_ready - 1, 7], "K": K[n_ready - 1], "M": M[n_ready - 1]}
+
+            ready = add_time_column(ready.copy())
+
+            # 最後の cut_rows 行は書き出さずに持ち越す
+            if tail is not None:
+                ready = pd.concat([tail, ready], ignore_index=True)
+            if not final:
+                n_out = max(len(ready) - cut_rows, 0)
+            elif n_total > cut_rows:
+                n_out = len(ready) - cut_rows
+            else:
+                # cut.py と同じく、行数が cut_rows 以下なら削除しない
+                n_out = len(ready)
+            out, tail = ready.iloc[:n_out], ready.iloc[n_out:]
+
+            if len(out) > 0:
+                out.to_csv(f, index=False, header=False)
+            chunk = next_chunk
+
+    return output_path
+
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data_processed.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_processed.csv")
+
+def process_file(file_path, output_dir, chunksize=CHUNK_SIZE):
+    """ 1 セッション分の CSV をストリーミングで前処理し、"_processed.csv" として保存する """
+    return stream_file(file_path, output_path_for(file_path, output_dir), chunksize)
+
+def process_all_files(input_dir, output_dir, chunksize=CHUNK_SIZE, max_workers=None):
+    """
+    フォルダ内の DeepLabCut の CSV のうち、前回の処理から変わったものだけをストリーミングで前処理する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_dir : str
+        最終結果を保存するフォルダ。
+    chunksize : int
+        1回に読み込む行数。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数（メモリ使用量はおよそ chunksize × ワーカー数）。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+
+    # 出力は pipeline.py と同じなので、キャッシュの段階名も同じにする
+    results = run_cached_stage(process_file, csv_files, partial(output_path_for, output_dir=output_dir),
+                               "pipeline", {"stages": ["modify", "angle", "distance", "cycle", "blank_cycle", "cut"],
+                                            "output_format": "csv"},
+                               output_dir, output_dir, chunksize, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # DeepLabCut から書き出した CSV のフォルダ
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut'  # 最終結果を保存するフォルダ
+    process_all_files(input_dir, output_dir, chunksize=CHUNK_SIZE)
@@ -0,0 +1,263 @@
+import pandas as pd
+import numpy as np
+import glob
+import os
+import re
+import warnings
+
+from batch import run_batch, report_errors
+from cycle import cycle_table
+from store import from_legacy, load_session
+
+# 時間正規化する既定の列（store.py の列名）
+DEFAULT_COLUMNS = ["angle", "distance", "wrist_x", "wrist_y", "elbow_x", "elbow_y", "shoulder_x", "shoulder_y"]
+
+# 0〜1 の位相を何点で表すか（0%, 1%, ..., 100%）
+N_POINTS = 101
+
+# 要約に使うパーセンタイル
+PERCENTILES = (25, 50, 75)
+
+def load_named(file_path, timed=True):
+    """
+    前処理後のセッション（"_processed.csv" / ".parquet" / ".feather"）を列名付きで読み込む。
+
+    Parameters:
+    ----------
+    file_path : str
+        セッションのファイルのパス。
+    timed : bool
+        CSV の場合に、先頭に blank_cycle.py の A列があるかどうか（pipeline.py の出力なら True）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        列名付きのデータフレーム（store.py の列名）。
+    """
+    if file_path.endswith((".parquet", ".feather")):
+        return load_session(file_path)
+    return from_legacy(pd.read_csv(file_path, header=None), timed)
+
+def normalize_cycles(values, table, n_points=N_POINTS):
+    """
+    各サイクル（接地開始から次の接地開始まで）を 0〜1 の共通の位相に線形補間する。
+    全サイクル・全列をまとめてインデックス計算で補間する（サイクルごとのループなし）。
+
+    Parameters:
+    ----------
+    values : np.ndarray
+        (フレーム数, 列数) のデータ。
+    table : pd.DataFrame
+        cycle.cycle_table の戻り値。
+    n_points : int
+        1サイクルあたりの点数。
+
+    Returns:
+    -------
+    np.ndarray
+        (サイクル数, n_points, 列数) の配列。位相 1 は次のサイクルの開始フレーム。
+    """
+    values = np.asarray(values, dtype=float)
+    starts = table["start_frame"].to_numpy()
+    spans = table["cycle_length"].to_numpy()  # 開始フレームから次の開始フレームまでのフレーム数
+
+    grid = np.linspace(0, 1, n_points)
+    pos = starts[:, None] + grid[None, :] * spans[:, None]
+    i0 = np.minimum(np.floor(pos + 1e-9).astype(int), len(values) - 1)  # 丸め誤差で整数の少し下になった位置も i0 にする
+    i1 = np.minimum(i0 + 1, len(values) - 1)
+    frac = np.clip(pos - i0, 0, 1)[:, :, None]
+    # ちょうどフレーム上の点は、次のフレームが NaN でもそのフレームの値を使う
+    return np.where(frac > 0, values[i0] * (1 - frac) + values[i1] * frac, values[i0])
+
+def session_cycles(file_path, columns=DEFAULT_COLUMNS, n_points=N_POINTS, timed=True):
+    """
+    1セッションの全サイクルを時間正規化する。
+
+    Parameters:
+    ----------
+    file_path : str
+        前処理後のセッションのファイルのパス。
+    columns : list of str
+        時間正規化する列。
+    n_points : int
+        1サイクルあたりの点数。
+    timed : bool
+        load_named を参照。
+
+    Returns:
+    -------
+    np.ndarray
+        (サイクル数, n_points, 列数) の配列。
+    """
+    df = load_named(file_path, timed)
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} missing in file: {file_path}")
+
+    table = cycle_table(df["contact"].to_numpy())
+    return normalize_cycles(df[list(columns)].to_numpy(dtype=float), table, n_points)
+
+def summarize(cycles, percentiles=PERCENTILES):
+    """
+    時間正規化したサイクルの平均・SD・パーセンタイルの波形を計算する（NaN は除外）。
+
+    Parameters:
+    ----------
+    cycles : np.ndarray
+        (サイクル数, 点数, 列数) の配列。
+    percentiles : tuple
+        計算するパーセンタイル。
+
+    Returns:
+    -------
+    dict
+        "n": サイクル数, "mean" / "sd": (点数, 列数), "percentiles": (パーセンタイル数, 点数, 列数)。
+    """
+    n_points, n_columns = cycles.shape[1:]
+    if len(cycles) == 0:
+        empty = np.full((n_points, n_columns), np.nan)
+        return {"n": 0, "mean": empty, "sd": empty.copy(),
+                "percentiles": np.full((len(percentiles), n_points, n_columns), np.nan)}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 全サイクルが NaN の点
+        return {
+            "n": len(cycles),
+            "mean": np.nanmean(cycles, axis=0),
+            "sd": np.nanstd(cycles, axis=0, ddof=1) if len(cycles) > 1 else np.full((n_points, n_columns), np.nan),
+            "percentiles": np.nanpercentile(cycles, percentiles, axis=0),
+        }
+
+def phase_group(file_path):
+    """ ファイル名から条件（pre / propet / post）を取り出す（例: "rat8_1106pre_1_processed.csv" → "pre"） """
+    match = re.search(r"\d{4}(pre|propet|post)(?:_|$)", os.path.splitext(os.path.basename(file_path))[0])
+    return match.group(1) if match else "all"
+
+def _stack_summaries(summaries):
+    return {
+        "n": np.array([s["n"] for s in summaries]),
+        "mean": np.stack([s["mean"] for s in summaries]),
+        "sd": np.stack([s["sd"] for s in summaries]),
+        "percentiles": np.stack([s["percentiles"] for s in summaries]),
+    }
+
+def build_waveforms(files, group_of=phase_group, columns=DEFAULT_COLUMNS, n_points=N_POINTS,
+                    percentiles=PERCENTILES, timed=True, max_workers=None):
+    """
+    全セッションのサイクルを時間正規化し、セッションごと・グループごとの波形の要約を計算する。
+
+    Parameters:
+    ----------
+    files : list of str
+        前処理後のセッションのファイルのパス。
+    group_of : callable
+        ファイルのパスからグループ名を返す関数（既定は pre / propet / post）。
+    columns : list of str
+        時間正規化する列。
+    n_points : int
+        1サイクルあたりの点数。
+    percentiles : tuple
+        計算するパーセンタイル。
+    timed : bool
+        load_named を参照。
+    max_workers : int, optional
+        読み込みと時間正規化に使うワーカープロセス数。
+
+    Returns:
+    -------
+    dict
+        save_waveforms でそのまま保存できる配列の辞書。
+    """
+    results = run_batch(session_cycles, files, list(columns), n_points, timed, max_workers=max_workers)
+    report_errors(results)
+    ok = [r for r in results if r.error is None]
+
+    sessions = [os.path.splitext(os.path.basename(r.item))[0] for r in ok]
+    groups_of_sessions = [group_of(r.item) for r in ok]
+    groups = sorted(set(groups_of_sessions))
+
+    session_summary = _stack_summaries([summarize(r.result, percentiles) for r in ok]) if ok else None
+    group_summary = _stack_summaries([
+        summarize(np.concatenate([r.result for r, g in zip(ok, groups_of_sessions) if g == group]), percentiles)
+        for group in groups
+    ]) if ok else None
+
+    waveforms = {
+        "phase": np.linspace(0, 1, n_points),
+        "columns": np.array(columns),
+        "percentiles": np.array(percentiles),
+        "sessions": np.array(sessions),
+        "session_group": np.array(groups_of_sessions),
+        "groups": np.array(groups),
+    }
+    for prefix, summary in (("session", session_summary), ("group", group_summary)):
+        if summary is not None:
+            for key, value in summary.items():
+                waveforms[f"{prefix}_{key}"] = value
+    return waveforms
+
+def save_waveforms(waveforms, output_file):
+    """ build_waveforms の結果を圧縮した .npz ファイルとして保存する """
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    np.savez_compressed(output_file, **waveforms)
+    return output_file
+
+def load_waveforms(path):
+    """ save_waveforms で保存した波形を辞書として読み込む """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def waveform_frame(waveforms, level="group", name=None):
+    """
+    保存した波形の1セッション / 1グループ分を、位相ごと・列ごとの表にする（グラフ用）。
+
+    Parameters:
+    ----------
+    waveforms : dict
+        build_waveforms / load_waveforms の戻り値。
+    level : str
+        "group" または "session"。
+    name : str
+        グループ名またはセッション名。
+
+    Returns:
+    -------
+    pd.DataFrame
+        phase 列と、"<列名>_mean", "<列名>_sd", "<列名>_p<パーセンタイル>" の列を持つ表。
+    """
+    names = list(waveforms["groups" if level == "group" else "sessions"])
+    i = names.index(name)
+    frame = {"phase": waveforms["phase"]}
+    for j, column in enumerate(waveforms["columns"]):
+        frame[f"{column}_mean"] = waveforms[f"{level}_mean"][i, :, j]
+        frame[f"{column}_sd"] = waveforms[f"{level}_sd"][i, :, j]
+        for k, p in enumerate(waveforms["percentiles"]):
+            frame[f"{column}_p{p}"] = waveforms[f"{level}_percentiles"][i, k, :, j]
+    return pd.DataFrame(frame)
+
+def process_all_files(input_dir, output_file, group_of=phase_group, columns=DEFAULT_COLUMNS,
+                      n_points=N_POINTS, timed=True, max_workers=None):
+    """
+    フォルダ内の前処理後のセッションをすべて時間正規化し、平均 ± SD などの波形を .npz に保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        前処理後のセッション（pipeline.py の出力）が保存されているフォルダ。
+    output_file : str
+        保存先の .npz ファイルのパス。
+    group_of, columns, n_points, timed, max_workers :
+        build_waveforms を参照。
+    """
+    files = sorted(glob.glob(os.path.join(input_dir, "*_processed.*")))
+    files = [f for f in files if f.endswith((".csv", ".parquet", ".feather"))]
+
+    waveforms = build_waveforms(files, group_of, columns, n_points, timed=timed, max_workers=max_workers)
+    save_waveforms(waveforms, output_file)
+    print(f"Waveforms of {len(waveforms['sessions'])} sessions saved to {output_file}")
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut'  # pipeline.py の出力フォルダ
+    output_file = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/waveforms.npz'  # 保存先
+    process_all_files(input_dir, output_file)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# process / used_code のモジュールを読み込めるようにする（各スクリプトと同じく sys.path に追加する）
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for folder in ("process", "used_code"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from waveform import normalize_cycles
+
+def _table(start, length):
+    return pd.DataFrame({"start_frame": [start], "cycle_length": [length]})
+
+def test_grid_point_kept_when_next_frame_is_nan():
+    # フレーム 5〜19 のうちフレーム 6 だけが欠損
+    values = np.arange(20, dtype=float)[:, None]
+    values[6] = np.nan
+
+    out = normalize_cycles(values, _table(5, 14), n_points=15)[0, :, 0]
+
+    # 位相 0 はフレーム 5 の値、フレーム 6 の前後の補間点だけが NaN
+    expected = np.arange(5, 20, dtype=float)
+    expected[1] = np.nan
+    np.testing.assert_array_equal(out, expected)
+
+def test_between_frames_interpolates_and_propagates_nan():
+    values = np.arange(20, dtype=float)[:, None]
+    values[6] = np.nan
+
+    out = normalize_cycles(values, _table(4, 4), n_points=9)[0, :, 0]
+
+    # 0.5 フレームごとの点：フレーム 6 に隣接する区間は NaN、それ以外は線形補間
+    assert out[0] == 4.0
+    assert out[1] == 4.5
+    assert out[2] == 5.0
+    assert np.all(np.isnan(out[3:6]))
+    np.testing.assert_allclose(out[6:], [7.0, 7.5, 8.0])
+
+def test_matches_np_interp_without_missing_values():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(40, 2))
+    table = pd.DataFrame({"start_frame": [3, 14], "cycle_length": [11, 17]})
+
+    out = normalize_cycles(values, table, n_points=37)
+
+    grid = np.linspace(0, 1, 37)
+    for k, (start, length) in enumerate(zip(table["start_frame"], table["cycle_length"])):
+        frames = np.arange(start, start + length + 1)
+        for j in range(values.shape[1]):
+            np.testing.assert_allclose(out[k, :, j], np.interp(start + grid * length, frames, values[frames, j]))
@@ -2,6 +2,13 @@ import pandas as pd
 import numpy as np
 import glob
 import os
+import sys
+
+# process 内の batch.py / cache.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from batch import report_errors
+from cache import run_cached_stage
 
 def calculate_angle(wrist, elbow, shoulder, degrees=True):
     """
@@ -23,21 +30,42 @@ def calculate_angle(wrist, elbow, shoulder, degrees=True):
     float
         計算された角度
     """
-    A = np.array(wrist, dtype=float)
-    B = np.array(elbow, dtype=float)
-    C = np.array(shoulder, dtype=float)
+    return float(calculate_angles([wrist], [elbow], [shoulder], degrees=degrees)[0])
+
+def calculate_angles(a, vertex, c, degrees=True):
+    """
+    三点の座標配列から vertex を頂点とする角度を全フレーム分まとめて計算する。
+    (wrist, elbow, shoulder) 以外の任意の関節の組にも使える。
+
+    Parameters:
+    -----------
+    a : array-like
+        (N, 2) または (N, 3) の座標配列（一端の関節）
+    vertex : array-like
+        (N, 2) または (N, 3) の座標配列（頂点の関節）
+    c : array-like
+        (N, 2) または (N, 3) の座標配列（もう一端の関節）
+    degrees : bool
+        True の場合、角度を度数法で返す。False の場合、ラジアンで返す。
+
+    Returns:
+    --------
+    np.ndarray
+        (N,) の角度配列。ベクトルの長さが0のフレームは NaN。
+    """
+    A = np.asarray(a, dtype=float)
+    B = np.asarray(vertex, dtype=float)
+    C = np.asarray(c, dtype=float)
 
     BA = A - B
     BC = C - B
 
-    dot_product = np.dot(BA, BC)
-    norm_BA = np.linalg.norm(BA)
-    norm_BC = np.linalg.norm(BC)
-
-    if norm_BA == 0 or norm_BC == 0:
-        return np.nan  # ベクトルの長さが0の場合はNaNを返す
+    dot_product = np.einsum("ij,ij->i", BA, BC)
+    norm_product = np.linalg.norm(BA, axis=1) * np.linalg.norm(BC, axis=1)
 
-    cos_theta = dot_product / (norm_BA * norm_BC)
+    # ベクトルの長さが0のフレームは NaN にする
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_theta = np.where(norm_product == 0, np.nan, dot_product / norm_product)
     cos_theta = np.clip(cos_theta, -1.0, 1.0)  # 数値誤差対策
     theta = np.arccos(cos_theta)
 
@@ -46,35 +74,28 @@ def calculate_angle(wrist, elbow, shoulder, degrees=True):
 
     return theta
 
-# CSV ファイルが保存されているディレクトリのパス
-input_dir ='/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # ここを実際のパスに変更してください
+def add_angle_column(df):
+    """
+    wrist (列 0,1)・elbow (列 2,3)・shoulder (列 4,5) から肘角度を計算し、I列 (列インデックス8) に追加する。
 
-# 指定ディレクトリ内の全ての CSV ファイルを取得
-csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム（最低限6列必要）。
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
-    
-    # ヘッダーがないと仮定して読み込む
-    df = pd.read_csv(file_path, header=None)
-    
-    # 列数を確認（最低限6列必要）
-    if df.shape[1] < 6:
-        print(f"Error: {file_path} has fewer than 6 columns. Skipping.")
-        continue
-    
-    # wrist: 列 0 (x), 列 1 (y)
-    # elbow: 列 2 (x), 列 3 (y)
-    # shoulder: 列 4 (x), 列 5 (y)
-    
+    Returns:
+    -------
+    pd.DataFrame
+        角度列を追加したデータフレーム。
+    """
     # 角度を計算
-    angles = df.apply(lambda row: calculate_angle(
-        (row[0], row[1]),  # wrist
-        (row[2], row[3]),  # elbow (頂点)
-        (row[4], row[5]),  # shoulder
+    angles = calculate_angles(
+        df.iloc[:, [0, 1]].values,  # wrist
+        df.iloc[:, [2, 3]].values,  # elbow (頂点)
+        df.iloc[:, [4, 5]].values,  # shoulder
         degrees=True
-    ), axis=1)
-    
+    )
+
     # I列 (列インデックス8) に角度を追加
     # 既にG,H列（6,7）が埋まっているので、I列は8
     if df.shape[1] > 8:
@@ -84,14 +105,68 @@ for file_path in csv_files:
         for i in range(df.shape[1], 8):
             df[i] = np.nan
         df[8] = angles
-    
-    # 出力ファイル名を作成（例: "data.csv" → "data_with_angle.csv"）
+
+    return df
+
+def output_path_for(file_path):
+    """ 出力ファイルのパス（例: "data.csv" → "data_with_angle.csv"、入力と同じフォルダ）を返す """
     base_name = os.path.splitext(os.path.basename(file_path))[0]
-    new_file_name = f"{base_name}_with_angle.csv"
-    output_path = os.path.join(input_dir, new_file_name)
-    
+    return os.path.join(os.path.dirname(file_path), f"{base_name}_with_angle.csv")
+
+def add_angle_to_file(file_path):
+    """
+    1つのCSVファイルに肘角度の列を追加し、"_with_angle.csv" として同じフォルダに保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    # ヘッダーがないと仮定して読み込む
+    df = pd.read_csv(file_path, header=None)
+
+    # 列数を確認（最低限6列必要）
+    if df.shape[1] < 6:
+        raise ValueError(f"{file_path} has fewer than 6 columns.")
+
+    df = add_angle_column(df)
+
+    # 出力ファイル名を作成（例: "data.csv" → "data_with_angle.csv"）
+    output_path = output_path_for(file_path)
+
     # CSV を保存（ヘッダーなし、インデックスなし）
     df.to_csv(output_path, index=False, header=False)
-    print(f"Saved to: {output_path}\n")
+    return output_path
+
+def process_all_files(input_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、肘角度の列を追加して "_with_angle.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ（出力先も同じ）。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    # 指定ディレクトリ内の全ての CSV ファイルを取得
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+
+    results = run_cached_stage(add_angle_to_file, csv_files, output_path_for, "angle", {"degrees": True, "column": 8},
+                               input_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
 
-print("All files processed successfully.")
+# 使用例
+if __name__ == "__main__":
+    # CSV ファイルが保存されているディレクトリのパス
+    input_dir ='/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # ここを実際のパスに変更してください
+    process_all_files(input_dir)
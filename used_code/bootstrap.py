@@ -0,0 +1,294 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+# process 内の batch.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from batch import run_batch, report_errors
+
+# 1回にまとめて計算する（リプリケート数 × サイクル数）の要素数の上限（メモリ使用量の目安）
+BLOCK_ELEMENTS = 4_000_000
+
+# 計算する統計量
+STATISTICS = ["median_a", "median_b", "median_diff", "mean_a", "mean_b", "mean_diff", "ks"]
+
+def nested_design(df, value_column, group_column="phase", rat_column="rat", session_column="Section",
+                  baseline="pre", treatment="propet"):
+    """
+    サイクルごとの縦長の表を、ラット → セッション → サイクル の入れ子の索引に変換する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        1行1サイクルの表（features.py / aggregate.py の出力など）。
+    value_column : str
+        比較する値の列。
+    group_column, rat_column, session_column : str
+        条件・ラット・セッションの列。
+    baseline, treatment : str
+        比較する2つの条件。
+
+    Returns:
+    -------
+    dict
+        "values": サイクルの値（条件 → セッション の順に並べた1次元配列）,
+        "rats": ラット名, "conditions": 条件ごとの
+        "session_table"（(ラット数, 最大セッション数) のセッション番号。-1 は無し）,
+        "session_count"（ラットごとのセッション数）, "cycle_start" / "cycle_count"（セッションごとのサイクルの範囲）,
+        "n_values"（その条件のサイクル数）, "offset"（values の中の開始位置）。
+    """
+    df = df[df[group_column].isin([baseline, treatment]) & df[value_column].notna()]
+    rats = sorted(df[rat_column].astype(str).unique())
+    rat_code = {r: i for i, r in enumerate(rats)}
+
+    values = []
+    conditions = []
+    offset = 0
+    for group in (baseline, treatment):
+        part = df[df[group_column] == group]
+        part = part.assign(_rat=part[rat_column].astype(str).map(rat_code),
+                           _session=part[session_column].astype(str))
+        part = part.sort_values(["_rat", "_session"], kind="stable")
+
+        sessions = part.groupby(["_rat", "_session"], sort=False).size()
+        session_rat = sessions.index.get_level_values("_rat").to_numpy()
+        cycle_count = sessions.to_numpy()
+        cycle_start = np.concatenate(([0], np.cumsum(cycle_count)[:-1]))
+
+        session_count = np.bincount(session_rat, minlength=len(rats))
+        table = np.full((len(rats), max(int(session_count.max(initial=0)), 1)), -1)
+        local = np.arange(len(session_rat)) - np.searchsorted(session_rat, session_rat)  # ラット内のセッション番号
+        table[session_rat, local] = np.arange(len(session_rat))
+
+        values.append(part[value_column].to_numpy(dtype=float))
+        conditions.append({
+            "session_table": table,
+            "session_count": session_count,
+            "cycle_start": cycle_start,
+            "cycle_count": cycle_count,
+            "n_values": len(part),
+            "offset": offset,
+        })
+        offset += len(part)
+
+    return {"values": np.concatenate(values), "rats": rats, "conditions": conditions}
+
+def _resample_counts(condition, rat_draw, rng):
+    """
+    選んだラットごとにセッションを、セッションごとにサイクルを復元抽出し、
+    各リプリケートで各サイクルが何回選ばれたかを (リプリケート数, その条件のサイクル数) の配列で返す。
+    """
+    size, n_rats = rat_draw.shape
+    table = condition["session_table"]
+    max_sessions = table.shape[1]
+    max_cycles = int(condition["cycle_count"].max(initial=0))
+    n_values = condition["n_values"]
+    if n_values == 0:
+        return np.zeros((size, 0), dtype=np.int32)
+
+    # セッションの抽出（ラットごとにセッション数だけ選ぶ。余った枠はマスクする）
+    n_sessions = condition["session_count"][rat_draw]  # (size, n_rats)
+    local = np.floor(rng.random((size, n_rats, max_sessions)) * n_sessions[:, :, None]).astype(np.int64)
+    session = table[rat_draw[:, :, None], np.minimum(local, max_sessions - 1)]
+    session_ok = np.arange(max_sessions) < n_sessions[:, :, None]
+
+    # サイクルの抽出（セッションごとにサイクル数だけ選ぶ）
+    session = np.where(session_ok, session, 0)
+    count = np.where(session_ok, condition["cycle_count"][session], 0)
+    cycle = (condition["cycle_start"][session][..., None]
+             + np.floor(rng.random(session.shape + (max_cycles,)) * count[..., None]).astype(np.int64))
+    cycle_ok = np.arange(max_cycles) < count[..., None]
+
+    replicate = np.broadcast_to(np.arange(size)[:, None, None, None], cycle.shape)
+    flat = (replicate * n_values + cycle)[cycle_ok]
+    return np.bincount(flat, minlength=size * n_values).reshape(size, n_values).astype(np.int32)
+
+def _weighted_median(sorted_values, sorted_counts):
+    """ 並べ替えた値と各値の選ばれた回数から、リプリケートごとの中央値を求める（np.median と同じ定義） """
+    cum = np.cumsum(sorted_counts, axis=1)
+    total = cum[:, -1]
+    lower = np.argmax(cum > ((total - 1) // 2)[:, None], axis=1)
+    upper = np.argmax(cum > (total // 2)[:, None], axis=1)
+    median = (sorted_values[lower] + sorted_values[upper]) / 2
+    return np.where(total > 0, median, np.nan)
+
+def _statistics(values, counts_a, counts_b):
+    """
+    各リプリケートの選ばれた回数から、中央値・平均値とその差、KS 距離をまとめて計算する。
+
+    Returns:
+    -------
+    dict
+        STATISTICS の各統計量 -> (リプリケート数,) の配列。
+    """
+    n_a = counts_a.shape[1]
+    a, b = values[:n_a], values[n_a:]
+    total_a = counts_a.sum(axis=1)
+    total_b = counts_b.sum(axis=1)
+
+    order_a = np.argsort(a, kind="stable")
+    order_b = np.argsort(b, kind="stable")
+    median_a = _weighted_median(a[order_a], counts_a[:, order_a])
+    median_b = _weighted_median(b[order_b], counts_b[:, order_b])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_a = counts_a @ a / total_a
+        mean_b = counts_b @ b / total_b
+
+    # KS 距離：プールした値の順に経験分布関数を累積し、同じ値が続く場合は最後の位置だけで差を評価する
+    order = np.argsort(values, kind="stable")
+    pooled = values[order]
+    counts = np.concatenate([counts_a, np.zeros_like(counts_b)], axis=1)[:, order]
+    cdf_a = np.cumsum(counts, axis=1) / total_a[:, None]
+    counts = np.concatenate([np.zeros_like(counts_a), counts_b], axis=1)[:, order]
+    cdf_b = np.cumsum(counts, axis=1) / total_b[:, None]
+    last_of_ties = np.append(pooled[1:] != pooled[:-1], True)
+    ks = np.max(np.abs(cdf_a - cdf_b)[:, last_of_ties], axis=1)
+
+    return {
+        "median_a": median_a, "median_b": median_b, "median_diff": median_b - median_a,
+        "mean_a": mean_a, "mean_b": mean_b, "mean_diff": mean_b - mean_a,
+        "ks": ks,
+    }
+
+def _bootstrap_chunk(task, design):
+    """
+    1つの乱数ストリームで n_replicates 回の入れ子のブートストラップを行う（ワーカープロセスで実行する）。
+
+    Parameters:
+    ----------
+    task : tuple
+        (np.random.SeedSequence, リプリケート数)。
+    design : dict
+        nested_design の戻り値。
+
+    Returns:
+    -------
+    dict
+        STATISTICS の各統計量 -> (リプリケート数,) の配列。
+    """
+    seed_seq, n_replicates = task
+    rng = np.random.default_rng(seed_seq)
+    values = design["values"]
+    condition_a, condition_b = design["conditions"]
+    n_rats = len(design["rats"])
+
+    block = max(1, BLOCK_ELEMENTS // max(len(values), 1))
+    chunks = []
+    for start in range(0, n_replicates, block):
+        size = min(block, n_replicates - start)
+        # ラットは両条件で共通に選ぶ（同じラットの pre と propet を対にする）
+        rat_draw = rng.integers(0, n_rats, size=(size, n_rats))
+        counts_a = _resample_counts(condition_a, rat_draw, rng)
+        counts_b = _resample_counts(condition_b, rat_draw, rng)
+        chunks.append(_statistics(values, counts_a, counts_b))
+
+    return {key: np.concatenate([c[key] for c in chunks]) for key in STATISTICS}
+
+def hierarchical_bootstrap(design, n_replicates=10000, seed=0, n_streams=8, max_workers=None):
+    """
+    ラット → セッション → サイクル の順に復元抽出する入れ子のブートストラップ。
+    リプリケートを n_streams 個に分け、SeedSequence.spawn で作った独立な乱数ストリームでプロセスごとに計算する
+    （同じ seed と n_streams なら、ワーカー数によらず同じ結果になる）。
+
+    Parameters:
+    ----------
+    design : dict
+        nested_design の戻り値。
+    n_replicates : int
+        リプリケート数。
+    seed : int
+        乱数のシード。
+    n_streams : int
+        乱数ストリーム（＝タスク）の数。結果を再現するには seed と一緒に固定しておくこと。
+    max_workers : int, optional
+        ワーカープロセス数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        1行1リプリケートの STATISTICS の表。
+    """
+    n_streams = max(1, min(n_streams, n_replicates))
+    sizes = np.full(n_streams, n_replicates // n_streams)
+    sizes[:n_replicates % n_streams] += 1
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(n_streams), sizes.tolist()))
+
+    results = run_batch(_bootstrap_chunk, tasks, design, max_workers=max_workers)
+    report_errors([r._replace(item=f"stream {i}") for i, r in enumerate(results)])
+    if any(r.error is not None for r in results):
+        raise RuntimeError("Bootstrap failed")
+    return pd.DataFrame({key: np.concatenate([r.result[key] for r in results]) for key in STATISTICS})
+
+def observed_statistics(design):
+    """ 元のデータ（全サイクルを1回ずつ使う）の統計量 """
+    n_a = design["conditions"][0]["n_values"]
+    n_b = design["conditions"][1]["n_values"]
+    stats = _statistics(design["values"], np.ones((1, n_a), dtype=np.int32), np.ones((1, n_b), dtype=np.int32))
+    return {key: float(value[0]) for key, value in stats.items()}
+
+def confidence_intervals(replicates, observed, level=0.95):
+    """
+    パーセンタイル法の信頼区間を求める。
+
+    Parameters:
+    ----------
+    replicates : pd.DataFrame
+        hierarchical_bootstrap の戻り値。
+    observed : dict
+        observed_statistics の戻り値。
+    level : float
+        信頼水準。
+
+    Returns:
+    -------
+    pd.DataFrame
+        統計量ごとの "estimate", "lower", "upper", "se" の表。
+    """
+    alpha = (1 - level) / 2
+    lower, upper = np.nanquantile(replicates.to_numpy(), [alpha, 1 - alpha], axis=0)
+    return pd.DataFrame({
+        "estimate": [observed[key] for key in replicates.columns],
+        "lower": lower,
+        "upper": upper,
+        "se": np.nanstd(replicates.to_numpy(), axis=0, ddof=1),
+    }, index=replicates.columns)
+
+def bootstrap_table(df, value_column, n_replicates=10000, level=0.95, seed=0, max_workers=None, **design_kwargs):
+    """
+    サイクルごとの表から、baseline と propet の中央値・平均値・KS 距離の入れ子ブートストラップ信頼区間を求める。
+
+    使用例:
+        features = pd.read_parquet("features.parquet")  # process/features.py の出力
+        print(bootstrap_table(features, "cycle_time"))
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        1行1サイクルの表。
+    value_column : str
+        比較する値の列。
+    n_replicates, seed, max_workers :
+        hierarchical_bootstrap を参照。
+    level : float
+        信頼水準。
+    **design_kwargs :
+        nested_design に渡す引数（baseline="pre", treatment="propet" など）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        confidence_intervals の表。
+    """
+    design = nested_design(df, value_column, **design_kwargs)
+    replicates = hierarchical_bootstrap(design, n_replicates, seed, max_workers=max_workers)
+    return confidence_intervals(replicates, observed_statistics(design), level)
+
+# 使用例
+if __name__ == "__main__":
+    feature_file = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/features.parquet'  # features.py の出力
+    features = pd.read_parquet(feature_file)
+    for column in ["cycle_time", "stance_time", "angle_last"]:
+        print(column)
+        print(bootstrap_table(features, column))
@@ -1,8 +1,16 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import glob
 
+from figure_batch import FigureDataset
+from render import FigureJob, RenderQueue, render_figure
+from style import PALETTE, paper_rc
+
+# グラフの書式（style.py の論文用の書式を各図の描画時にだけ適用する）
+BOXPLOT_RC = paper_rc(None)
+
+# 図の大きさ [inch]
+FIGSIZE = (8, 6)
+
 def get_common_name(file_path):
     """
     ファイル名から共通部分を取得（_KS または _1 の前まで）
@@ -20,7 +28,7 @@ def get_common_name(file_path):
     base_name = os.path.basename(file_path)
     return base_name.rsplit("_", 1)[0]  # "_1" または "_KS" の前の部分を返す
 
-def get_y_axis_limits(csv_files):
+def get_y_axis_limits(csv_files, dataset=None):
     """
     指定されたCSVファイル群のデータの範囲を取得し、y軸の最大値を統一（大きい方に合わせる）。
 
@@ -28,42 +36,87 @@ def get_y_axis_limits(csv_files):
     ----------
     csv_files : list
         CSVファイルのパスのリスト
+    dataset : FigureDataset, optional
+        読み込み済みのデータ。指定した場合はファイルを読み直さず、列ごとの最小・最大値の要約を使う。
 
     Returns:
     -------
     dict
         各共通ファイル名ごとのy軸の最小値と最大値（見切れ防止のため余裕を持たせる）
     """
-    y_limits = {}
-
-    for file_path in csv_files:
-        common_name = get_common_name(file_path)
+    if dataset is None:
+        dataset = FigureDataset(csv_files, 2)
+    return dataset.group_limits(get_common_name)
 
-        try:
-            df = pd.read_csv(file_path, header=None)
-            if df.shape[1] < 2:
-                print(f"File {file_path} does not have enough columns. Skipping.")
-                continue
-
-            # 1列目と2列目のデータを取得
-            col1 = df[0].dropna()
-            col2 = df[1].dropna()
-
-            min_val = min(col1.min(), col2.min())
-            max_val = max(col1.max(), col2.max())
+def boxplot_job(file_path, output_dir, y_limits, dataset):
+    """
+    指定したCSVファイルの1列目と2列目のデータを用いたboxplotの描画ジョブを作る。
 
-            if common_name not in y_limits:
-                y_limits[common_name] = [min_val, max_val]
-            else:
-                y_limits[common_name][0] = min(y_limits[common_name][0], min_val)
-                y_limits[common_name][1] = max(y_limits[common_name][1], max_val)
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+    output_dir : str
+        グラフを保存するディレクトリ。
+    y_limits : dict
+        各共通名に対するy軸の最小・最大値を格納する辞書
+    dataset : FigureDataset
+        読み込み済みのデータ。
 
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
+    Returns:
+    -------
+    tuple or None
+        (描画関数, 保存先のパス, 描画関数の引数)。列が足りない・ファイル名が想定外の場合は None。
+    """
+    # 必要な列が存在するか確認
+    if file_path not in dataset:
+        return None
 
-    return y_limits
+    # 1列目と2列目のデータを取得
+    col1, col2 = dataset.columns(file_path)
 
-def plot_boxplot(file_path, output_dir, y_limits):
+    # ファイル名を取得
+    base_name = os.path.basename(file_path)
+    title_part = get_common_name(file_path)
+
+    # x軸ラベルと出力ファイル名を決定
+    if base_name.endswith("_1.csv"):
+        labels = ["pre", "propet"]
+        output_filename = f"{title_part}_prepropet.png"
+    elif base_name.endswith("_KS.csv"):
+        labels = ["not propet", "propet"]
+        output_filename = f"{title_part}_nopropet.png"
+    else:
+        print(f"Skipping file {file_path} due to unknown naming pattern.")
+        return None
+
+    # y軸の最大値を統一し、見切れを防ぐ（余裕を持たせる）
+    ylim = None
+    if title_part in y_limits:
+        y_min, y_max = y_limits[title_part]
+        ylim = (min(0, y_min), y_max * 1.1)  # 最大値の1.1倍で設定
+
+    output_file = os.path.join(output_dir, output_filename)
+    return draw_boxplot, output_file, (col1.to_numpy(), col2.to_numpy(), labels, title_part, ylim)
+
+def draw_boxplot(fig, col1, col2, labels, title, ylim=None):
+    """ 2列のboxplotを fig に描画する """
+    ax = fig.add_subplot()
+    ax.boxplot([col1, col2], medianprops={"color": PALETTE["red"]})
+    ax.set_xticks([1, 2], labels)
+
+    # タイトルとラベルのサイズを1.3倍に設定
+    ax.set_title(title, fontsize=16)  # デフォルト12 × 1.3
+    ax.set_xlabel("", fontsize=13)  # デフォルト10 × 1.3
+    ax.set_ylabel("Value", fontsize=13)  # デフォルト10 × 1.3
+
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+
+    # 中目盛り線を削除
+    ax.grid(False)
+
+def plot_boxplot(file_path, output_dir, y_limits, dataset=None):
     """
     指定したCSVファイルの1列目と2列目のデータを用いてboxplotを作成し、出力する。
 
@@ -75,69 +128,29 @@ def plot_boxplot(file_path, output_dir, y_limits):
         グラフを保存するディレクトリ。
     y_limits : dict
         各共通名に対するy軸の最小・最大値を格納する辞書
+    dataset : FigureDataset, optional
+        読み込み済みのデータ。指定しない場合はファイルを読み込む。
     """
     try:
-        # CSVファイルを読み込む
-        df = pd.read_csv(file_path, header=None)
-
-        # 必要な列が存在するか確認
-        if df.shape[1] < 2:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return
+        # CSVファイルを読み込む（読み込み済みならそれを使う）
+        if dataset is None:
+            dataset = FigureDataset([file_path], 2)
 
-        # 1列目と2列目のデータを取得
-        col1 = df[0].dropna()
-        col2 = df[1].dropna()
-
-        # ファイル名を取得
-        base_name = os.path.basename(file_path)
-        title_part = get_common_name(file_path)
-
-        # x軸ラベルと出力ファイル名を決定
-        if base_name.endswith("_1.csv"):
-            labels = ["pre", "propet"]
-            output_filename = f"{title_part}_prepropet.png"
-        elif base_name.endswith("_KS.csv"):
-            labels = ["not propet", "propet"]
-            output_filename = f"{title_part}_nopropet.png"
-        else:
-            print(f"Skipping file {file_path} due to unknown naming pattern.")
+        job = boxplot_job(file_path, output_dir, y_limits, dataset)
+        if job is None:
             return
-
-        # Boxplotを作成
-        plt.figure(figsize=(8, 6))
-        plt.boxplot([col1, col2], labels=labels)
-
-        # フォント設定
-        plt.rcParams["font.family"] = "Arial"
-
-        # タイトルとラベルのサイズを1.3倍に設定
-        plt.title(title_part, fontsize=16)  # デフォルト12 × 1.3
-        plt.xlabel("", fontsize=13)  # デフォルト10 × 1.3
-        plt.ylabel("Value", fontsize=13)  # デフォルト10 × 1.3
-
-        # y軸の最大値を統一し、見切れを防ぐ（余裕を持たせる）
-        if title_part in y_limits:
-            y_min, y_max = y_limits[title_part]
-            plt.ylim(min(0, y_min), y_max * 1.1)  # 最大値の1.1倍で設定
-
-        # 中目盛り線を削除
-        plt.grid(False)
-
-        # 保存
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, output_filename)
-        plt.savefig(output_file)
-        plt.close()
+        draw, output_file, args = job
+        render_figure(FigureJob(draw, output_file, args, FIGSIZE, BOXPLOT_RC))
         print(f"Boxplot saved to {output_file}")
 
     except Exception as e:
         print(f"Error processing file {file_path}: {e}")
 
-def process_all_files(input_dir, output_dir):
+def process_all_files(input_dir, output_dir, max_workers=None, timeout=None):
     """
     フォルダ内のすべてのCSVファイルを処理し、1列目と2列目のboxplotを作成して保存する。
     同じ共通名のグラフはy軸の最大値を統一し、見切れが発生しないようにする。
+    描画はプロセスプールで並列に行う。
 
     Parameters:
     ----------
@@ -145,23 +158,32 @@ def process_all_files(input_dir, output_dir):
         入力CSVファイルが保存されているフォルダ。
     output_dir : str
         グラフを保存するディレクトリ。
+    max_workers : int, optional
+        描画に使うワーカープロセス数。None の場合は CPU コア数。
+    timeout : float, optional
+        1枚あたりの制限時間（秒）。
     """
     # 入力ディレクトリ内のすべてのCSVファイルを取得
-    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+    csv_files = sorted(glob.glob(os.path.join(input_dir, "*.csv")))
+
+    # 各ファイルを1回だけ読み込み、その要約から各共通名ごとのy軸の最大値を取得（見切れを防ぐため余裕を持たせる）
+    dataset = FigureDataset(csv_files, 2)
+    y_limits = get_y_axis_limits(csv_files, dataset)
 
-    # 各共通名ごとのy軸の最大値を取得（見切れを防ぐため余裕を持たせる）
-    y_limits = get_y_axis_limits(csv_files)
+    queue = RenderQueue()
+    for file_path in dataset.files:
+        job = boxplot_job(file_path, output_dir, y_limits, dataset)
+        if job is not None:
+            draw, output_file, args = job
+            queue.add(draw, output_file, *args, figsize=FIGSIZE, rc=BOXPLOT_RC)
 
-    for file_path in csv_files:
-        try:
-            plot_boxplot(file_path, output_dir, y_limits)
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
+    queue.run(max_workers=max_workers, timeout=timeout)
 
 # 使用例
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/boxplot"  # 入力CSVファイルが保存されているフォルダ
-output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/boxplot"  # グラフを保存するフォルダ
-process_all_files(input_dir, output_dir)
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/boxplot"  # 入力CSVファイルが保存されているフォルダ
+    output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/boxplot"  # グラフを保存するフォルダ
+    process_all_files(input_dir, output_dir)
 
 
 
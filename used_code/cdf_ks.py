@@ -1,9 +1,11 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.stats import ks_2samp
 import os
 
+from ecdf import ECDF
+from section_stats import ks_pvalue
+
 def process_csv(file_path, output_dir):
     """
     CSVファイルの0,1,2列目のデータから累積確率分布をプロットし、
@@ -32,22 +34,25 @@ def process_csv(file_path, output_dir):
         print(f"Required columns missing in file {file_path}: {e}")
         return
 
+    # 各列の ECDF は1回だけソートし、KS検定と累積確率分布のプロットの両方に使う
+    ecdf0 = ECDF(col0)
+    ecdf1 = ECDF(col1)
+    #ecdf2 = ECDF(col2)
+
     # KS検定を実行
-    ks_result_01 = ks_2samp(col0, col1)  # 列0 vs 列1
-    #ks_result_02 = ks_2samp(col0, col2)  # 列0 vs 列2
-    #ks_result_12 = ks_2samp(col1, col2)  # 列1 vs 列2
+    ks_statistic_01 = ecdf0.ks_distance(ecdf1)  # 列0 vs 列1
+    #ks_statistic_02 = ecdf0.ks_distance(ecdf2)  # 列0 vs 列2
+    #ks_statistic_12 = ecdf1.ks_distance(ecdf2)  # 列1 vs 列2
 
     # KS検定のp値
-    p_value_01 = ks_result_01.pvalue
-    #p_value_02 = ks_result_02.pvalue
-    #p_value_12 = ks_result_12.pvalue
+    p_value_01 = ks_pvalue(ks_statistic_01, ecdf0.x, ecdf1.x)
+    #p_value_02 = ks_pvalue(ks_statistic_02, ecdf0.x, ecdf2.x)
+    #p_value_12 = ks_pvalue(ks_statistic_12, ecdf1.x, ecdf2.x)
 
     # 累積確率分布のプロット
     plt.figure(figsize=(10, 6))
-    for col, label in zip([col0, col1], ['without propet', 'propet']):
-        sorted_data = np.sort(col)
-        cumulative = np.arange(1, len(sorted_data) + 1) / len(sorted_data)
-        plt.plot(sorted_data, cumulative, label=label)
+    for ecdf, label in zip([ecdf0, ecdf1], ['without propet', 'propet']):
+        plt.plot(ecdf.x, ecdf.p, label=label)
 
     # グラフの設定
     plt.title("Stancemax Swingmin Time")
@@ -67,13 +72,14 @@ def process_csv(file_path, output_dir):
     ks_results_file = os.path.join(output_dir, "ks_test_Stm_Swm_KS_KS.csv")
     ks_results = pd.DataFrame({
         "Comparison": ['without propet vs propet'],
-        "KS Statistic": [ks_result_01.statistic],
+        "KS Statistic": [ks_statistic_01],
         "p-value": [p_value_01]
     })
     ks_results.to_csv(ks_results_file, index=False)
     print(f"KS test results saved to {ks_results_file}")
 
 # 使用例
-input_csv = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho/swing_duration_a.csv"  # 入力CSVファイルのパス
-output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho"  # 結果を保存するフォルダ
-process_csv(input_csv, output_dir)
+if __name__ == "__main__":
+    input_csv = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho/swing_duration_a.csv"  # 入力CSVファイルのパス
+    output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho"  # 結果を保存するフォルダ
+    process_csv(input_csv, output_dir)
@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+
+class CycleIndex:
+    """
+    空白行（先頭列が NaN の行）で区切られたサイクルの索引。
+    データは1つの連続した配列に置いたまま、各サイクルの開始・終了位置だけを持つので、
+    どのサイクルも配列のビュー（コピーなし）として O(1) で取り出せる。
+
+    Attributes:
+    ----------
+    data : np.ndarray
+        セッション全体のデータ (フレーム数, 列数)。
+    starts, stops : np.ndarray
+        各サイクルの開始行と終了行（終了行は含まない）。
+    """
+
+    def __init__(self, data, starts, stops):
+        self.data = data
+        self.starts = starts
+        self.stops = stops
+
+    @classmethod
+    def from_array(cls, data, key_column=0):
+        """
+        配列からサイクルの索引を作る。key_column が NaN の行を区切りとみなす（連続した空白行も1つの区切り）。
+
+        Parameters:
+        ----------
+        data : array-like
+            セッション全体のデータ (フレーム数, 列数)。
+        key_column : int
+            区切りの判定に使う列。
+
+        Returns:
+        -------
+        CycleIndex
+            サイクルの索引。
+        """
+        data = np.asarray(data, dtype=float)
+        valid = ~np.isnan(data[:, key_column])
+        edges = np.diff(np.concatenate(([0], valid.astype(np.int8), [0])))
+        return cls(data, np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+    @classmethod
+    def from_frame(cls, df, key_column=0, columns=None):
+        """
+        ヘッダーなしで読み込んだデータフレームからサイクルの索引を作る。
+        数値に変換するのは key_column と columns の列だけで、変換できないセル（L/N 列の " " など）は NaN にする。
+
+        Parameters:
+        ----------
+        df : pd.DataFrame
+            ヘッダーなしで読み込んだデータフレーム。
+        key_column : int
+            区切りの判定に使う列。
+        columns : list of int, optional
+            使う列（None の場合は全列）。それ以外の列は NaN のまま（列番号は df と同じ）。
+
+        Returns:
+        -------
+        CycleIndex
+            サイクルの索引。
+        """
+        columns = range(df.shape[1]) if columns is None else sorted(set(columns) | {key_column})
+        data = np.full(df.shape, np.nan)
+        for c in columns:
+            data[:, c] = pd.to_numeric(df.iloc[:, c], errors="coerce")
+        return cls.from_array(data, key_column)
+
+    @classmethod
+    def from_csv(cls, file_path, key_column=0, columns=None):
+        """ 空白行で区切られた CSV を読み込み、サイクルの索引を作る（from_frame を参照） """
+        return cls.from_frame(pd.read_csv(file_path, header=None), key_column, columns)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        """ i 番目のサイクル（data のビュー）。スライスの場合はビューのリスト """
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.data[self.starts[i]:self.stops[i]]
+
+    @property
+    def lengths(self):
+        """ 各サイクルのフレーム数 """
+        return self.stops - self.starts
+
+    def window(self, start, count):
+        """ start 番目から連続した count 個のサイクル（ビューのリスト） """
+        return self[start:start + count]
+
+    def random_window(self, count=10, seed=None):
+        """
+        連続した count 個のサイクルをランダムに選ぶ。同じ seed なら毎回同じサイクルが選ばれる。
+        開始位置は 0 〜 (サイクル数 - count - 1) の範囲から選ぶ。
+
+        Parameters:
+        ----------
+        count : int
+            選ぶサイクルの数。
+        seed : int, optional
+            乱数のシード。
+
+        Returns:
+        -------
+        start : int
+            選んだ最初のサイクルの番号。
+        cycles : list of np.ndarray
+            選んだサイクル（ビュー）。
+        """
+        if len(self) <= count:
+            raise ValueError(f"Need more than {count} cycles, got {len(self)}")
+        start = int(np.random.default_rng(seed).integers(0, len(self) - count))
+        return start, self.window(start, count)
+
+    def resampled(self, indices, n_points=100, columns=None):
+        """
+        選んだサイクルを、それぞれ n_points 点に線形補間して揃える（重ね描き・平均用）。
+
+        Parameters:
+        ----------
+        indices : array-like
+            サイクルの番号。
+        n_points : int
+            1サイクルあたりの点数。
+        columns : list of int, optional
+            補間する列。None の場合は全列。
+
+        Returns:
+        -------
+        np.ndarray
+            (サイクル数, n_points, 列数) の配列。
+        """
+        columns = list(range(self.data.shape[1])) if columns is None else list(columns)
+        grid = np.linspace(0, 1, n_points)
+        out = np.empty((len(indices), n_points, len(columns)))
+        for k, i in enumerate(indices):
+            cycle = self[i][:, columns]
+            phase = np.linspace(0, 1, len(cycle))
+            for j in range(len(columns)):
+                out[k, :, j] = np.interp(grid, phase, cycle[:, j])
+        return out
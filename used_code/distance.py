@@ -2,6 +2,20 @@ import pandas as pd
 import numpy as np
 import glob
 import os
+import sys
+
+# process 内の batch.py / cache.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from batch import report_errors
+from cache import run_cached_stage
+
+# 各キーポイントの (x列, y列)（modify.py 処理後の列インデックス）
+KEYPOINTS = {
+    "wrist": (0, 1),
+    "elbow": (2, 3),
+    "shoulder": (4, 5),
+}
 
 def calculate_distance(coord1, coord2):
     """
@@ -21,32 +35,125 @@ def calculate_distance(coord1, coord2):
     """
     return np.sqrt((coord1[0] - coord2[0])**2 + (coord1[1] - coord2[1])**2)
 
-# CSV ファイルが保存されているディレクトリのパス
-input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # ここを実際のパスに変更してください
+def calculate_step_distances(coords):
+    """
+    フレーム間の移動距離を全フレーム・全キーポイント分まとめて計算する。
+    最初のフレームの値は 0.0。
 
-# 指定ディレクトリ内の全ての CSV ファイルを取得
-csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+    Parameters:
+    -----------
+    coords : array-like
+        (N, D) の1キーポイント分の座標、または (N, K, D) の K キーポイント分の座標
+
+    Returns:
+    --------
+    np.ndarray
+        (N,) または (N, K) の移動距離
+    """
+    coords = np.asarray(coords, dtype=float)
+    distances = np.zeros(coords.shape[:-1])
+    distances[1:] = np.sqrt(np.sum(np.diff(coords, axis=0)**2, axis=-1))
+    return distances
+
+def calculate_path_lengths(distances):
+    """
+    移動距離から累積移動距離（軌跡長）を計算する。NaN のフレームは 0 として扱う。
+
+    Parameters:
+    -----------
+    distances : array-like
+        calculate_step_distances の戻り値
+
+    Returns:
+    --------
+    np.ndarray
+        distances と同じ形の累積移動距離
+    """
+    return np.nancumsum(distances, axis=0)
+
+def calculate_speeds(distances, fps=60):
+    """
+    移動距離から瞬間速度（距離/秒）を計算する。
+
+    Parameters:
+    -----------
+    distances : array-like
+        calculate_step_distances の戻り値
+    fps : float
+        フレームレート
+
+    Returns:
+    --------
+    np.ndarray
+        distances と同じ形の速度
+    """
+    return np.asarray(distances, dtype=float) * fps
+
+def get_keypoint_coords(df, keypoints=KEYPOINTS):
+    """
+    データフレームから指定キーポイントの座標を (N, K, 2) 配列として取り出す。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム。
+    keypoints : dict
+        キーポイント名 -> (x列, y列) の辞書。
+
+    Returns:
+    -------
+    np.ndarray
+        (N, K, 2) の座標配列
+    """
+    columns = [col for xy in keypoints.values() for col in xy]
+    return df.iloc[:, columns].to_numpy(dtype=float).reshape(len(df), len(keypoints), 2)
+
+def compute_displacement(df, keypoints=KEYPOINTS, fps=60):
+    """
+    全キーポイントの移動距離・累積移動距離・速度をまとめて計算する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム。
+    keypoints : dict
+        キーポイント名 -> (x列, y列) の辞書。
+    fps : float
+        フレームレート
+
+    Returns:
+    -------
+    pd.DataFrame
+        "<キーポイント名>_distance", "<キーポイント名>_path_length", "<キーポイント名>_speed" の列を持つデータフレーム。
+    """
+    distances = calculate_step_distances(get_keypoint_coords(df, keypoints))
+    path_lengths = calculate_path_lengths(distances)
+    speeds = calculate_speeds(distances, fps)
+
+    result = {}
+    for k, name in enumerate(keypoints):
+        result[f"{name}_distance"] = distances[:, k]
+        result[f"{name}_path_length"] = path_lengths[:, k]
+        result[f"{name}_speed"] = speeds[:, k]
+    return pd.DataFrame(result, index=df.index)
+
+def add_distance_column(df):
+    """
+    手首 (wrist: A列 x, B列 y) の移動距離を計算し、J列 (列インデックス9) に追加する。
+
+    Parameters:
+    ----------
+    df : pd.DataFrame
+        ヘッダーなしで読み込んだデータフレーム（最低限2列必要）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        移動距離の列を追加したデータフレーム。
+    """
+    # 移動距離を計算（J1 (最初の距離) は 0）
+    distances = calculate_step_distances(df.iloc[:, [0, 1]].values)
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
-    
-    # ヘッダーがないと仮定して読み込む
-    df = pd.read_csv(file_path, header=None)
-    
-    # 列数を確認（最低限2列必要: A (x), B (y)）
-    if df.shape[1] < 2:
-        print(f"Error: {file_path} has fewer than 2 columns. Skipping.")
-        continue
-    
-    # 手首 (wrist) の座標を取得 (A列: x, B列: y)
-    wrist_coords = df.iloc[:, [0, 1]].values  # (x, y) の2次元配列を取得
-    
-    # 移動距離を計算
-    distances = [0.0]  # J1 (最初の距離) は 0
-    for i in range(1, len(wrist_coords)):
-        dist = calculate_distance(wrist_coords[i - 1], wrist_coords[i])
-        distances.append(dist)
-    
     # J列 (列インデックス9) に移動距離を追加
     # 既にJ列が存在する場合は上書き、新規の場合は追加
     if df.shape[1] > 9:
@@ -55,14 +162,68 @@ for file_path in csv_files:
         for i in range(df.shape[1], 9):
             df[i] = np.nan  # 必要な列まで埋める
         df[9] = distances
-    
-    # 出力ファイル名を作成（例: "data.csv" → "data_with_distance.csv"）
+
+    return df
+
+def output_path_for(file_path):
+    """ 出力ファイルのパス（例: "data.csv" → "data_with_distance.csv"、入力と同じフォルダ）を返す """
     base_name = os.path.splitext(os.path.basename(file_path))[0]
-    new_file_name = f"{base_name}_with_distance.csv"
-    output_path = os.path.join(input_dir, new_file_name)
-    
+    return os.path.join(os.path.dirname(file_path), f"{base_name}_with_distance.csv")
+
+def add_distance_to_file(file_path):
+    """
+    1つのCSVファイルに手首の移動距離の列を追加し、"_with_distance.csv" として同じフォルダに保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    # ヘッダーがないと仮定して読み込む
+    df = pd.read_csv(file_path, header=None)
+
+    # 列数を確認（最低限2列必要: A (x), B (y)）
+    if df.shape[1] < 2:
+        raise ValueError(f"{file_path} has fewer than 2 columns.")
+
+    df = add_distance_column(df)
+
+    # 出力ファイル名を作成（例: "data.csv" → "data_with_distance.csv"）
+    output_path = output_path_for(file_path)
+
     # CSV を保存（ヘッダーなし、インデックスなし）
     df.to_csv(output_path, index=False, header=False)
-    print(f"Saved to: {output_path}\n")
+    return output_path
+
+def process_all_files(input_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、手首の移動距離の列を追加して "_with_distance.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ（出力先も同じ）。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    # 指定ディレクトリ内の全ての CSV ファイルを取得
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+
+    results = run_cached_stage(add_distance_to_file, csv_files, output_path_for, "distance", {"keypoint": "wrist", "column": 9},
+                               input_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
 
-print("All files processed successfully.")
+# 使用例
+if __name__ == "__main__":
+    # CSV ファイルが保存されているディレクトリのパス
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify'  # ここを実際のパスに変更してください
+    process_all_files(input_dir)
@@ -0,0 +1,100 @@
+import pandas as pd
+import numpy as np
+import warnings
+
+# hist.csv（ヘッダーなしの横長の表）の列の並び
+# ラットごとに 18 列のブロックがあり、ブロック内は pre / propet / post の順に 6 列ずつ並ぶ
+RATS = ["rat8_1106", "rat9_1106", "rat10_1102", "rat10_1106", "rat11_1102", "rat11_1106"]
+PHASES = ["pre", "propet", "post"]
+N_METRICS = 6  # 1つの条件あたりの列数（列 0 はサイクル時間）
+
+def wide_keys(n_columns, rats=RATS, phases=PHASES, n_metrics=N_METRICS):
+    """
+    横長の表の各列に (rat, phase, metric) のキーを割り当てる（a806 + 6 などの列番号の計算の代わり）。
+
+    Parameters:
+    ----------
+    n_columns : int
+        表の列数。
+    rats : list of str
+        ブロックの順番のラット名。
+    phases : list of str
+        ブロック内の条件の順番。
+    n_metrics : int
+        1つの条件あたりの列数。
+
+    Returns:
+    -------
+    pd.MultiIndex
+        (rat, phase, metric) のインデックス（長さ n_columns）。
+    """
+    block = len(phases) * n_metrics
+    if n_columns > len(rats) * block:
+        raise ValueError(f"Table has {n_columns} columns, but only {len(rats) * block} are described")
+    column = np.arange(n_columns)
+    return pd.MultiIndex.from_arrays([
+        np.asarray(rats)[column // block],
+        np.asarray(phases)[(column % block) // n_metrics],
+        column % n_metrics,
+    ], names=["rat", "phase", "metric"])
+
+def read_wide_table(file_path, rats=RATS, phases=PHASES, n_metrics=N_METRICS):
+    """ ヘッダーなしの横長の表を読み込み、列に (rat, phase, metric) のキーを付ける """
+    table = pd.read_csv(file_path, header=None)
+    table.columns = wide_keys(table.shape[1], rats, phases, n_metrics)
+    return table
+
+def grouped_histograms(table, bin_edges):
+    """
+    全列のヒストグラムを共通のビンで1回の計算でまとめて求める（np.histogram と同じく最後のビンは右端を含む）。
+
+    Parameters:
+    ----------
+    table : pd.DataFrame
+        列ごとの値（NaN は無視する）。
+    bin_edges : array-like
+        ビンの境界（単調増加）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        (列数, ビン数) の度数の表（行は table の列）。
+    """
+    bin_edges = np.asarray(bin_edges, dtype=float)
+    n_bins = len(bin_edges) - 1
+    values = table.to_numpy(dtype=float)
+
+    bins = np.searchsorted(bin_edges, values, side="right") - 1
+    bins[values == bin_edges[-1]] = n_bins - 1  # 右端の値は最後のビンに入れる
+    inside = (bins >= 0) & (bins < n_bins) & ~np.isnan(values)
+
+    column = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+    counts = np.bincount(column[inside] * n_bins + bins[inside], minlength=values.shape[1] * n_bins)
+    return pd.DataFrame(counts.reshape(values.shape[1], n_bins), index=table.columns,
+                        columns=pd.Index(bin_edges[:-1], name="bin_start"))
+
+def grouped_summary(table):
+    """
+    全列の件数・中央値・四分位数・四分位範囲をまとめて求める。
+
+    Parameters:
+    ----------
+    table : pd.DataFrame
+        列ごとの値（NaN は無視する）。
+
+    Returns:
+    -------
+    pd.DataFrame
+        行が table の列、列が "n", "median", "q1", "q3", "iqr" の表。
+    """
+    values = table.to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 値が1つもない列
+        q1, median, q3 = np.nanpercentile(values, [25, 50, 75], axis=0)
+    return pd.DataFrame({
+        "n": np.sum(~np.isnan(values), axis=0),
+        "median": median,
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+    }, index=table.columns)
@@ -0,0 +1,134 @@
+import pandas as pd
+import numpy as np
+import os
+from functools import lru_cache
+
+class ECDF:
+    """
+    1サンプルの経験累積分布関数（ECDF）。
+    値のソートは作成時の1回だけで、プロット・評価・分位点・KS距離はすべてソート済みの配列を使い回す。
+
+    Attributes:
+    ----------
+    x : np.ndarray
+        欠損値を除いて昇順にソートした値（読み取り専用）。
+    p : np.ndarray
+        x の各点での累積確率（1/n, 2/n, ..., 1）。プロットには plot(x, p) を使う。
+    n : int
+        サンプル数。
+    """
+
+    def __init__(self, values, assume_sorted=False):
+        """
+        Parameters:
+        ----------
+        values : array-like
+            サンプル（NaN は除外する）。
+        assume_sorted : bool
+            True の場合、values は欠損値を含まない昇順の配列とみなしてソートしない。
+        """
+        if assume_sorted:
+            x = np.array(values, dtype=float)  # 呼び出し側の配列を読み取り専用にしないようコピーする
+        else:
+            x = np.asarray(values, dtype=float)
+            x = np.sort(x[~np.isnan(x)])
+        x.flags.writeable = False
+
+        self.x = x
+        self.n = len(x)
+        self.p = np.arange(1, self.n + 1) / self.n
+        self.p.flags.writeable = False
+
+    def __len__(self):
+        return self.n
+
+    def __call__(self, points):
+        return self.evaluate(points)
+
+    def evaluate(self, points):
+        """ 任意の点での累積確率 F(points) = (points 以下の値の数) / n を返す """
+        return np.searchsorted(self.x, points, side="right") / self.n
+
+    def quantile(self, q):
+        """ 分位点（F(x) >= q となる最小の x、逆関数型の定義）を返す。空の ECDF の場合は NaN """
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)[()]
+        idx = np.ceil(q * self.n).astype(int) - 1
+        return self.x[np.clip(idx, 0, self.n - 1)]
+
+    def scaled(self, factor):
+        """ 値を factor 倍した ECDF を返す（factor > 0 なら順序は変わらないので再ソートしない） """
+        if factor > 0:
+            return ECDF(self.x * factor, assume_sorted=True)
+        return ECDF(self.x * factor)
+
+    def ks_distance(self, other):
+        """
+        もう1つの ECDF との KS距離（2つの累積分布関数の差の最大値）を計算する。
+        どちらもソート済みなので、安定ソート（ソート済みの2区間をマージするだけ）で O(n+m) で計算できる。
+
+        Parameters:
+        ----------
+        other : ECDF
+            比較する ECDF。
+
+        Returns:
+        -------
+        float
+            KS統計量 D。どちらかが空の場合は NaN。
+        """
+        if self.n == 0 or other.n == 0:
+            return np.nan
+
+        merged = np.concatenate([self.x, other.x])
+        order = np.argsort(merged, kind="stable")
+        from_self = order < self.n
+        merged = merged[order]
+
+        diff = np.abs(np.cumsum(from_self) / self.n - np.cumsum(~from_self) / other.n)
+        # 同じ値が続く場合は、その最後の位置でだけ比較する
+        last_of_ties = np.ones(len(merged), dtype=bool)
+        last_of_ties[:-1] = merged[1:] != merged[:-1]
+        return float(np.max(diff[last_of_ties]))
+
+@lru_cache(maxsize=256)
+def _read_table(path, mtime_ns):
+    return pd.read_csv(path, header=None)
+
+def read_table(file_path):
+    """
+    ヘッダーなし CSV を読み込む。同じファイル（更新時刻も同じ）の2回目以降は読み込み済みのものを返す。
+    返すデータフレームは共有されるので、書き換えないこと。
+    """
+    path = os.path.abspath(file_path)
+    return _read_table(path, os.stat(path).st_mtime_ns)
+
+@lru_cache(maxsize=1024)
+def _ecdf(path, mtime_ns, column):
+    return ECDF(_read_table(path, mtime_ns)[column].to_numpy(dtype=float))
+
+def ecdf_for(file_path, column):
+    """
+    (ファイル, 列) ごとの ECDF を返す。同じファイル・列の2回目以降は作成済みのものを返すので、
+    プロットと検定で同じ列を何度もソートしない。ファイルが更新された場合は作り直す。
+
+    Parameters:
+    ----------
+    file_path : str
+        ヘッダーなし CSV のパス。
+    column : int
+        列インデックス。
+
+    Returns:
+    -------
+    ECDF
+        欠損値を除いた列の ECDF。
+    """
+    path = os.path.abspath(file_path)
+    return _ecdf(path, os.stat(path).st_mtime_ns, column)
+
+def clear_cache():
+    """ 読み込み済みの CSV と ECDF のキャッシュを消す """
+    _read_table.cache_clear()
+    _ecdf.cache_clear()
@@ -0,0 +1,77 @@
+import pandas as pd
+
+from ecdf import read_table
+
+class FigureDataset:
+    """
+    1回のグラフ作成でまとめて使う CSV 群を、各ファイル1回だけ読み込んで保持する。
+    列ごとの最小値・最大値も読み込み時に計算しておくので、グループごとの軸の範囲は
+    ディスクを読み直さずに決められる。
+
+    Attributes:
+    ----------
+    files : list of str
+        読み込めたファイルのパス（列数が足りないファイルは除く）。
+    summary : pd.DataFrame
+        1行 = 1ファイル・1列の要約（file, column, count, min, max）。
+    """
+
+    def __init__(self, csv_files, n_columns):
+        """
+        Parameters:
+        ----------
+        csv_files : list of str
+            CSVファイルのパスのリスト。
+        n_columns : int
+            各ファイルから使う列の数（列 0, 1, ..., n_columns-1）。
+        """
+        self.n_columns = n_columns
+        self.files = []
+        self._columns = {}
+        rows = []
+
+        for file_path in csv_files:
+            try:
+                df = read_table(file_path)
+            except Exception as e:
+                print(f"Error processing file {file_path}: {e}")
+                continue
+            if df.shape[1] < n_columns:
+                print(f"File {file_path} does not have enough columns. Skipping.")
+                continue
+
+            columns = [df[i].dropna() for i in range(n_columns)]
+            self.files.append(file_path)
+            self._columns[file_path] = columns
+            for i, col in enumerate(columns):
+                rows.append({"file": file_path, "column": i, "count": len(col),
+                             "min": col.min(), "max": col.max()})
+
+        self.summary = pd.DataFrame(rows, columns=["file", "column", "count", "min", "max"])
+
+    def __contains__(self, file_path):
+        return file_path in self._columns
+
+    def columns(self, file_path):
+        """ ファイルの列 0, 1, ... （欠損値を除いた pd.Series）のリストを返す """
+        return self._columns[file_path]
+
+    def group_limits(self, group_of):
+        """
+        グループ（例: 共通のファイル名）ごとに、全ファイル・全列の最小値と最大値をまとめる。
+
+        Parameters:
+        ----------
+        group_of : callable
+            ファイルのパスからグループ名を返す関数。
+
+        Returns:
+        -------
+        dict
+            グループ名 -> [最小値, 最大値]。
+        """
+        if len(self.summary) == 0:
+            return {}
+        groups = self.summary["file"].map(group_of)
+        limits = self.summary.groupby(groups, sort=False).agg(min=("min", "min"), max=("max", "max"))
+        return {name: [row["min"], row["max"]] for name, row in limits.iterrows()}
@@ -1,75 +1,95 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-a=pd.read_csv("hist.csv",header=None)
-#print(a)
-bin_edges = np.arange(0,201, 20)  # 0,10,20,...,100
+import os
 
-# フォント設定
-plt.rcParams["font.family"] = "serif"       # 使用するフォント
-plt.rcParams["font.serif"] = "Arial"
-plt.rcParams['xtick.labelsize'] = 7 # 横軸のフォントサイズ（軸のみ変更）
-plt.rcParams['ytick.labelsize'] = 7 # 縦軸のフォントサイズ（軸のみ変更）
-plt.rcParams['font.size'] = 7 #フォントサイズを設定 default : 12
+from distribution import PHASES, grouped_histograms, grouped_summary, read_wide_table
+from render import RenderQueue
+from style import green, purple, navy_blue, paper_rc
 
-# 軸設定
-#plt.rcParams["figure.figsize"] = [30/25.4, 30/25.4] #??mm/25.4で書く（inch -> cm）
-plt.rcParams["xtick.major.size"] = 2.26772      # x軸主目盛り線の長さ(単位ポイント)
-plt.rcParams["ytick.major.size"] = 2.26772      # y軸主目盛り線の長さ
-plt.rcParams["xtick.major.width"] = 0.566929     # x軸主目盛り線の線幅
-plt.rcParams["ytick.major.width"] = 0.566929     # y軸主目盛り線の線幅
-plt.rcParams["axes.linewidth"] = 0.566929        # グラフ囲う線の太さ
-plt.rcParams['xtick.top'] = False  #x軸の上部目盛り
-plt.rcParams['ytick.right'] = False  #y軸の右部目盛り
-plt.rcParams["figure.dpi"] = 300            # dpi(dots per inch)
-# ラスタープロットの太さ
-plt.rcParams["lines.linewidth"] = 0.566929
-#ラスタープロットの長さ
-plt.rcParams["lines.markersize"] = 2.26772
-#スキャッタープロットなどの点の大きさ
-plt.rcParams["lines.markersize"] = 2.26772
+# 条件ごとの色
+PHASE_COLORS = {"pre": green, "propet": purple, "post": navy_blue}
 
-# color
-blue =  np.array([0, 128, 192]) / 256
-red = np.array([255, 70, 50]) / 256
-pink = np.array([255, 150, 200]) / 256
-green = np.array([20, 180, 20]) / 256
-yellow = np.array([230, 160, 20]) / 256
-gray = np.array([128, 128, 128]) / 256
-purple  = np.array([200, 50, 255]) / 256
-light_blue = np.array([20, 200, 200]) / 256
-brown  = np.array([128, 0, 0]) / 256
-navy_blue  = np.array([0, 0, 100]) / 256
-vermilion  = np.array([228, 94, 50]) / 256
+# 各条件の中の列番号 -> グラフのタイトルに使う名前
+METRIC_NAMES = {0: "cycle time"}
 
-a806=0
-a906=a806+18
-a1002=a906+18
-a1006=a1002+18
-a1102=a1006+18
-a1106=a1102+18
+# ビンの境界（全ラット・全条件で共通）
+BIN_EDGES = np.arange(0, 201, 20)  # 0,20,40,...,200
 
-# ヒストグラム描画
-plt.hist(a[a806], alpha=0.5,bins=bin_edges, color=green, label='pre')
-plt.hist(a[a806+6], alpha=0.5, bins=bin_edges,color=purple, label='propet')
-plt.hist(a[a806+12], alpha=0.5, bins=bin_edges,color=navy_blue, label='post')
-#1002:+18  1102:+36
-# Data1の中央値
-median1 = a[a806].median()
-print(median1)
-plt.axvline(median1, color=green, linewidth=1, label='Median pre',zorder=3)
+# グラフの書式（各図の描画時にだけ適用する）
+PLOT_RC = paper_rc(None)
 
-# Data2の中央値
-median2 = a[a806+6].median()
-plt.axvline(median2, color=purple, linewidth=1, label='Median propet',zorder=3)
+def draw_histogram(fig, bin_edges, counts, medians, title):
+    """
+    1匹分の pre / propet / post のヒストグラムと中央値の線を fig に描画する。
 
-median3 = a[a806+12].median()
-plt.axvline(median3, color=navy_blue, linewidth=1, label='Median post',zorder=3)
+    Parameters:
+    ----------
+    fig : matplotlib.figure.Figure
+        描画先。
+    bin_edges : np.ndarray
+        ビンの境界。
+    counts : dict
+        条件名 -> 各ビンの度数。
+    medians : dict
+        条件名 -> 中央値。
+    title : str
+        グラフのタイトル。
+    """
+    ax = fig.add_subplot()
+    for phase, count in counts.items():
+        # 計算済みの度数を、ビンの左端を値・度数を重みとして描く
+        ax.hist(bin_edges[:-1], bins=bin_edges, weights=count, alpha=0.5, color=PHASE_COLORS[phase], label=phase)
+    for phase, median in medians.items():
+        ax.axvline(median, color=PHASE_COLORS[phase], linewidth=1, label=f'Median {phase}', zorder=3)
 
-# 軸ラベルやタイトル、凡例
-plt.xlabel('Time')
-plt.ylabel('Frequency')
-plt.title('rat8 cycle time')
-plt.legend()
+    # 軸ラベルやタイトル、凡例
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Frequency')
+    ax.set_title(title)
+    ax.legend()
 
-plt.show()
+def process_all(hist_file, output_dir, metric=0, bin_edges=BIN_EDGES, max_workers=None):
+    """
+    横長の表の全ラット・全条件のヒストグラムと中央値・四分位範囲をまとめて計算し、
+    ラットごとのヒストグラムと要約の表を保存する。
+
+    Parameters:
+    ----------
+    hist_file : str
+        ヘッダーなしの横長の表（hist.csv）のパス。
+    output_dir : str
+        グラフと要約の表を保存するフォルダ。
+    metric : int
+        描画する列（各条件の中の列番号。0 はサイクル時間）。
+    bin_edges : array-like
+        ビンの境界。
+    max_workers : int, optional
+        描画に使うワーカープロセス数。
+
+    Returns:
+    -------
+    pd.DataFrame
+        (rat, phase, metric) ごとの n, median, q1, q3, iqr の表。
+    """
+    table = read_wide_table(hist_file)
+    counts = grouped_histograms(table, bin_edges)
+    summary = grouped_summary(table)
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary_file = os.path.join(output_dir, "hist_summary.csv")
+    summary.to_csv(summary_file)
+    print(f"Summary saved to {summary_file}")
+
+    queue = RenderQueue()
+    for rat in table.columns.get_level_values("rat").unique():
+        keys = [(rat, phase, metric) for phase in PHASES if (rat, phase, metric) in counts.index]
+        queue.add(draw_histogram, os.path.join(output_dir, f"{rat}_hist.png"), np.asarray(bin_edges),
+                  {key[1]: counts.loc[key].to_numpy() for key in keys},
+                  {key[1]: summary.loc[key, "median"] for key in keys},
+                  f"{rat.split('_')[0]} {METRIC_NAMES.get(metric, f'column {metric}')}", rc=PLOT_RC)
+    queue.run(max_workers=max_workers)
+    return summary
+
+# 使用例
+if __name__ == "__main__":
+    summary = process_all("hist.csv", "hist_fig")
+    print(summary.xs(0, level="metric")["median"])
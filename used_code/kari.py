@@ -1,26 +1,31 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import glob
 
-# color settings
-blue = np.array([0, 128, 192]) / 256
-navy_blue = np.array([0, 0, 100]) / 256
+from ecdf import ecdf_for, read_table
+from render import FigureJob, RenderQueue, render_figure
+from style import blue, navy_blue, paper_rc
+
+# グラフの書式（各図の描画時にだけ適用する）
+PAPER_RC = paper_rc((30, 30))
+
+# 図の大きさ [inch]
+FIGSIZE = (8, 6)
 
 def get_common_name(file_path):
     """ ファイル名から共通部分を取得（拡張子を除いた部分） """
     return os.path.splitext(os.path.basename(file_path))[0]
 
-def determine_labels_and_scaling(file_path, col1, col2):
-    """ ファイル名に応じて適切なラベルを設定し、timeなら値を60で割る """
+def determine_labels(file_path):
+    """ ファイル名に応じて適切なラベルと値の倍率（timeなら 1/60）を返す """
     file_name = os.path.basename(file_path).lower()
+    scale = 1
 
     if "time" in file_name:
         ylabel = "Time (s)"
         xlabel = "Time (s)"
-        col1 /= 60  # 60で割る
-        col2 /= 60
+        scale = 1 / 60  # 60で割る
     elif "angle_1" in file_name:
         ylabel = "Angle (°)"
         xlabel = "Angle (°)"
@@ -31,6 +36,14 @@ def determine_labels_and_scaling(file_path, col1, col2):
         ylabel = "Value"
         xlabel = "Value"
 
+    return ylabel, xlabel, scale
+
+def determine_labels_and_scaling(file_path, col1, col2):
+    """ ファイル名に応じて適切なラベルを設定し、timeなら値を60で割る """
+    ylabel, xlabel, scale = determine_labels(file_path)
+    if scale != 1:
+        col1 = col1 / 60
+        col2 = col2 / 60
     return ylabel, xlabel, col1, col2
 
 
@@ -41,145 +54,125 @@ def get_title_from_filename(file_path):
     title = title.title()  # 各単語の最初の文字を大文字に変換
     return title
 
-def plot_boxplot_scatter(file_path, output_dir):
-    """ BoxplotとScatterを重ねたプロットを作成し、保存する """
-    try:
-        df = pd.read_csv(file_path, header=None)
-        if df.shape[1] < 2:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return
+def boxplot_scatter_job(file_path, output_dir):
+    """ BoxplotとScatterを重ねたプロットの描画ジョブ（描画関数, 保存先, 引数）を作る。列が足りない場合は None """
+    df = read_table(file_path)
+    if df.shape[1] < 2:
+        print(f"File {file_path} does not have enough columns. Skipping.")
+        return None
 
-        col1, col2 = df[0].dropna(), df[1].dropna()
-        base_name = get_common_name(file_path)
-
-        # ラベルとスケーリングを適用
-        ylabel, _, col1, col2 = determine_labels_and_scaling(file_path, col1, col2)
-
-        # グラフタイトルをファイル名から取得
-        title = get_title_from_filename(file_path)
-
-        # フォント設定
-        plt.rcParams["font.family"] = "serif"       # 使用するフォント
-        plt.rcParams["font.serif"] = "Arial"
-        plt.rcParams['xtick.labelsize'] = 7 # 横軸のフォントサイズ（軸のみ変更）
-        plt.rcParams['ytick.labelsize'] = 7 # 縦軸のフォントサイズ（軸のみ変更）
-        plt.rcParams['font.size'] = 7 #フォントサイズを設定 default : 12
-
-        # 軸設定
-        plt.rcParams["figure.figsize"] = [30/25.4, 30/25.4] #??mm/25.4で書く（inch -> cm）
-        plt.rcParams["xtick.major.size"] = 2.26772      # x軸主目盛り線の長さ(単位ポイント)
-        plt.rcParams["ytick.major.size"] = 2.26772      # y軸主目盛り線の長さ
-        plt.rcParams["xtick.major.width"] = 0.566929     # x軸主目盛り線の線幅
-        plt.rcParams["ytick.major.width"] = 0.566929     # y軸主目盛り線の線幅
-        plt.rcParams["axes.linewidth"] = 0.566929        # グラフ囲う線の太さ
-        plt.rcParams['xtick.top'] = False  #x軸の上部目盛り
-        plt.rcParams['ytick.right'] = False  #y軸の右部目盛り
-        plt.rcParams["figure.dpi"] = 300            # dpi(dots per inch)
-        # ラスタープロットの太さ
-        plt.rcParams["lines.linewidth"] = 0.566929
-        #ラスタープロットの長さ
-        plt.rcParams["lines.markersize"] = 2.26772
-        #スキャッタープロットなどの点の大きさ
-        plt.rcParams["lines.markersize"] = 2.26772
-
-        plt.figure(figsize=(8, 6))
-        positions = [1, 2]
-
-        # Boxplot（塗りつぶしなし）
-        plt.boxplot([col1, col2], positions=positions, patch_artist=False, showfliers=False)
-        
-        # Scatterを重ねる
-        for i, col in enumerate([col1, col2], start=1):
-            plt.scatter([i] * len(col), col, alpha=0.6, color=blue if i == 1 else navy_blue)
-
-        # グラフタイトルをファイル名から取得
-        plt.title(title)
-        plt.xticks([1, 2], ["baseline", "propet"])
-        plt.ylabel(ylabel)
-
-        plt.grid(False)
-
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"{base_name}_boxplot_scatter.png")
-        plt.savefig(output_file)
-        plt.close()
-        print(f"Boxplot with Scatter saved to {output_file}")
+    col1, col2 = df[0].dropna(), df[1].dropna()
+    base_name = get_common_name(file_path)
 
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
+    # ラベルとスケーリングを適用
+    ylabel, _, col1, col2 = determine_labels_and_scaling(file_path, col1, col2)
 
+    # グラフタイトルをファイル名から取得
+    title = get_title_from_filename(file_path)
 
-def plot_cdf(file_path, output_dir):
-    """ 累積確率分布曲線（CDF）を作成し、保存する """
-    try:
-        df = pd.read_csv(file_path, header=None)
-        if df.shape[1] < 2:
-            print(f"File {file_path} does not have enough columns. Skipping.")
-            return
+    output_file = os.path.join(output_dir, f"{base_name}_boxplot_scatter.png")
+    return draw_boxplot_scatter, output_file, (col1.to_numpy(), col2.to_numpy(), title, ylabel)
+
+def draw_boxplot_scatter(fig, col1, col2, title, ylabel):
+    """ BoxplotとScatterを重ねたプロットを fig に描画する """
+    ax = fig.add_subplot()
+    positions = [1, 2]
 
-        col1, col2 = df[0].dropna(), df[1].dropna()
-        base_name = get_common_name(file_path)
-
-        # ラベルとスケーリングを適用
-        _, xlabel, col1, col2 = determine_labels_and_scaling(file_path, col1, col2)
-
-        # フォント設定
-        # フォント設定
-        plt.rcParams["font.family"] = "serif"       # 使用するフォント
-        plt.rcParams["font.serif"] = "Arial"
-        plt.rcParams['xtick.labelsize'] = 7 # 横軸のフォントサイズ（軸のみ変更）
-        plt.rcParams['ytick.labelsize'] = 7 # 縦軸のフォントサイズ（軸のみ変更）
-        plt.rcParams['font.size'] = 7 #フォントサイズを設定 default : 12
-
-        # 軸設定
-        plt.rcParams["figure.figsize"] = [30/25.4, 30/25.4] #??mm/25.4で書く（inch -> cm）
-        plt.rcParams["xtick.major.size"] = 2.26772      # x軸主目盛り線の長さ(単位ポイント)
-        plt.rcParams["ytick.major.size"] = 2.26772      # y軸主目盛り線の長さ
-        plt.rcParams["xtick.major.width"] = 0.566929     # x軸主目盛り線の線幅
-        plt.rcParams["ytick.major.width"] = 0.566929     # y軸主目盛り線の線幅
-        plt.rcParams["axes.linewidth"] = 0.566929        # グラフ囲う線の太さ
-        plt.rcParams['xtick.top'] = False  #x軸の上部目盛り
-        plt.rcParams['ytick.right'] = False  #y軸の右部目盛り
-        plt.rcParams["figure.dpi"] = 300            # dpi(dots per inch)
-        # ラスタープロットの太さ
-        plt.rcParams["lines.linewidth"] = 0.566929
-        #ラスタープロットの長さ
-        plt.rcParams["lines.markersize"] = 2.26772
-        #スキャッタープロットなどの点の大きさ
-        plt.rcParams["lines.markersize"] = 2.26772
-
-        plt.figure(figsize=(8, 6))
-        for col, label, color in zip([col1, col2], ["baseline", "propet"], [blue, navy_blue]):
-            sorted_data = np.sort(col)
-            cumulative = np.arange(1, len(sorted_data) + 1) / len(sorted_data)
-            plt.plot(sorted_data, cumulative, label=label, color=color)
-
-        plt.title(base_name)
-        plt.xlabel(xlabel)
-        plt.ylabel("Cumulative Probability")
-        plt.legend()
-
-        plt.grid(False)
-
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"{base_name}_cdf.png")
-        plt.savefig(output_file)
-        plt.close()
-        print(f"CDF plot saved to {output_file}")
+    # Boxplot（塗りつぶしなし）
+    ax.boxplot([col1, col2], positions=positions, patch_artist=False, showfliers=False)
 
+    # Scatterを重ねる
+    for i, col in enumerate([col1, col2], start=1):
+        ax.scatter([i] * len(col), col, alpha=0.6, color=blue if i == 1 else navy_blue)
+
+    ax.set_title(title)
+    ax.set_xticks(positions, ["baseline", "propet"])
+    ax.set_ylabel(ylabel)
+
+    ax.grid(False)
+
+def cdf_job(file_path, output_dir):
+    """ 累積確率分布曲線（CDF）の描画ジョブ（描画関数, 保存先, 引数）を作る。列が足りない場合は None """
+    if read_table(file_path).shape[1] < 2:
+        print(f"File {file_path} does not have enough columns. Skipping.")
+        return None
+
+    base_name = get_common_name(file_path)
+
+    # ラベルとスケーリングを適用（ソート済みの ECDF を倍率だけ変えて使う）
+    _, xlabel, scale = determine_labels(file_path)
+    ecdf1, ecdf2 = ecdf_for(file_path, 0).scaled(scale), ecdf_for(file_path, 1).scaled(scale)
+
+    output_file = os.path.join(output_dir, f"{base_name}_cdf.png")
+    return draw_cdf, output_file, (ecdf1, ecdf2, base_name, xlabel)
+
+def draw_cdf(fig, ecdf1, ecdf2, title, xlabel):
+    """ 累積確率分布曲線（CDF）を fig に描画する """
+    ax = fig.add_subplot()
+    for ecdf, label, color in zip([ecdf1, ecdf2], ["baseline", "propet"], [blue, navy_blue]):
+        ax.plot(ecdf.x, ecdf.p, label=label, color=color)
+
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Cumulative Probability")
+    ax.legend()
+
+    ax.grid(False)
+
+def _render_now(make_job, file_path, output_dir, kind):
+    """ 描画ジョブを作ってこのプロセスですぐに描画する（1枚だけ描く場合） """
+    try:
+        job = make_job(file_path, output_dir)
+        if job is None:
+            return
+        draw, output_file, args = job
+        render_figure(FigureJob(draw, output_file, args, FIGSIZE, PAPER_RC))
+        print(f"{kind} saved to {output_file}")
     except Exception as e:
         print(f"Error processing file {file_path}: {e}")
 
-def process_all_files(input_dir, output_dir):
-    """ 指定されたディレクトリ内のCSVファイルを処理し、グラフを作成 """
-    csv_files = glob.glob(os.path.join(input_dir, "*.csv"))
+def plot_boxplot_scatter(file_path, output_dir):
+    """ BoxplotとScatterを重ねたプロットを作成し、保存する """
+    _render_now(boxplot_scatter_job, file_path, output_dir, "Boxplot with Scatter")
 
+def plot_cdf(file_path, output_dir):
+    """ 累積確率分布曲線（CDF）を作成し、保存する """
+    _render_now(cdf_job, file_path, output_dir, "CDF plot")
+
+def process_all_files(input_dir, output_dir, max_workers=None, timeout=None):
+    """
+    指定されたディレクトリ内のCSVファイルを処理し、グラフを作成。
+    データの読み込みはこのプロセスで1回だけ行い、描画はプロセスプールで並列に行う。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_dir : str
+        グラフを保存するフォルダ。
+    max_workers : int, optional
+        描画に使うワーカープロセス数。None の場合は CPU コア数。
+    timeout : float, optional
+        1枚あたりの制限時間（秒）。
+    """
+    csv_files = sorted(glob.glob(os.path.join(input_dir, "*.csv")))
+
+    queue = RenderQueue()
     for file_path in csv_files:
-        plot_boxplot_scatter(file_path, output_dir)
-        plot_cdf(file_path, output_dir)
+        for make_job in (boxplot_scatter_job, cdf_job):
+            try:
+                job = make_job(file_path, output_dir)
+            except Exception as e:
+                print(f"Error processing file {file_path}: {e}")
+                continue
+            if job is not None:
+                draw, output_file, args = job
+                queue.add(draw, output_file, *args, figsize=FIGSIZE, rc=PAPER_RC)
+
+    queue.run(max_workers=max_workers, timeout=timeout)
 
 # データのあるディレクトリと出力先ディレクトリを指定
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho"  # 入力CSVファイルが保存されているフォルダ
-output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho/fig"  # グラフを保存するフォルダ
-process_all_files(input_dir, output_dir)
-
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho"  # 入力CSVファイルが保存されているフォルダ
+    output_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/seisho/fig"  # グラフを保存するフォルダ
+    process_all_files(input_dir, output_dir)
@@ -1,81 +1,51 @@
-import pandas as pd
 import os
-import glob
+import sys
 
-def process_csv(file_path):
-    """
-    指定したCSVファイルからmin_zero_Index列のデータを抽出する。
+# process 内の catalog.py / aggregate.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
 
-    Parameters:
-    ----------
-    file_path : str
-        入力CSVファイルのパス。
+from aggregate import build_aggregate, column_values, save_aggregate
+from catalog import SessionCatalog
 
-    Returns:
-    -------
-    pd.DataFrame
-        ファイル名とmin_zero_Index列の値を持つデータフレーム。
+def process_all_files(input_dir, output_file, phases=("pre", "propet"), trial=3, stage="processed", catalog=None):
     """
-    try:
-        # CSVファイルを読み込む
-        df = pd.read_csv(file_path)
-
-        # min_zero_Index列が存在するか確認
-        if "last1-maxlast" not in df.columns:
-            print(f"'min_zero_Index' column missing in file: {file_path}")
-            return None
-
-        # min_zero_Index列のデータを抽出
-        min_zero_indices = df["last_Angle"].dropna().tolist()
-
-        # ファイル名（セクション名）を取得
-        section_name = os.path.splitext(os.path.basename(file_path))[0]
-
-        # データフレームとして返す
-        return pd.DataFrame({
-            "Section": [section_name] * len(min_zero_indices),
-            "last_Angle": min_zero_indices
-        })
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-        return None
-
-def process_all_files(input_dir, output_file):
-    """
-    フォルダ内のすべてのCSVファイルを処理し、min_zero_Index列のデータを
-    pre＆post（A列）とpropet（B列）にまとめて保存する。
+    フォルダ内のCSVファイルの last_Angle 列（last1-maxlast 列があるファイルのみ）を
+    Section・rat・phase 付きの1つの表にまとめて保存する。
 
     Parameters:
     ----------
     input_dir : str
         入力CSVファイルが保存されているフォルダ。
     output_file : str
-        結果を保存するCSVファイルのパス。
+        結果を保存するファイルのパス（".parquet" / ".feather" の場合はカテゴリ型のまま保存する）。
+    phases : tuple of str
+        まとめる条件（例: ("post",)）。
+    trial : int
+        使う試行番号。
+    stage : str
+        ファイル名の処理段階の接尾辞。
+    catalog : SessionCatalog, optional
+        作成済みのファイルの一覧。None の場合は input_dir を走査して作る。
     """
-    # ファイル名の順番を定義
-    order = [
-        "rat8_1106", "rat9_1106", "rat10_1102", "rat10_1106", "rat11_1102", "rat11_1106"
-    ]
-    phases = ["pre", "propet"]
-    #phases=["post"]
+    if catalog is None:
+        catalog = SessionCatalog.scan(input_dir)
 
-    all_data = []
+    files = []
 
-    for base in order:
+    # ラット番号・日付の順（rat8_1106, rat9_1106, rat10_1102, ...）
+    for rat, date in catalog.subjects(stage=stage, extension=".csv"):
         for phase in phases:
-            # ファイルパスを生成
-            file_path = os.path.join(input_dir, f"{base}{phase}_3_processed.csv")
-
-            # ファイルからデータを抽出
-            df = process_csv(file_path)
-            if df is not None:
-                all_data.append(df)
-
-    # 全てのデータを結合
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
+            file_path = catalog.get(rat, date, phase, trial, stage, extension=".csv")
+            if file_path is None:
+                print(f"No file for rat{rat}_{date}{phase}_{trial}_{stage}")
+                continue
+            files.append(file_path)
+
+    # 各ファイルから last_Angle 列を抽出して1つの表にまとめる
+    final_df = build_aggregate(files, column_values, "last_Angle", "last_Angle", "last1-maxlast", True)  # 欠損値は除く
+    if len(final_df):
         try:
-            final_df.to_csv(output_file, index=False)
+            save_aggregate(final_df, output_file)
             print(f"Processed results saved to {output_file}")
         except Exception as e:
             print(f"Error saving file {output_file}: {e}")
@@ -83,11 +53,8 @@ def process_all_files(input_dir, output_file):
         print("No valid data processed.")
 
 # 使用例
-input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 入力CSVファイルが保存されているフォルダ
-output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_indices_landing_angle_1.csv"  # 出力ファイルのパス
-process_all_files(input_dir, output_file)
-
-
-#input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 入力CSVファイルが保存されているフォルダ
-#output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_indices.csv"  # 出力ファイルのパス
-#file_path = os.path.join(input_dir, f"{base}{phase}_3_processed.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut"  # 入力CSVファイルが保存されているフォルダ
+    output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/cycle/processed/cut/final_indices_landing_angle_1.csv"  # 出力ファイルのパス
+    process_all_files(input_dir, output_file)
+    #process_all_files(input_dir, output_file, phases=("post",))
@@ -0,0 +1,105 @@
+import os
+import sys
+from collections import namedtuple
+
+import matplotlib
+matplotlib.use("Agg")  # 画面なしで描画する（ワーカープロセスでも pyplot の状態を共有しない）
+from matplotlib.figure import Figure
+
+# process 内の batch.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from batch import report_errors, run_batch
+
+# 1枚分の描画ジョブ
+# draw: draw(fig, *args) の形で Figure に描画する関数（モジュールの最上位で定義しておくこと）
+# output_path: 保存先のパス, args: draw に渡す引数, figsize: 図の大きさ [inch], rc: 描画時に使う rcParams
+FigureJob = namedtuple("FigureJob", ["draw", "output_path", "args", "figsize", "rc"])
+
+def render_figure(job):
+    """
+    1枚の図を pyplot を使わずに（matplotlib.figure.Figure で）描画して保存する。
+
+    Parameters:
+    ----------
+    job : FigureJob
+        描画ジョブ。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
+    with matplotlib.rc_context(job.rc or {}):
+        fig = Figure(figsize=job.figsize)
+        job.draw(fig, *job.args)
+        os.makedirs(os.path.dirname(job.output_path) or ".", exist_ok=True)
+        fig.savefig(job.output_path)
+    return job.output_path
+
+class RenderQueue:
+    """
+    描画ジョブを溜めておき、まとめてプロセスプールで描画する。
+    出力先のパスはジョブを追加した時点で決まり、同じパスのジョブは追加できない。
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self._paths = set()
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, draw, output_path, *args, figsize=None, rc=None):
+        """
+        描画ジョブを追加する。
+
+        Parameters:
+        ----------
+        draw : callable
+            draw(fig, *args) の形で Figure に描画する関数。
+        output_path : str
+            保存先のパス。
+        *args :
+            draw に渡す引数（データの配列など。別プロセスに渡せるものにすること）。
+        figsize : tuple, optional
+            図の大きさ [inch]。None の場合は rc の "figure.figsize"。
+        rc : dict, optional
+            描画時に使う rcParams。
+
+        Returns:
+        -------
+        str
+            保存先のパス。
+        """
+        path = os.path.abspath(output_path)
+        if path in self._paths:
+            raise ValueError(f"Duplicate output path: {output_path}")
+        self._paths.add(path)
+        self.jobs.append(FigureJob(draw, output_path, args, figsize, rc))
+        return output_path
+
+    def run(self, max_workers=None, timeout=None):
+        """
+        溜めたジョブをすべて描画する。
+
+        Parameters:
+        ----------
+        max_workers : int, optional
+            ワーカープロセス数。None の場合は CPU コア数。1 の場合は順に描画する。
+        timeout : float, optional
+            1枚あたりの制限時間（秒）。
+
+        Returns:
+        -------
+        list of BatchResult
+            ジョブと同じ順番の結果（result は保存したファイルのパス）。
+        """
+        results = run_batch(render_figure, self.jobs, max_workers=max_workers, timeout=timeout)
+        for r in results:
+            if r.error is None:
+                print(f"Figure saved to {r.result}")
+        report_errors([r._replace(item=r.item.output_path) for r in results])
+        self.jobs = []
+        self._paths = set()
+        return results
@@ -0,0 +1,292 @@
+import pandas as pd
+import numpy as np
+from scipy.stats import ks_2samp, kstwo, t as t_dist
+from itertools import combinations
+import os
+import glob
+
+from ecdf import ECDF, ecdf_for, read_table
+
+# 1回にまとめて計算する（リサンプリング回数 × サンプル数）の要素数の上限（メモリ使用量の目安）
+BLOCK_ELEMENTS = 20_000_000
+
+def get_common_name(file_path):
+    """ ファイル名から共通部分を取得（拡張子を除いた部分） """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def load_sections(csv_files, phases):
+    """
+    各CSVファイルを1回だけ読み込み、列 0, 1, 2, ... を phases の各条件のサンプル（ECDF）として取り出す。
+    ECDF は ecdf.py のキャッシュを使うので、同じ列の CDF のプロットとソート結果を共有する。
+    読み込めないファイルはエラーを表示して飛ばす。セクションの順番は csv_files の順番。
+
+    Parameters:
+    ----------
+    csv_files : list of str
+        CSVファイルのパスのリスト（1ファイル = 1セクション）。
+    phases : list of str
+        列 0, 1, 2, ... に対応する条件名（例: ["pre", "propet", "post"]）。
+
+    Returns:
+    -------
+    dict
+        セクション名 -> {条件名: 欠損値を除いた列の ECDF} の辞書。
+        セクション名（get_common_name）が同じファイルが複数ある場合は ValueError。
+    """
+    names = [get_common_name(f) for f in csv_files]
+    duplicates = sorted(set(n for n in names if names.count(n) > 1))
+    if duplicates:
+        raise ValueError(f"Multiple files share the section name(s) {duplicates}: "
+                         f"{[f for f, n in zip(csv_files, names) if n in duplicates]}")
+
+    sections = {}
+    for file_path, name in zip(csv_files, names):
+        try:
+            if read_table(file_path).shape[1] < len(phases):
+                print(f"File {file_path} does not have enough columns. Skipping.")
+                continue
+            sections[name] = {phase: ecdf_for(file_path, i) for i, phase in enumerate(phases)}
+        except Exception as e:
+            print(f"Error processing file {file_path}: {e}")
+    return sections
+
+def ks_statistic_sorted(a_sorted, b_sorted):
+    """
+    ソート済みの2サンプルから2標本KS統計量を計算する（再ソートしない）。
+
+    Parameters:
+    ----------
+    a_sorted, b_sorted : np.ndarray
+        昇順にソート済みのサンプル。
+
+    Returns:
+    -------
+    float
+        KS統計量 D（2つの経験分布関数の差の最大値）。
+    """
+    return ECDF(a_sorted, assume_sorted=True).ks_distance(ECDF(b_sorted, assume_sorted=True))
+
+def ks_pvalue(d, a_sorted, b_sorted, method="auto"):
+    """
+    両側KS検定の p値を計算する。
+    method="asymp" の場合は KS統計量 d とサンプル数から漸近式（kstwo）で計算し、サンプルは使わない。
+    それ以外の場合は scipy の公開 API（ks_2samp）にソート済みのサンプルを渡して正確な p値を計算する。
+
+    Parameters:
+    ----------
+    d : float
+        KS統計量。
+    a_sorted, b_sorted : np.ndarray
+        昇順にソート済みのサンプル。
+    method : str
+        ks_2samp の method（"auto", "exact", "asymp"）。
+
+    Returns:
+    -------
+    float
+        p値。
+    """
+    if method == "asymp":
+        m, n = sorted([float(len(a_sorted)), float(len(b_sorted))], reverse=True)
+        return float(np.clip(kstwo.sf(d, np.round(m * n / (m + n))), 0, 1))
+    return float(ks_2samp(a_sorted, b_sorted, method=method).pvalue)
+
+def welch_test(stats_a, stats_b):
+    """
+    Welch の t検定（ttest_ind(equal_var=False) と同じ）を、各サンプルの要約統計量から計算する。
+
+    Parameters:
+    ----------
+    stats_a, stats_b : tuple
+        (サンプル数, 平均, 不偏分散)。
+
+    Returns:
+    -------
+    tuple
+        (t統計量, 両側 p値)。
+    """
+    n1, m1, v1 = stats_a
+    n2, m2, v2 = stats_b
+    se1, se2 = v1 / n1, v2 / n2
+    t = (m1 - m2) / np.sqrt(se1 + se2)
+    dof = (se1 + se2)**2 / (se1**2 / (n1 - 1) + se2**2 / (n2 - 1))
+    return float(t), float(2 * t_dist.sf(np.abs(t), dof))
+
+def _resampled_statistics(a_sorted, b_sorted, n_resamples, rng, resampling):
+    """
+    帰無仮説（2サンプルは同じ分布）のもとでリサンプリングしたときの KS統計量と t統計量を、
+    まとめて（行列演算で）計算する。
+
+    resampling="permutation" の場合はプールしたサンプルのラベルを並べ替え、
+    "bootstrap" の場合はプールしたサンプルから復元抽出する。
+    """
+    n1, n2 = len(a_sorted), len(b_sorted)
+    n = n1 + n2
+    pooled = np.sort(np.concatenate([a_sorted, b_sorted]), kind="mergesort")  # ソート済み同士なのでほぼ線形時間
+
+    block = max(1, BLOCK_ELEMENTS // n)
+    ks_stats = []
+    t_stats = []
+    for start in range(0, n_resamples, block):
+        size = min(block, n_resamples - start)
+
+        if resampling == "permutation":
+            # プールした値はソート済みのまま、ラベル（a なら True）だけを並べ替える
+            is_a = rng.permuted(np.tile(np.arange(n) < n1, (size, 1)), axis=1)
+            values = np.broadcast_to(pooled, (size, n))
+        else:
+            # プールした値から a, b それぞれ復元抽出し、行ごとにソートする
+            # （pooled はソート済みなので、インデックスをソートすれば値もソートされる）
+            idx = np.sort(rng.integers(0, n, size=(size, n)), axis=1)
+            values = pooled[idx]
+            is_a = rng.permuted(np.tile(np.arange(n) < n1, (size, 1)), axis=1)
+
+        # KS統計量：同じ値が続く場合は最後の位置だけで経験分布関数の差を評価する
+        cdf_a = np.cumsum(is_a, axis=1) / n1
+        cdf_b = np.cumsum(~is_a, axis=1) / n2
+        last_of_ties = np.ones((size, n), dtype=bool)
+        last_of_ties[:, :-1] = values[:, 1:] != values[:, :-1]
+        ks_stats.append(np.max(np.where(last_of_ties, np.abs(cdf_a - cdf_b), 0.0), axis=1))
+
+        # Welch の t統計量
+        sum_a = np.sum(np.where(is_a, values, 0.0), axis=1)
+        sumsq_a = np.sum(np.where(is_a, values**2, 0.0), axis=1)
+        sum_b = np.sum(values, axis=1) - sum_a
+        sumsq_b = np.sum(values**2, axis=1) - sumsq_a
+        m1, m2 = sum_a / n1, sum_b / n2
+        v1 = (sumsq_a - n1 * m1**2) / (n1 - 1)
+        v2 = (sumsq_b - n2 * m2**2) / (n2 - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_stats.append((m1 - m2) / np.sqrt(v1 / n1 + v2 / n2))
+
+    return np.concatenate(ks_stats), np.concatenate(t_stats)
+
+def adjust_pvalues(p_values, method="holm"):
+    """
+    多重比較の補正を行う。
+
+    Parameters:
+    ----------
+    p_values : array-like
+        p値の配列（NaN は補正の対象外）。
+    method : str
+        "holm"（Holm-Bonferroni）、"bonferroni" または "fdr_bh"（Benjamini-Hochberg）。
+
+    Returns:
+    -------
+    np.ndarray
+        補正後の p値。
+    """
+    p = np.asarray(p_values, dtype=float)
+    adjusted = np.full(p.shape, np.nan)
+    valid = ~np.isnan(p)
+    pv = p[valid]
+    m = len(pv)
+    if m == 0:
+        return adjusted
+
+    order = np.argsort(pv)
+    ranked = pv[order]
+    if method == "bonferroni":
+        adj = np.minimum(pv * m, 1.0)
+    elif method == "holm":
+        adj_sorted = np.minimum(np.maximum.accumulate(ranked * (m - np.arange(m))), 1.0)
+        adj = np.empty(m)
+        adj[order] = adj_sorted
+    elif method == "fdr_bh":
+        adj_sorted = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+        adj = np.empty(m)
+        adj[order] = np.minimum(adj_sorted, 1.0)
+    else:
+        raise ValueError(f"Unknown correction method: {method}")
+
+    adjusted[valid] = adj
+    return adjusted
+
+def compare_sections(sections, n_resamples=0, resampling="permutation", correction="holm",
+                     ks_method="auto", seed=0):
+    """
+    全セクション・全条件の組み合わせについて、KS検定と Welch の t検定をまとめて行う。
+    各サンプルのソートと要約統計量の計算は1回だけ行い、全ての組み合わせで使い回す。
+
+    Parameters:
+    ----------
+    sections : dict
+        load_sections の戻り値（セクション名 -> {条件名: ECDF またはサンプルの配列}）。
+    n_resamples : int
+        リサンプリングによる p値の計算回数（0 の場合は計算しない）。
+    resampling : str
+        "permutation"（並べ替え検定）または "bootstrap"。
+    correction : str or None
+        多重比較の補正方法（adjust_pvalues を参照）。検定ごとに全ての比較をまとめて補正する。
+    ks_method : str
+        KS検定の p値の計算方法（ks_pvalue を参照）。
+    seed : int
+        乱数のシード。
+
+    Returns:
+    -------
+    pd.DataFrame
+        1行 = 1つの比較・1つの検定の整然データ（Section, Phase A, Phase B, n A, n B, Test,
+        Statistic, p-value, 必要に応じて Resampled p-value, Adjusted p-value）。
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for section, samples in sections.items():
+        # 各サンプルの ECDF（ソート済みの値）と要約統計量を1回だけ作っておく
+        ecdfs = {phase: v if isinstance(v, ECDF) else ECDF(v) for phase, v in samples.items()}
+        summaries = {phase: (e.n, e.x.mean(), e.x.var(ddof=1)) for phase, e in ecdfs.items()}
+
+        for phase_a, phase_b in combinations(ecdfs, 2):
+            a, b = ecdfs[phase_a].x, ecdfs[phase_b].x
+            d = ecdfs[phase_a].ks_distance(ecdfs[phase_b])
+            t, p_t = welch_test(summaries[phase_a], summaries[phase_b])
+            ks_row = {"Test": "KS", "Statistic": d, "p-value": ks_pvalue(d, a, b, ks_method)}
+            t_row = {"Test": "Welch", "Statistic": t, "p-value": p_t}
+
+            if n_resamples > 0:
+                ks_null, t_null = _resampled_statistics(a, b, n_resamples, rng, resampling)
+                # 浮動小数点の誤差で観測値と同じ値を取りこぼさないよう、わずかに緩めて比較する
+                ks_row["Resampled p-value"] = (1 + np.sum(ks_null >= d - 1e-12)) / (n_resamples + 1)
+                t_row["Resampled p-value"] = (1 + np.sum(np.abs(t_null) >= abs(t) - 1e-12)) / (n_resamples + 1)
+
+            for row in (ks_row, t_row):
+                rows.append({"Section": section, "Phase A": phase_a, "Phase B": phase_b,
+                             "n A": len(a), "n B": len(b), **row})
+
+    results = pd.DataFrame(rows)
+    if correction is not None and len(results) > 0:
+        p_column = "Resampled p-value" if n_resamples > 0 else "p-value"
+        results["Adjusted p-value"] = np.nan
+        for test, idx in results.groupby("Test").groups.items():
+            results.loc[idx, "Adjusted p-value"] = adjust_pvalues(results.loc[idx, p_column], correction)
+    return results
+
+def process_all_files(input_dir, output_file, phases, n_resamples=0, resampling="permutation",
+                      correction="holm", seed=0):
+    """
+    フォルダ内のすべてのCSVファイルを読み込み、全ての比較の検定結果を1つのCSVにまとめて保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        入力CSVファイルが保存されているフォルダ。
+    output_file : str
+        結果を保存するCSVファイルのパス。
+    phases : list of str
+        列 0, 1, 2, ... に対応する条件名。
+    n_resamples, resampling, correction, seed :
+        compare_sections を参照。
+    """
+    csv_files = sorted(glob.glob(os.path.join(input_dir, "*.csv")))
+    sections = load_sections(csv_files, phases)
+    results = compare_sections(sections, n_resamples, resampling, correction, seed=seed)
+    results.to_csv(output_file, index=False)
+    print(f"Test results saved to {output_file}")
+
+# 使用例
+if __name__ == "__main__":
+    input_dir = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3"
+    output_file = "/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/cdf/3/moromoro/section_stats.csv"
+    process_all_files(input_dir, output_file, ["pre", "propet", "post"], n_resamples=10000)
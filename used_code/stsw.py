@@ -1,38 +1,85 @@
 import pandas as pd
 import glob
 import os
+import sys
 
-# 指定ディレクトリ内のすべてのCSVファイルを取得
-input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/stance_swing'  # CSVファイルが保存されているディレクトリのパス
-output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/stance_swing'  # 出力用ディレクトリ
-os.makedirs(output_dir, exist_ok=True)  # 出力用ディレクトリがなければ作成
+# process 内の batch.py / cache.py / blank_cycle.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
 
-csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
+from functools import partial
 
-for file_path in csv_files:
-    print(f"Processing: {file_path}")
-    
+from batch import report_errors
+from cache import run_cached_stage
+from blank_cycle import add_time_column
+
+def output_path_for(file_path, output_dir):
+    """ 出力ファイルのパス（例: "data.csv" → "<output_dir>/data_with_a_column_ss.csv"）を返す """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_with_a_column_ss.csv")
+
+def process_file(file_path, output_dir):
+    """
+    1つのCSVファイルに、L列（インデックス12）を -1 して60で割った時間のA列を追加し、
+    "_with_a_column_ss.csv" として保存する。
+
+    Parameters:
+    ----------
+    file_path : str
+        入力CSVファイルのパス。
+    output_dir : str
+        出力用ディレクトリ。
+
+    Returns:
+    -------
+    str
+        保存したファイルのパス。
+    """
     # CSVを読み込む（ヘッダーなし、0ベースのインデックスで処理）
     df = pd.read_csv(file_path, header=None)
-    
+
     # L列（旧K列: インデックス10）をもとに計算
     l_col_index = 12  # L列 (0ベースインデックス)
     if l_col_index >= df.shape[1]:
-        print(f"Error: L列(インデックス{l_col_index}）が存在しません。スキップします。")
-        continue
+        raise ValueError(f"L列(インデックス{l_col_index}）が存在しません。")
 
     # 新しいA列を作成（L列を-1して60で割る計算結果を追加）
-    df.insert(0, 'A', (df.iloc[:, l_col_index] - 1) / 60)
+    df = add_time_column(df, l_col_index)
 
     # 出力ファイル名を作成（例: "data.csv" → "data_with_a_column.csv"）
-    base_name = os.path.splitext(os.path.basename(file_path))[0]
-    new_file_name = f"{base_name}_with_a_column_ss.csv"
-    output_path = os.path.join(output_dir, new_file_name)
+    output_path = output_path_for(file_path, output_dir)
 
     # CSVを保存（ヘッダーなし、インデックスなし）
     df.to_csv(output_path, index=False, header=False)
-    print(f"Saved to: {output_path}\n")
+    return output_path
+
+def process_all_files(input_dir, output_dir, max_workers=None):
+    """
+    フォルダ内のCSVファイルのうち、前回の処理から変わったものだけを並列に処理し、"_with_a_column_ss.csv" として保存する。
+
+    Parameters:
+    ----------
+    input_dir : str
+        CSVファイルが保存されているディレクトリのパス。
+    output_dir : str
+        出力用ディレクトリ。
+    max_workers : int, optional
+        ワーカープロセス数。None の場合は CPU コア数。
+    """
+    os.makedirs(output_dir, exist_ok=True)  # 出力用ディレクトリがなければ作成
 
-print("All files processed successfully.")
+    csv_files = glob.glob(os.path.join(input_dir, '*.csv'))
 
+    results = run_cached_stage(process_file, csv_files, partial(output_path_for, output_dir=output_dir), "stsw",
+                               {"l_col_index": 12, "fps": 60}, output_dir, output_dir, max_workers=max_workers)
+    for r in results:
+        if r.error is None:
+            print(f"Saved to: {r.result}")
+    if report_errors(results) == 0:
+        print("All files processed successfully.")
 
+# 使用例
+if __name__ == "__main__":
+    # 指定ディレクトリ内のすべてのCSVファイルを取得
+    input_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/stance_swing'  # CSVファイルが保存されているディレクトリのパス
+    output_dir = '/home/erato_0/Documents/dlc/NewLabeling-Kimura-2024-12-26/kaiseki/scatter/modify/stance_swing'  # 出力用ディレクトリ
+    process_all_files(input_dir, output_dir)
@@ -0,0 +1,111 @@
+import numpy as np
+import matplotlib
+import warnings
+from matplotlib import font_manager
+from functools import lru_cache
+
+# 論文用の図の書式。matplotlib の rcParams を直接書き換えず、paper_style() で図ごとに適用する。
+
+# mm -> inch
+MM = 1 / 25.4
+
+# color（0-255 の RGB を 256 で割ったもの）
+blue = np.array([0, 128, 192]) / 256
+red = np.array([255, 70, 50]) / 256
+pink = np.array([255, 150, 200]) / 256
+green = np.array([20, 180, 20]) / 256
+yellow = np.array([230, 160, 20]) / 256
+gray = np.array([128, 128, 128]) / 256
+purple = np.array([200, 50, 255]) / 256
+light_blue = np.array([20, 200, 200]) / 256
+brown = np.array([128, 0, 0]) / 256
+navy_blue = np.array([0, 0, 100]) / 256
+vermilion = np.array([228, 94, 50]) / 256
+
+# 色の名前 -> RGB
+PALETTE = {
+    "blue": blue,
+    "red": red,
+    "pink": pink,
+    "green": green,
+    "yellow": yellow,
+    "gray": gray,
+    "purple": purple,
+    "light_blue": light_blue,
+    "brown": brown,
+    "navy_blue": navy_blue,
+    "vermilion": vermilion,
+}
+
+def register_color(name, rgb):
+    """ 色をパレットに追加する（rgb は 0-255 の RGB） """
+    PALETTE[name] = np.array(rgb) / 256
+    return PALETTE[name]
+
+def _resolve_font(name, fallback="DejaVu Sans"):
+    """ フォントが使えるかを1回だけ調べ、使えなければ代わりのフォント名を返す（図ごとの警告を防ぐ） """
+    try:
+        font_manager.findfont(font_manager.FontProperties(family=name), fallback_to_default=False)
+        return name
+    except ValueError:
+        warnings.warn(f"Font '{name}' not found. Using '{fallback}' instead.", stacklevel=2)
+        return fallback
+
+# 使用するフォント（import 時に1回だけ探す）
+FONT = _resolve_font("Arial")
+
+# 全パネル共通の書式
+PAPER_RC = {
+    # フォント設定
+    "font.family": "serif",       # 使用するフォント
+    "font.serif": [FONT],
+    "xtick.labelsize": 7,  # 横軸のフォントサイズ（軸のみ変更）
+    "ytick.labelsize": 7,  # 縦軸のフォントサイズ（軸のみ変更）
+    "font.size": 7,  # フォントサイズを設定 default : 12
+
+    # 軸設定
+    "xtick.major.size": 2.26772,      # x軸主目盛り線の長さ(単位ポイント)
+    "ytick.major.size": 2.26772,      # y軸主目盛り線の長さ
+    "xtick.major.width": 0.566929,     # x軸主目盛り線の線幅
+    "ytick.major.width": 0.566929,     # y軸主目盛り線の線幅
+    "axes.linewidth": 0.566929,        # グラフ囲う線の太さ
+    "xtick.top": False,  # x軸の上部目盛り
+    "ytick.right": False,  # y軸の右部目盛り
+    "figure.dpi": 300,            # dpi(dots per inch)
+    # ラスタープロットの太さ
+    "lines.linewidth": 0.566929,
+    # スキャッタープロットなどの点の大きさ
+    "lines.markersize": 2.26772,
+}
+
+@lru_cache(maxsize=None)
+def paper_rc(figsize_mm=(30, 30)):
+    """
+    論文用の rcParams の辞書を返す（同じ引数なら作成済みのものを返すので、書き換えないこと）。
+
+    Parameters:
+    ----------
+    figsize_mm : tuple or None
+        図の大きさ (幅, 高さ) [mm]。None の場合は matplotlib の既定値のまま。
+
+    Returns:
+    -------
+    dict
+        rcParams の辞書。
+    """
+    rc = dict(PAPER_RC)
+    if figsize_mm is not None:
+        rc["figure.figsize"] = [figsize_mm[0] * MM, figsize_mm[1] * MM]
+    return rc
+
+def paper_style(figsize_mm=(30, 30)):
+    """
+    論文用の書式を一時的に適用するコンテキストを返す。
+
+    使用例:
+        with paper_style((50, 30)):
+            fig, ax = plt.subplots()
+            ...
+            fig.savefig(...)
+    """
+    return matplotlib.rc_context(paper_rc(figsize_mm))
@@ -0,0 +1,73 @@
+import numpy as np
+import os
+import sys
+from matplotlib.collections import LineCollection
+
+# process 内の cycle.py を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process"))
+
+from cycle import find_runs
+from style import red, green
+
+def phase_polylines(t, values, phase):
+    """
+    時系列を接地相（stance）と遊脚相（swing）で色分けするための折れ線に分割する。
+    フレーム i → i+1 の線分は phase[i] の相に属するものとし、同じ相が続く線分は1本の折れ線にまとめる。
+
+    Parameters:
+    ----------
+    t : array-like
+        横軸（時間など）。
+    values : array-like
+        縦軸（角度など）。
+    phase : array-like
+        接地フラグ（1: stance, それ以外: swing）。
+
+    Returns:
+    -------
+    polylines : list of np.ndarray
+        各折れ線の頂点 (k, 2)。隣り合う折れ線は端点を共有する。
+    is_stance : np.ndarray
+        各折れ線が stance かどうか。
+    """
+    points = np.column_stack([np.asarray(t, dtype=float), np.asarray(values, dtype=float)])
+    if len(points) < 2:
+        return [], np.zeros(0, dtype=bool)
+
+    segment_stance = np.asarray(phase)[:-1] == 1
+    starts, lengths = find_runs(segment_stance)
+    # 線分 s, ..., s+length-1 は頂点 s, ..., s+length を通る
+    polylines = [points[s:s + length + 1] for s, length in zip(starts, lengths)]
+    return polylines, segment_stance[starts]
+
+def phase_trace(t, values, phase, stance_color=red, swing_color=green, linewidth=0.25, rasterized=False):
+    """
+    接地相・遊脚相で色分けした時系列の LineCollection を作る。
+    線分ごとではなく同じ相が続く区間ごとに1本の折れ線にするので、長い録画でも描画が軽い。
+
+    Parameters:
+    ----------
+    t, values, phase : array-like
+        phase_polylines を参照。
+    stance_color, swing_color : color
+        接地相・遊脚相の色。
+    linewidth : float
+        線の太さ。
+    rasterized : bool
+        True の場合、ベクター形式（pdf, svg など）で保存するときもこの線だけ画像として埋め込む（ファイルサイズ削減）。
+
+    Returns:
+    -------
+    LineCollection
+        ax.add_collection で追加する。
+    """
+    polylines, is_stance = phase_polylines(t, values, phase)
+    palette = np.array([swing_color, stance_color], dtype=float)
+    return LineCollection(polylines, colors=palette[is_stance.astype(int)], linewidths=linewidth,
+                          rasterized=rasterized)
+
+def plot_mean_sd(ax, x, mean, sd, color, **kwargs):
+    """ 平均と平均 ± SD の3本の線を1回の plot で描く """
+    mean = np.asarray(mean, dtype=float)
+    sd = np.asarray(sd, dtype=float)
+    return ax.plot(x, np.column_stack([mean + sd, mean - sd, mean]), color=color, **kwargs)